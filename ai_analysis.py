@@ -1,9 +1,24 @@
 import openai
 import os
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
+from utils.services.openai_client import openai_client
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
+
+# Upper bound on the size of the data section sent to the model
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", 1500))
+AI_PROMPT_MIN_TOKEN_BUDGET = 200  # room for the header and one line per metric
+# Cap on the analysis reply; the rate limiter reserves it against OPENAI_MAX_TPM
+# for every call, so it is sized to a long answer rather than the model maximum
+AI_ANALYSIS_MAX_TOKENS = int(os.getenv("AI_ANALYSIS_MAX_TOKENS", 2000))
+CHARS_PER_TOKEN = 4  # rough average for English text and numbers
+
+# Detail levels tried in order until the summary fits the token budget:
+# (weekly means per metric, outliers per metric, correlation pairs)
+SUMMARY_DETAIL_LEVELS = [(12, 5, 10), (8, 3, 6), (4, 2, 3), (0, 0, 0)]
 prompt_text = f"""You are a longevity expert working alongside Peter Attia. Analyze this data and generate useful insights and recommendations. What patterns do you see and what is worth trying out. Here is the data: 2024-02-01: Heart Rate = 65
 2024-02-02: Heart Rate = 70
 2024-02-03: Heart Rate = 68
@@ -19,31 +34,150 @@ prompt_text = f"""You are a longevity expert working alongside Peter Attia. Anal
 2024-02-13: Glucose = 88
 2024-02-14: Glucose = 92 """
 
-def openai_connection(prompt_text): 
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-4o", 
-            messages=[
+def estimate_tokens(text):
+    """Cheap token estimate used to keep prompts inside the budget"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def summarize_metrics(rows, token_budget=AI_PROMPT_TOKEN_BUDGET):
+    """
+    Summarize raw (date, metric_name, value) rows into a compact text block
+
+    Instead of listing every data point, each metric is reduced to its
+    range, mean, variability, weekly trend slope, recent weekly means and
+    notable outliers, followed by the strongest cross-metric correlations.
+    Detail is dropped step by step until the text fits token_budget.
+
+    Args:
+        rows: Iterable of (date, metric_name, value) tuples
+        token_budget: Maximum estimated tokens for the summary
+
+    Returns:
+        str: Summary text (empty string if there is no data)
+    """
+    df = pd.DataFrame(list(rows), columns=['date', 'metric', 'value'])
+    if df.empty:
+        return ""
+    df['date'] = pd.to_datetime(df['date'])
+    df['value'] = df['value'].astype(float)
+
+    # One column per metric, one row per day (multiple points per day are averaged)
+    daily = df.pivot_table(index='date', columns='metric', values='value', aggfunc='mean').sort_index()
+    weekly = daily.resample('W').mean()
+
+    stats = _metric_stats(daily)
+    correlations = _metric_correlations(daily)
+
+    for max_weeks, max_outliers, max_pairs in SUMMARY_DETAIL_LEVELS:
+        text = _format_summary(daily, weekly, stats, correlations, max_weeks, max_outliers, max_pairs)
+        if estimate_tokens(text) <= token_budget:
+            return text
+
+    # Even the leanest summary is too long (very many metrics): hard truncate
+    return text[:token_budget * CHARS_PER_TOKEN]
+
+def _metric_stats(daily):
+    """Vectorized per-metric statistics over the daily matrix"""
+    values = daily.to_numpy()
+    mask = ~np.isnan(values)
+    counts = mask.sum(axis=0)
+
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+
+    # Least-squares slope of value against day offset, per metric, ignoring gaps
+    days = (daily.index - daily.index[0]).days.to_numpy(dtype=float)[:, None]
+    x = np.where(mask, days, np.nan)
+    x_mean = np.nanmean(x, axis=0)
+    cov = np.nansum((x - x_mean) * (values - mean), axis=0)
+    var = np.nansum((x - x_mean) ** 2, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope_per_week = np.where(var > 0, cov / var * 7, np.nan)
+        z = np.where(std > 0, (values - mean) / std, 0.0)
+
+    return {
+        'count': counts,
+        'mean': mean,
+        'std': std,
+        'min': np.nanmin(values, axis=0),
+        'max': np.nanmax(values, axis=0),
+        'slope': slope_per_week,
+        'z': z,
+    }
+
+def _metric_correlations(daily, min_overlap=7, min_abs_r=0.3):
+    """Pairwise-complete Pearson correlations, strongest first"""
+    if daily.shape[1] < 2:
+        return []
+    corr = daily.corr(min_periods=min_overlap).to_numpy()
+    metrics = daily.columns
+    upper_i, upper_j = np.triu_indices(len(metrics), k=1)
+    r = corr[upper_i, upper_j]
+    keep = ~np.isnan(r) & (np.abs(r) >= min_abs_r)
+    order = np.argsort(-np.abs(r[keep]))
+    return [(metrics[i], metrics[j], rv) for i, j, rv in
+            zip(upper_i[keep][order], upper_j[keep][order], r[keep][order])]
+
+def _format_summary(daily, weekly, stats, correlations, max_weeks, max_outliers, max_pairs):
+    """Render the summary text at a given level of detail"""
+    lines = [f"Data from {daily.index[0].date()} to {daily.index[-1].date()}, {daily.shape[1]} metrics."]
+    dates = daily.index
+
+    for k, metric in enumerate(daily.columns):
+        # A metric measured on a single day has no trend
+        slope = stats['slope'][k]
+        trend = f"{slope:+.3g}/week" if np.isfinite(slope) else "n/a"
+        lines.append(
+            f"{metric}: n={stats['count'][k]}, mean={stats['mean'][k]:.4g}, sd={stats['std'][k]:.3g}, "
+            f"min={stats['min'][k]:.4g}, max={stats['max'][k]:.4g}, trend={trend}"
+        )
+        if max_weeks:
+            recent = weekly[metric].dropna().tail(max_weeks)
+            if len(recent):
+                lines.append("  weekly means: " + ", ".join(f"{d.date()}={v:.4g}" for d, v in recent.items()))
+        if max_outliers:
+            z = stats['z'][:, k]
+            flagged = np.flatnonzero(np.abs(np.nan_to_num(z)) >= 2.5)
+            flagged = flagged[np.argsort(-np.abs(z[flagged]))][:max_outliers]
+            if len(flagged):
+                lines.append("  outliers: " + ", ".join(
+                    f"{dates[i].date()}={daily.iat[i, k]:.4g} (z={z[i]:+.1f})" for i in sorted(flagged)))
+
+    if max_pairs and correlations:
+        lines.append("Correlations (Pearson r on shared days):")
+        lines.extend(f"  {a} vs {b}: r={r:+.2f}" for a, b, r in correlations[:max_pairs])
+
+    return "\n".join(lines)
+
+def build_analysis_messages(prompt_text):
+    """Chat messages shared by the blocking and streaming analysis calls"""
+    return [
+        {
+            "role": "developer",
+            "content": [
                 {
-                    "role": "developer",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "You are Peter Attia's trusted assistant. Analyze this data and generate useful insights and recommendations. What patterns do you see and what is worth trying out"
-                        }
-                    ]
-                },
+                    "type": "text",
+                    "text": "You are Peter Attia's trusted assistant. Analyze this data and generate useful insights and recommendations. What patterns do you see and what is worth trying out"
+                }
+            ]
+        },
+        {
+            "role": "user",
+            "content": [
                 {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt_text
-                        }
-                    ]
+                    "type": "text",
+                    "text": prompt_text
                 }
-            ],
-            max_tokens=10000,
+            ]
+        }
+    ]
+
+def openai_connection(prompt_text): 
+    try:
+        response = openai_client.chat_completion(
+            purpose='analysis',
+            model="gpt-4o", 
+            messages=build_analysis_messages(prompt_text),
+            max_tokens=AI_ANALYSIS_MAX_TOKENS,
             temperature=0.7
         )
         ai_content = response.choices[0].message.content
@@ -52,6 +186,30 @@ def openai_connection(prompt_text):
     
     return ai_content
 
+def openai_stream(prompt_text):
+    """
+    Stream the analysis as it is generated
+
+    Yields:
+        str: Completion text deltas in the order they arrive
+
+    Raises:
+        Exception: Any OpenAI error, so the caller can report it in-band
+    """
+    stream = openai_client.stream_chat_completion(
+        purpose='analysis_stream',
+        model="gpt-4o",
+        messages=build_analysis_messages(prompt_text),
+        max_tokens=AI_ANALYSIS_MAX_TOKENS,
+        temperature=0.7
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
 # Example usage:
 if __name__ == '__main__':
     prompt = "Can you analyze the health data in this thread and find meaningful insights?"
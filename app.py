@@ -1,14 +1,20 @@
 
 import os
 import json
+import uuid
+import hashlib
 import logging
+import zipfile
+import tempfile
+import xml.etree.ElementTree as ET
 import openai
 from datetime import datetime, date, timedelta, timezone
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import or_
 from flask_migrate import Migrate
 from flask_cors import CORS
+from werkzeug.http import is_resource_modified
 from flask_apscheduler import APScheduler
 
 # Configure logging
@@ -29,17 +35,47 @@ except Exception as e:
     logger.warning(f"Error loading .env file: {e}")
 
 # Import your models AFTER initializing db
-from models import db, Graph, DataPoint, Experiment, User, SyncLog
+from models import db, Graph, DataPoint, Experiment, ExperimentResult, User, SyncLog, UploadSession, AIAnalysis
 from utils.services.oura_fetch_and_store import fetch_oura_data, flatten_oura_chunks, clean_data, store_oura_data
 from utils.services.oura_sync_manager import OuraSyncManager
 from utils.services.fitbit_oauth import get_fitbit_oauth
 from utils.services.fitbit_fetch_and_store import fetch_fitbit_data, clean_fitbit_data, store_fitbit_data
 from utils.services.fitbit_sync_manager import FitbitSyncManager
-from ai_analysis import openai_connection
+from utils.services.data_ingest import parse_data_points, bulk_insert_data_points, format_inserted_rows, import_data_points
+from utils.services.apple_health_import import import_apple_health_export
+from utils.services.garmin_import import import_garmin_export
+from utils.services.metric_catalog import (
+    list_metric_names, count_data_points, get_catalog_entries, get_metric_unit, refresh_catalog, catalog_entry_to_dict,
+    catalog_versions
+)
+from utils.services.latest_values import latest_values
+from utils.services.metric_changes import init_change_listener
+from utils.services.series_cache import series_cache, window_average
+from utils.services.series_window import parse_window_args, read_series_page, graph_window
+from utils.services.series_alignment import align_series, aligned_to_columnar, FILL_METHODS
+from utils.services.correlation import correlation_report, report_cache, CORRELATION_MAX_LAG, CORRELATION_MIN_PERIODS
+from utils.services.experiment_analysis import analyze_experiment
+from utils.services.period_scanner import scan_periods, DEFAULT_MIN_COVERAGE
+from utils.services.request_coalescing import (
+    coalesce, current_coalescer, route_key, coalescing_stats, reset_coalescing_stats, COALESCE_STALE_SECONDS
+)
+from utils.services.data_export import stream_export, export_filename, parquet_available, EXPORT_FORMATS
+from utils.services.series_encoding import (
+    load_graph_series, empty_series, series_to_points, series_to_columnar, encode_series,
+    SERIES_FORMATS, SERIES_CONTENT_TYPES
+)
+from utils.services.openai_client import openai_client, OpenAIRateLimitExceeded
+from utils.services.json_provider import init_json_provider
+from utils.services.compression import init_compression
+from ai_analysis import openai_connection, openai_stream, summarize_metrics, AI_PROMPT_TOKEN_BUDGET, AI_PROMPT_MIN_TOKEN_BUDGET
 
 # Initialize Flask app
 app = Flask(__name__)
 
+# orjson-backed JSON (dates as ISO 8601) and negotiated gzip/brotli responses
+init_json_provider(app)
+init_compression(app)
+
 # CORS configuration
 ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', 'http://localhost:5173,http://localhost:5174,http://127.0.0.1:5173,http://127.0.0.1:5174').split(',')
 CORS(app, resources={
@@ -88,6 +124,8 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 
 db.init_app(app)
 migrate = Migrate(app, db)
+# Other workers' ingest invalidates this process's caches via LISTEN/NOTIFY
+init_change_listener(app, database_url)
 
 # Flask-APScheduler configuration
 app.config['SCHEDULER_API_ENABLED'] = True
@@ -96,7 +134,10 @@ app.config['SCHEDULER_TIMEZONE'] = 'UTC'
 # Initialize scheduler
 scheduler = APScheduler()
 scheduler.init_app(app)
-scheduler.start()
+# When the app runs as a script, the decode processes of the Garmin import
+# pool re-import it as __mp_main__; only the serving process runs scheduled syncs
+if __name__ != '__mp_main__':
+    scheduler.start()
 
 # Initialize sync managers
 oura_sync_manager = OuraSyncManager(scheduler)
@@ -111,12 +152,57 @@ else:
     logger.warning("OPENAI_API_KEY not set or invalid. AI features will be disabled.")
     openai.api_key = None
 
+# Refresh cached AI analyses in the background after each successful sync (costs OpenAI calls)
+AI_PRECOMPUTE_AFTER_SYNC = os.getenv('AI_PRECOMPUTE_AFTER_SYNC', 'false').lower() == 'true'
+
+# Upload sessions untouched for longer than this are discarded
+UPLOAD_SESSION_TTL_HOURS = 24
+
+# Browser cache lifetime for static reference data (dashboard metric definitions)
+STATIC_CACHE_MAX_AGE = 86400  # seconds
+
+def compute_etag(*parts):
+    """ETag value for the JSON-serializable inputs a response is built from"""
+    return hashlib.sha1(json.dumps(parts, default=str, sort_keys=True).encode('utf-8')).hexdigest()
+
+def conditional_response(etag, build, last_modified=None):
+    """
+    Answer 304 Not Modified when the client already holds etag, otherwise build()
+    
+    build is only called when the representation changed, so routes pass
+    in the part that queries and serializes the payload. In views decorated
+    with @coalesce, concurrent builds of the same ETag are shared (and the
+    previous version may be served while a new one is built). Responses are
+    marked no-cache: clients keep them but revalidate before every use.
+    
+    Args:
+        etag: Value from compute_etag (sent as a weak ETag)
+        build: Callable returning the full response
+        last_modified: Optional naive UTC datetime for Last-Modified
+    """
+    coalescer = current_coalescer()
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = Response(status=304)
+    elif coalescer is not None:
+        etag, response = coalescer.run(etag, build, route_key())
+        if not is_resource_modified(request.environ, etag=etag):
+            # Served the previous version, which the client already holds
+            response = Response(status=304)
+    else:
+        response = build()
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
 @app.route('/api/upload/process-notes', methods=['POST'])
 def process_notes():
     try:
         data = request.json
         notes = data.get('notes', '')
         clarifications = data.get('clarifications', '')
+        upload_session_id = data.get('upload_session_id')
         
         if not notes:
             return jsonify({"error": "No notes provided"}), 400
@@ -135,7 +221,7 @@ def process_notes():
         
         if notes_length > chunk_threshold:
             # Split into chunks and process sequentially
-            return process_large_dataset(notes, clarifications, max_chunk_size)
+            return process_large_dataset(notes, clarifications, max_chunk_size, upload_session_id)
         else:
             # Process normally for smaller datasets
             return process_single_chunk(notes, clarifications)
@@ -144,46 +230,121 @@ def process_notes():
         logger.error(f"Error processing notes: {str(e)}", exc_info=True)
         return jsonify({"error": "Failed to process notes"}), 500
 
-def process_large_dataset(notes, clarifications, max_chunk_size):
-    """Process large datasets by chunking them and processing sequentially"""
+def process_large_dataset(notes, clarifications, max_chunk_size, upload_session_id=None):
+    """Process large datasets by chunking them and processing sequentially.
+
+    Per-chunk results are kept in an UploadSession so that a clarification
+    round only reprocesses the chunks that asked for clarification.
+    """
     try:
-        # Split notes into chunks
-        chunks = split_notes_into_chunks(notes, max_chunk_size)
+        session = get_or_create_upload_session(notes, max_chunk_size, upload_session_id)
+        chunks = json.loads(session.chunks)
         total_chunks = len(chunks)
         
-        logger.info(f"Processing {total_chunks} chunks for large dataset")
-        
-        all_structured_data = []
+        logger.info(f"Processing {total_chunks} chunks for large dataset (upload session {session.id})")
         
         for i, chunk in enumerate(chunks):
+            if chunk['status'] == 'done':
+                continue
+            
+            # Chunks that asked questions are only retried once answers arrive
+            if chunk['status'] == 'needs_clarification' and not clarifications:
+                continue
+            
             logger.debug(f"Processing chunk {i+1}/{total_chunks}")
             
             # Process each chunk
-            chunk_result, status_code = process_single_chunk(chunk, clarifications)
+            chunk_result, status_code = process_single_chunk(chunk['text'], clarifications)
             
             if status_code == 200:
-                chunk_data = chunk_result
-                if chunk_data.get('success') and 'structured_data' in chunk_data:
-                    all_structured_data.extend(chunk_data['structured_data'])
-                elif chunk_data.get('needs_clarification'):
-                    # If any chunk needs clarification, return that
-                    return jsonify(chunk_data), status_code
+                if chunk_result.get('success') and 'structured_data' in chunk_result:
+                    chunk['status'] = 'done'
+                    chunk['structured_data'] = chunk_result['structured_data']
+                    chunk['questions'] = []
+                elif chunk_result.get('needs_clarification'):
+                    chunk['status'] = 'needs_clarification'
+                    chunk['questions'] = chunk_result.get('questions', [])
             else:
-                # If any chunk fails, return the error
+                # Keep the chunks finished so far and return the error
+                chunk['status'] = 'failed'
+                save_upload_session(session, chunks)
+                chunk_result['upload_session_id'] = session.id
                 return jsonify(chunk_result), status_code
         
+        save_upload_session(session, chunks)
+        
+        # If any chunk needs clarification, return all of the questions at once
+        questions = [q for chunk in chunks if chunk['status'] == 'needs_clarification' for q in chunk['questions']]
+        if questions:
+            return jsonify({
+                "needs_clarification": True,
+                "questions": questions,
+                "upload_session_id": session.id,
+                "chunks_processed": len([c for c in chunks if c['status'] == 'done']),
+                "total_chunks": total_chunks
+            }), 200
+        
         # Combine all results
+        all_structured_data = [point for chunk in chunks for point in chunk['structured_data']]
         return jsonify({
             "success": True,
             "structured_data": all_structured_data,
             "count": len(all_structured_data),
-            "chunks_processed": total_chunks
+            "chunks_processed": total_chunks,
+            "upload_session_id": session.id
         })
         
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error in large dataset processing: {str(e)}", exc_info=True)
         return jsonify({"error": f"Failed to process large dataset: {str(e)}"}), 500
 
+def get_or_create_upload_session(notes, max_chunk_size, upload_session_id=None):
+    """Load the upload session for these notes, or start a new one"""
+    notes_hash = hashlib.sha256(notes.encode('utf-8')).hexdigest()
+    
+    if upload_session_id:
+        session = UploadSession.query.get(upload_session_id)
+        # Only resume if the client re-sent the same notes
+        if session and session.notes_hash == notes_hash:
+            return session
+        logger.info(f"Upload session {upload_session_id} not found or notes changed, starting a new one")
+    
+    # Drop abandoned sessions before creating a new one; updated_at is set by
+    # the database, so the cutoff is taken from the database clock as well
+    now = db.session.query(db.func.current_timestamp()).scalar()
+    cutoff = now - timedelta(hours=UPLOAD_SESSION_TTL_HOURS)
+    UploadSession.query.filter(UploadSession.updated_at < cutoff).delete()
+    
+    chunks = [{
+        'text': chunk_text,
+        'status': 'pending',
+        'structured_data': [],
+        'questions': []
+    } for chunk_text in split_notes_into_chunks(notes, max_chunk_size)]
+    
+    session = UploadSession(
+        id=str(uuid.uuid4()),
+        notes_hash=notes_hash,
+        chunks=json.dumps(chunks),
+        status='in_progress'
+    )
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+def save_upload_session(session, chunks):
+    """Persist per-chunk progress and derive the overall session status"""
+    statuses = {chunk['status'] for chunk in chunks}
+    if statuses == {'done'}:
+        session.status = 'completed'
+    elif 'needs_clarification' in statuses:
+        session.status = 'needs_clarification'
+    else:
+        session.status = 'in_progress'
+    session.chunks = json.dumps(chunks)
+    db.session.commit()
+
 def split_notes_into_chunks(notes, max_chunk_size):
     """Split notes into logical chunks based on workout sessions"""
     lines = notes.split('\n')
@@ -233,7 +394,8 @@ def process_single_chunk(notes, clarifications):
             """
             
             try:
-                response = openai.chat.completions.create(
+                response = openai_client.chat_completion(
+                    purpose='upload_clarification',
                     model="gpt-4o",
                     messages=[
                         {
@@ -259,7 +421,7 @@ def process_single_chunk(notes, clarifications):
                     temperature=0.1
                 )
                 ai_response = response.choices[0].message.content.strip()
-            except openai.RateLimitError as e:
+            except (openai.RateLimitError, OpenAIRateLimitExceeded) as e:
                 return {"error": "OpenAI rate limit exceeded. Please wait a moment and try again."}, 429
             except Exception as e:
                 return {"error": f"OpenAI API error: {str(e)}"}, 500
@@ -299,7 +461,8 @@ def process_single_chunk(notes, clarifications):
         """
         
         try:
-            response = openai.chat.completions.create(
+            response = openai_client.chat_completion(
+                purpose='upload_structuring',
                 model="gpt-4o",
                 messages=[
                     {
@@ -328,7 +491,7 @@ def process_single_chunk(notes, clarifications):
             # Extract the JSON response
             ai_response = response.choices[0].message.content.strip()
             logger.debug(f"AI Response received (length: {len(ai_response)})")
-        except openai.RateLimitError as e:
+        except (openai.RateLimitError, OpenAIRateLimitExceeded) as e:
             return {"error": "OpenAI rate limit exceeded. Please wait a moment and try again."}, 429
         except Exception as e:
             return {"error": f"OpenAI API error: {str(e)}"}, 500
@@ -385,27 +548,20 @@ def save_upload_data():
         if not structured_data:
             return jsonify({"error": "No structured data provided"}), 400
         
-        added_points = []
-        for point in structured_data:
-            date = datetime.strptime(point['date'], '%Y-%m-%d').date()
-            new_point = DataPoint(
-                date=date,
-                metric_name=point['metric_name'],
-                value=float(point['value'])
-            )
-            db.session.add(new_point)
-            added_points.append({
-                'date': date.isoformat(),
-                'metric_name': point['metric_name'],
-                'value': float(point['value']),
-                'unit': point.get('unit', '')
-            })
+        # Validate the whole payload in one pass before writing anything
+        parsed, errors = parse_data_points(structured_data)
+        if errors:
+            return jsonify({"error": "Invalid data points", "invalid": errors}), 400
         
+        result = bulk_insert_data_points(parsed)
         db.session.commit()
         return jsonify({
             'success': True,
-            'message': f'Successfully saved {len(added_points)} data points',
-            'data_points': added_points
+            'message': f"Successfully saved {result['inserted']} data points ({result['skipped']} skipped: "
+                       f"same metric, date and value already stored)",
+            'inserted': result['inserted'],
+            'skipped': result['skipped'],
+            'data_points': format_inserted_rows(result['rows'], include_unit=True)
         }), 201
         
     except Exception as e:
@@ -415,27 +571,32 @@ def save_upload_data():
 
 # API Routes
 @app.route('/api/graphs', methods=['GET'])
+@coalesce(stale_while_revalidate=COALESCE_STALE_SECONDS, params=('format', 'window', 'start', 'end'))
 def get_graphs(): 
     try:
-        all_graphs = Graph.query.filter(or_(Graph.is_temporary==None, Graph.is_temporary==False)).all()
-
-        graph_list = []
+        fmt = request.args.get('format', 'points').lower()
+        if fmt not in GRAPH_SERIES_FORMATS:
+            return jsonify({'error': f"Unsupported format '{fmt}'. Use one of: {', '.join(GRAPH_SERIES_FORMATS)}"}), 400
 
-        for g in all_graphs: 
-            fig_for_graph = create_plot_for_graph(g)
-            graph_list.append({
-                "title": g.name,
-                "figure": fig_for_graph,
-                "graph_id": g.id
-                })
-        return jsonify(graph_list)
+        try:
+            window = requested_graph_window(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        graphs = list_saved_graphs()
+        catalog = get_catalog_entries()
+        etag = compute_etag('graphs', fmt, window, graphs_etag_parts(graphs), catalog_versions(catalog))
+        return conditional_response(etag, lambda: jsonify(build_graph_list(graphs, fmt, catalog, window)))
     except Exception as e:
         return jsonify({"error": "Internal server error"}), 500
 
 @app.route('/api/graphs/<int:graph_id>', methods=['DELETE'])
 def delete_graph_api(graph_id):
     graph = Graph.query.get_or_404(graph_id)
+    affected_metrics = [name for (name,) in db.session.query(DataPoint.metric_name).filter_by(graph_id=graph_id).distinct()]
     DataPoint.query.filter_by(graph_id=graph_id).delete()  # Delete related data points
+    AIAnalysis.query.filter_by(graph_id=graph_id).delete()  # Delete cached analyses
+    refresh_catalog(affected_metrics)
     db.session.delete(graph)
     db.session.commit()
     return jsonify({"message": "Graph deleted", "graph_id": graph_id}), 200
@@ -449,12 +610,17 @@ def create_graph_api():
     
     if not name:
         return jsonify({"error": "Graph name is required"}), 400
+    try:
+        default_window_days = parse_default_window_days(data.get('default_window_days'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
         
     graph = Graph(
         name=name, 
         description=description, 
         is_temporary=False,
-        tracked_metrics=json.dumps(tracked_metrics) if tracked_metrics else None
+        tracked_metrics=json.dumps(tracked_metrics) if tracked_metrics else None,
+        default_window_days=default_window_days
     )
     db.session.add(graph)
     db.session.commit()
@@ -466,23 +632,181 @@ def create_graph_api():
             "graph_id": graph.id,
             "title": graph.name,
             "description": graph.description,
-            "tracked_metrics": tracked_metrics
+            "tracked_metrics": tracked_metrics,
+            "default_window_days": graph.default_window_days
         }
     }), 201
 
 @app.route('/api/ai-analyze/<int:graph_id>', methods=['POST'])
 def ai_analysis(graph_id): 
     graph = Graph.query.get_or_404(graph_id)
-    data_points = graph.data_points
-    data_str_list = []
-
-    for dp in data_points:
-        data_str_list.append(f"{dp.date}: {dp.metric_name} = {dp.value}")
-    data_str = " ".join(data_str_list)
+    data = request.get_json(silent=True) or {}
+    try:
+        token_budget = int(data.get('token_budget') or AI_PROMPT_TOKEN_BUDGET)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'token_budget must be an integer'}), 400
+    if token_budget < AI_PROMPT_MIN_TOKEN_BUDGET:
+        return jsonify({'error': f"token_budget must be at least {AI_PROMPT_MIN_TOKEN_BUDGET}"}), 400
+
+    # Stream tokens over Server-Sent Events when the client asks for it
+    wants_stream = request.args.get('stream') in ('1', 'true') or \
+        'text/event-stream' in request.headers.get('Accept', '')
+
+    # Serve the stored analysis until new data arrives for the graph's metrics
+    metrics_key = get_graph_metrics_key(graph)
+    data_version = get_graph_data_version(graph)
+    cached = get_cached_ai_analysis(graph.id, metrics_key, token_budget, data_version)
+    if cached is not None:
+        if wants_stream:
+            return sse_response(stream_cached_ai_analysis(cached))
+        return jsonify({"ai_analysis": cached, "cached": True})
+
+    prompt_text = build_ai_prompt(graph, token_budget)
+
+    if wants_stream:
+        return sse_response(stream_ai_analysis(prompt_text, graph.id, metrics_key, token_budget, data_version))
 
-    prompt_text = f"""You are a longevity expert working alongside Peter Attia. Analyze this data and generate useful insights and recommendations. What patterns do you see and what is worth trying out. Here is the data: {data_str}"""
     ai_response = openai_connection(prompt_text)
-    return jsonify({"ai_analysis": ai_response})
+    if not ai_response.startswith("Error calling OpenAI"):
+        store_ai_analysis(graph.id, metrics_key, token_budget, data_version, ai_response)
+    return jsonify({"ai_analysis": ai_response, "cached": False})
+
+def build_ai_prompt(graph_obj, token_budget):
+    """Build the analysis prompt from a statistical summary of the graph's data"""
+    # Summarize the series instead of sending every data point, so the
+    # prompt size stays bounded no matter how much history the graph has
+    data_str = summarize_metrics(get_graph_rows(graph_obj), token_budget)
+    return f"""You are a longevity expert working alongside Peter Attia. Analyze this data and generate useful insights and recommendations. What patterns do you see and what is worth trying out. Here is a statistical summary of the data: {data_str}"""
+
+def sse_response(events):
+    """Wrap a generator of Server-Sent Event frames in a streaming response"""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def stream_ai_analysis(prompt_text, graph_id, metrics_key, token_budget, data_version):
+    """Format streamed completion deltas as Server-Sent Events and cache the result"""
+    parts = []
+    try:
+        for delta in openai_stream(prompt_text):
+            parts.append(delta)
+            yield f"data: {json.dumps({'delta': delta})}\n\n"
+    except Exception as e:
+        logger.error(f"Error streaming AI analysis: {str(e)}", exc_info=True)
+        yield f"event: error\ndata: {json.dumps({'error': f'Error calling OpenAI: {str(e)}'})}\n\n"
+        return
+    store_ai_analysis(graph_id, metrics_key, token_budget, data_version, "".join(parts))
+    yield "event: done\ndata: {}\n\n"
+
+def stream_cached_ai_analysis(analysis):
+    """Replay a cached analysis as a single Server-Sent Event"""
+    yield f"data: {json.dumps({'delta': analysis, 'cached': True})}\n\n"
+    yield "event: done\ndata: {}\n\n"
+
+def get_graph_metrics_filter(graph_obj):
+    """SQL condition selecting the data points shown on a graph"""
+    if graph_obj.tracked_metrics:
+        try:
+            tracked_metrics_list = json.loads(graph_obj.tracked_metrics)
+            return DataPoint.metric_name.in_(tracked_metrics_list)
+        except (json.JSONDecodeError, TypeError):
+            pass
+    return DataPoint.graph_id == graph_obj.id
+
+def get_graph_rows(graph_obj):
+    """Return (date, metric_name, value) rows for the metrics shown on a graph"""
+    return db.session.query(DataPoint.date, DataPoint.metric_name, DataPoint.value)\
+        .filter(get_graph_metrics_filter(graph_obj)).all()
+
+def get_graph_metrics_key(graph_obj):
+    """Stable cache key for the set of metrics a graph tracks"""
+    try:
+        tracked_metrics_list = json.loads(graph_obj.tracked_metrics) if graph_obj.tracked_metrics else []
+    except (json.JSONDecodeError, TypeError):
+        tracked_metrics_list = []
+    return json.dumps(sorted(tracked_metrics_list))
+
+def get_graph_data_version(graph_obj):
+    """
+    Version of the data behind a graph: a hash of the catalog data_version
+    of every metric it shows
+
+    Every write path (inserts, in-place updates, deletes) bumps the catalog
+    version of the metrics it touches, so the version changes whenever the
+    analysed data does.
+    """
+    metric_names = [name for (name,) in db.session.query(DataPoint.metric_name)
+                    .filter(get_graph_metrics_filter(graph_obj)).distinct()]
+    return compute_etag('graph-data', catalog_versions(get_catalog_entries(metric_names), metric_names))
+
+def get_cached_ai_analysis(graph_id, metrics_key, token_budget, data_version):
+    """Return the cached analysis text for this data version, or None"""
+    cached = AIAnalysis.query.filter_by(
+        graph_id=graph_id,
+        metrics_key=metrics_key,
+        token_budget=token_budget,
+        data_version=data_version
+    ).order_by(AIAnalysis.created_at.desc()).first()
+    if not cached:
+        return None
+    openai_client.record_cache_hit('analysis')
+    return cached.analysis
+
+def store_ai_analysis(graph_id, metrics_key, token_budget, data_version, analysis):
+    """Replace the cached analysis for a graph/metrics/budget combination"""
+    try:
+        AIAnalysis.query.filter_by(graph_id=graph_id, metrics_key=metrics_key, token_budget=token_budget).delete()
+        db.session.add(AIAnalysis(
+            graph_id=graph_id,
+            metrics_key=metrics_key,
+            token_budget=token_budget,
+            data_version=data_version,
+            analysis=analysis
+        ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to cache AI analysis for graph {graph_id}: {str(e)}", exc_info=True)
+
+def precompute_ai_analyses():
+    """Refresh cached analyses for every saved graph whose data has changed"""
+    with app.app_context():
+        if not openai.api_key:
+            return
+        graphs = Graph.query.filter(or_(Graph.is_temporary==None, Graph.is_temporary==False)).all()
+        refreshed = 0
+        for graph in graphs:
+            metrics_key = get_graph_metrics_key(graph)
+            data_version = get_graph_data_version(graph)
+            if get_cached_ai_analysis(graph.id, metrics_key, AI_PROMPT_TOKEN_BUDGET, data_version) is not None:
+                continue
+            ai_response = openai_connection(build_ai_prompt(graph, AI_PROMPT_TOKEN_BUDGET))
+            if ai_response.startswith("Error calling OpenAI"):
+                logger.warning(f"Skipping AI precompute for graph {graph.id}: {ai_response}")
+                continue
+            store_ai_analysis(graph.id, metrics_key, AI_PROMPT_TOKEN_BUDGET, data_version, ai_response)
+            refreshed += 1
+        logger.info(f"Precomputed AI analyses for {refreshed} graphs")
+
+def schedule_ai_precompute(user_id=None):
+    """Queue a background refresh of cached AI analyses after a successful sync"""
+    if not AI_PRECOMPUTE_AFTER_SYNC:
+        return
+    try:
+        scheduler.add_job(
+            id='ai_precompute_analyses',
+            func=precompute_ai_analyses,
+            trigger='date',
+            replace_existing=True,
+            misfire_grace_time=3600
+        )
+    except Exception as e:
+        logger.error(f"Failed to schedule AI precompute: {str(e)}")
+
+oura_sync_manager.post_sync_hooks.append(schedule_ai_precompute)
+fitbit_sync_manager.post_sync_hooks.append(schedule_ai_precompute)
 
 @app.route('/api/datapoints', methods=['POST'])
 def add_data_points():
@@ -498,43 +822,152 @@ def add_data_points():
         if not graph:
             return jsonify({'error': 'Graph not found'}), 404
 
-        added_points = []
-        for point in data_points:
-            date = datetime.strptime(point['date'], '%Y-%m-%d').date()
-            new_point = DataPoint(
-                graph_id=graph_id,
-                date=date,
-                metric_name=point['metric_name'],
-                value=float(point['value'])
-            )
-            db.session.add(new_point)
-            added_points.append({
-                'date': date.isoformat(),
-                'metric_name': point['metric_name'],
-                'value': float(point['value'])
-            })
+        # Validate the whole payload in one pass before writing anything
+        parsed, errors = parse_data_points(data_points)
+        if errors:
+            return jsonify({'error': 'Invalid data points', 'invalid': errors}), 400
 
+        result = bulk_insert_data_points(parsed, graph_id=graph_id)
         db.session.commit()
         return jsonify({
             'message': 'Data points added successfully',
-            'data_points': added_points
+            'inserted': result['inserted'],
+            'skipped': result['skipped'],
+            'data_points': format_inserted_rows(result['rows'])
         }), 201
 
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/import/data-points', methods=['POST'])
+def import_data_points_file():
+    """Bulk import data points from an uploaded CSV or NDJSON file"""
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'error': 'No file provided'}), 400
+
+    # Infer the format from the file name unless given explicitly
+    fmt = (request.form.get('format') or '').lower()
+    if not fmt:
+        filename = (upload.filename or '').lower()
+        if filename.endswith('.csv'):
+            fmt = 'csv'
+        elif filename.endswith(('.ndjson', '.jsonl')):
+            fmt = 'ndjson'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Format must be csv or ndjson'}), 400
+
+    graph_id = request.form.get('graph_id', type=int)
+    if graph_id is not None and not Graph.query.get(graph_id):
+        return jsonify({'error': 'Graph not found'}), 404
+
+    try:
+        # Werkzeug spools large uploads to disk, so the file is read in batches from there
+        result = import_data_points(upload.stream, fmt, graph_id=graph_id)
+        db.session.commit()
+        return jsonify(result), 201
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error importing data points: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to import data points'}), 500
+
+@app.route('/api/import/apple-health', methods=['POST'])
+def import_apple_health():
+    """Import an Apple Health export.xml (or the export.zip it comes in)"""
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'error': 'No file provided'}), 400
+
+    try:
+        result = import_apple_health_export(upload.stream, upload.filename or '')
+        db.session.commit()
+        return jsonify(result), 201
+    except (ValueError, ET.ParseError, zipfile.BadZipFile) as e:
+        db.session.rollback()
+        return jsonify({'error': f'Invalid Apple Health export: {str(e)}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error importing Apple Health export: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to import Apple Health export'}), 500
+
+@app.route('/api/import/garmin', methods=['POST'])
+def import_garmin():
+    """Import a Garmin Connect data export zip"""
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'error': 'No file provided'}), 400
+
+    # Workers open the archive by path, so spool the upload to a temp file
+    fd, archive_path = tempfile.mkstemp(suffix='.zip')
+    os.close(fd)
+    try:
+        upload.save(archive_path)
+        result = import_garmin_export(archive_path)
+        db.session.commit()
+        return jsonify(result), 201
+    except zipfile.BadZipFile as e:
+        db.session.rollback()
+        return jsonify({'error': f'Invalid Garmin export: {str(e)}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error importing Garmin export: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to import Garmin export'}), 500
+    finally:
+        os.remove(archive_path)
+
+@app.route('/api/export/data-points', methods=['GET'])
+def export_data_points():
+    """
+    Stream data points as CSV, NDJSON or Parquet
+
+    Query params: format (csv|ndjson|parquet), metric (repeatable or
+    comma-separated), start, end (YYYY-MM-DD) and graph_id.
+    """
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'Format must be csv, ndjson or parquet'}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export requires the pyarrow package'}), 400
+
+    metrics = [name.strip() for value in request.args.getlist('metric') for name in value.split(',') if name.strip()]
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    filters = {
+        'metrics': metrics,
+        'start': start,
+        'end': end,
+        'graph_id': request.args.get('graph_id', type=int)
+    }
+
+    response = Response(stream_with_context(stream_export(fmt, **filters)), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(fmt, filters)}"'
+    return response
+
 @app.route('/api/metrics', methods=['GET'])
 def get_available_metrics():
     """Get all available metrics without creating a temporary graph"""
     try:
-        # Get all unique metrics from the database
-        metrics = db.session.query(DataPoint.metric_name).distinct().all()
-        metrics = [metric[0] for metric in metrics]
-        metrics.sort()
-        
+        # Metric names come from the catalog maintained by ingest
+        return jsonify({
+            'metrics': list_metric_names()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/metrics/catalog', methods=['GET'])
+def get_metric_catalog():
+    """Get source, unit, row count, date range and latest value for every metric"""
+    try:
+        entries = get_catalog_entries()
         return jsonify({
-            'metrics': metrics
+            'metrics': [catalog_entry_to_dict(entries[name]) for name in sorted(entries)]
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -550,32 +983,204 @@ def api_init_explorer():
     db.session.add(temp_graph)
     db.session.commit()
     
-    # Get all unique metrics from the database
-    metrics = db.session.query(DataPoint.metric_name).distinct().all()
-    metrics = [metric[0] for metric in metrics]
-    metrics.sort()
-    
     return jsonify({
         'temp_graph_id': temp_graph.id,
-        'metrics': metrics
+        'metrics': list_metric_names()
     })
 
 @app.route('/api/metric-data/<string:metric>', methods=['GET'])
 def api_get_metric_data(metric):
-    # Get all data points for a specific metric
-    data_points = DataPoint.query.filter_by(metric_name=metric).order_by(DataPoint.date).all()
-    
-    plot_data = []
-    for dp in data_points:
-        plot_data.append({
-            'x': dp.date.strftime("%Y-%m-%d"),
-            'y': dp.value
-        })
+    """
+    Data points of a metric, ordered by date
     
-    return jsonify({
-        'metric': metric,
-        'data': plot_data
-    })
+    Query params:
+        format: points (default, [{"x", "y"}]), columnar ({"start", "offsets",
+                "values"}), binary (packed arrays, see pack_series) or arrow
+                (Arrow IPC stream, needs pyarrow)
+        start, end: Inclusive YYYY-MM-DD bounds (default: whole history)
+        limit: Page size in points; the response then carries
+               next_page_token (X-Next-Page-Token for binary/arrow), passed
+               back as page_token for the next page
+    """
+    fmt = request.args.get('format', 'points').lower()
+    if fmt not in SERIES_FORMATS:
+        return jsonify({'error': f"Unsupported format '{fmt}'. Use one of: {', '.join(SERIES_FORMATS)}"}), 400
+    if fmt == 'arrow' and not parquet_available():
+        return jsonify({'error': 'Arrow output requires pyarrow to be installed'}), 400
+    try:
+        start, end, limit = parse_window_args(request.args, metric)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Unchanged since the client's copy (same data version): 304 without loading the series
+    entry = get_catalog_entries([metric]).get(metric)
+    etag = compute_etag('metric-data', metric, entry.data_version if entry else None, fmt, start, end, limit)
+
+    def build():
+        series, next_page_token = read_series_page(metric, start, end, limit)
+        if fmt == 'points':
+            return jsonify({'metric': metric, 'data': series_to_points(series), 'next_page_token': next_page_token})
+        if fmt == 'columnar':
+            return jsonify({'metric': metric, **series_to_columnar(series), 'next_page_token': next_page_token})
+        response = Response(encode_series(series, fmt), mimetype=SERIES_CONTENT_TYPES[fmt])
+        if next_page_token:
+            response.headers['X-Next-Page-Token'] = next_page_token
+        return response
+
+    return conditional_response(etag, build, last_modified=entry.updated_at if entry else None)
+
+ALIGNED_MAX_METRICS = 50
+
+def requested_metric_names(args):
+    """
+    Metric names from the metrics query param, deduplicated in order
+
+    A repeated param carries one name per value, so names may contain commas;
+    a single value is split on commas.
+    """
+    values = args.getlist('metrics')
+    if len(values) == 1:
+        values = values[0].split(',')
+    return list(dict.fromkeys(name.strip() for name in values if name.strip()))
+
+@app.route('/api/metric-data', methods=['GET'])
+def api_get_aligned_metric_data():
+    """
+    Several metrics on one shared date axis, loaded with a single query
+    
+    Query params:
+        metrics: The parameter repeated, one name each, or a single
+                 comma-separated list
+        start, end: Inclusive YYYY-MM-DD bounds (default: whole history)
+        fill: none (default; null where a metric has no value), ffill or
+              interpolate (linear in time, between a metric's own points)
+        fill_limit: Most consecutive missing dates to fill
+    
+    Returns {"metrics", "fill", "start", "offsets", "series": [{"name", "values"}]}
+    """
+    metrics = requested_metric_names(request.args)
+    if not metrics:
+        return jsonify({'error': 'metrics is required'}), 400
+    if len(metrics) > ALIGNED_MAX_METRICS:
+        return jsonify({'error': f"At most {ALIGNED_MAX_METRICS} metrics per request"}), 400
+    fill = request.args.get('fill', 'none').lower()
+    if fill not in FILL_METHODS:
+        return jsonify({'error': f"Unsupported fill '{fill}'. Use one of: {', '.join(FILL_METHODS)}"}), 400
+    fill_limit = request.args.get('fill_limit')
+    if fill_limit is not None:
+        # type=int would turn an invalid value into "no limit" instead of an error
+        if not fill_limit.isdigit() or int(fill_limit) < 1:
+            return jsonify({'error': 'fill_limit must be a positive number of dates'}), 400
+        fill_limit = int(fill_limit)
+    try:
+        start, end, _ = parse_window_args({'start': request.args.get('start'), 'end': request.args.get('end')})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    etag = compute_etag('metric-data-aligned', catalog_versions(get_catalog_entries(metrics), metrics),
+                        start, end, fill, fill_limit)
+
+    def build():
+        dates, matrix = align_series(series_cache.get_many_window(metrics, start, end), metrics, fill, fill_limit)
+        return jsonify({'metrics': metrics, 'fill': fill, **aligned_to_columnar(dates, matrix, metrics)})
+
+    return conditional_response(etag, build)
+
+CORRELATION_MAX_METRICS = 200
+
+def parse_number_arg(name, default, kind=int):
+    """
+    Query param converted with kind (int or float), default when absent
+
+    Unlike request.args.get(..., type=int), a malformed value raises
+    ValueError instead of silently falling back to the default.
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return kind(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name} '{value}'")
+
+@app.route('/api/correlations', methods=['GET'])
+def api_get_correlations():
+    """
+    Pearson, Spearman and lagged cross-correlations between metrics
+    
+    Query params:
+        metrics: Comma-separated metric names (default: every metric in the catalog)
+        start, end: Inclusive YYYY-MM-DD bounds (default: whole history)
+        max_lag: Largest lag in days for the lagged correlations (default 7)
+        min_periods: Fewest shared days for a coefficient (default CORRELATION_MIN_PERIODS)
+    
+    See correlation_report for the response. Reports are cached per data
+    version of the metrics, so repeated requests skip the computation.
+    """
+    try:
+        metrics = requested_metric_names(request.args) or list_metric_names()
+        if len(metrics) > CORRELATION_MAX_METRICS:
+            return jsonify({'error': f"At most {CORRELATION_MAX_METRICS} metrics per request"}), 400
+        try:
+            max_lag = parse_number_arg('max_lag', 7)
+            min_periods = parse_number_arg('min_periods', CORRELATION_MIN_PERIODS)
+            start, end, _ = parse_window_args({'start': request.args.get('start'), 'end': request.args.get('end')})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not 0 <= max_lag <= CORRELATION_MAX_LAG:
+            return jsonify({'error': f"max_lag must be between 0 and {CORRELATION_MAX_LAG}"}), 400
+        if min_periods < 2:
+            return jsonify({'error': 'min_periods must be at least 2'}), 400
+
+        key = (
+            tuple(metrics), tuple(catalog_versions(get_catalog_entries(metrics), metrics)),
+            start, end, max_lag, min_periods
+        )
+
+        def build():
+            report = report_cache.get_or_compute(key, lambda: correlation_report(
+                series_cache.get_many_window(metrics, start, end), metrics, max_lag, min_periods
+            ))
+            return jsonify(report)
+
+        return conditional_response(compute_etag('correlations', key), build)
+    except Exception as e:
+        logger.error(f"Correlation report failed: {e}", exc_info=True)
+        return jsonify({'error': 'Failed to compute correlations'}), 500
+
+@app.route('/api/metrics/<string:metric>/periods', methods=['GET'])
+def api_get_metric_periods(metric):
+    """
+    Highest and lowest non-overlapping periods of a metric's history
+    
+    Query params:
+        days: Window length in calendar days (default 7, the benchmark window)
+        k: Periods to return on each side (default 3)
+        min_coverage: Fraction of a window's days that need data (default 0.5)
+        start, end: Inclusive YYYY-MM-DD bounds of the scan (default: whole history)
+    
+    See scan_periods for the response.
+    """
+    try:
+        days = parse_number_arg('days', 7)
+        k = parse_number_arg('k', 3)
+        min_coverage = parse_number_arg('min_coverage', DEFAULT_MIN_COVERAGE, float)
+        start, end, _ = parse_window_args({'start': request.args.get('start'), 'end': request.args.get('end')})
+
+        entry = get_catalog_entries([metric]).get(metric)
+        etag = compute_etag('metric-periods', metric, entry.data_version if entry else None,
+                            days, k, min_coverage, start, end)
+
+        def build():
+            series = series_cache.get_many_window([metric], start, end)[metric]
+            return jsonify({'metric': metric, **scan_periods(series, days, k, min_coverage)})
+
+        return conditional_response(etag, build, last_modified=entry.updated_at if entry else None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Period scan failed for {metric}: {e}", exc_info=True)
+        return jsonify({'error': 'Failed to scan periods'}), 500
 
 @app.route('/api/explorer/save', methods=['POST'])
 def api_save_explorer():
@@ -587,8 +1192,14 @@ def api_save_explorer():
     if not temp_graph:
         return jsonify({'error': 'Temporary graph not found'}), 404
     
+    try:
+        default_window_days = parse_default_window_days(data.get('default_window_days'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     # Store tracked metrics instead of copying data points
     temp_graph.tracked_metrics = json.dumps(metrics_list)
+    temp_graph.default_window_days = default_window_days
     temp_graph.is_temporary = False
     db.session.commit()
     
@@ -701,14 +1312,14 @@ def get_oura_status():
                 'end_date': sync.end_date.strftime('%Y-%m-%d') if sync.end_date else None,
                 'records_imported': sync.records_imported,
                 'error_message': sync.error_message,
-                'started_at': sync.started_at.isoformat() if sync.started_at else None,
-                'completed_at': sync.completed_at.isoformat() if sync.completed_at else None
+                'started_at': sync.started_at,
+                'completed_at': sync.completed_at
             })
         
         return jsonify({
             'has_token': bool(user.oura_api_token),
             'token': '********************************' if user.oura_api_token else None,
-            'last_sync': user.last_oura_sync.isoformat() if user.last_oura_sync else None,
+            'last_sync': user.last_oura_sync,
             'sync_frequency': user.sync_frequency or 'manual',
             'recent_syncs': sync_history
         })
@@ -776,9 +1387,11 @@ def sync_oura_now():
                     user.last_oura_sync = datetime.now(timezone.utc)
                     db.session.commit()
                 
+                schedule_ai_precompute(user.id)
+                
                 return jsonify({
                     'message': 'Oura data synced successfully',
-                    'last_sync': user.last_oura_sync.isoformat(),
+                    'last_sync': user.last_oura_sync,
                     'records_imported': records_imported,
                     'sync_log_id': sync_log_id
                 })
@@ -860,8 +1473,8 @@ def get_oura_sync_history():
                 'end_date': sync.end_date.strftime('%Y-%m-%d') if sync.end_date else None,
                 'records_imported': sync.records_imported,
                 'error_message': sync.error_message,
-                'started_at': sync.started_at.isoformat() if sync.started_at else None,
-                'completed_at': sync.completed_at.isoformat() if sync.completed_at else None,
+                'started_at': sync.started_at,
+                'completed_at': sync.completed_at,
                 'duration_seconds': (sync.completed_at - sync.started_at).total_seconds() if sync.completed_at and sync.started_at else None
             })
         
@@ -974,7 +1587,7 @@ def get_detailed_sync_status():
         basic_status = {
             'has_token': bool(user.oura_api_token),
             'token': '********************************' if user.oura_api_token else None,
-            'last_sync': user.last_oura_sync.isoformat() if user.last_oura_sync else None,
+            'last_sync': user.last_oura_sync,
             'sync_frequency': user.sync_frequency or 'manual',
         }
         
@@ -1084,9 +1697,9 @@ def get_fitbit_status():
         return jsonify({
             'connected': bool(user.fitbit_access_token),
             'has_token': bool(user.fitbit_access_token),
-            'last_sync': user.last_fitbit_sync.isoformat() if user.last_fitbit_sync else None,
+            'last_sync': user.last_fitbit_sync,
             'user_id': user.fitbit_user_id,
-            'token_expires_at': user.fitbit_token_expires_at.isoformat() if user.fitbit_token_expires_at else None
+            'token_expires_at': user.fitbit_token_expires_at
         })
         
     except Exception as e:
@@ -1189,16 +1802,13 @@ def sync_fitbit_steps_only():
         if existing_dp:
             # Update existing
             existing_dp.value = float(steps)
+            db.session.flush()
+            refresh_catalog(['fitbit_steps'])
             logger.debug(f"Updated existing steps record: {steps}")
         else:
             # Create new
-            new_dp = DataPoint(
-                date=today,
-                metric_name='fitbit_steps',
-                value=float(steps),
-                graph_id=fitbit_graph.id
-            )
-            db.session.add(new_dp)
+            parsed, _ = parse_data_points([{'date': today.isoformat(), 'metric_name': 'fitbit_steps', 'value': steps}])
+            bulk_insert_data_points(parsed, fitbit_graph.id, daily=True)
             logger.debug(f"Created new steps record: {steps}")
         
         db.session.commit()
@@ -1335,20 +1945,18 @@ def debug_fitbit():
             return jsonify({'error': 'No user found'}), 404
         
         # Check database for Fitbit data
-        fitbit_data_count = DataPoint.query.filter(DataPoint.metric_name.like('fitbit_%')).count()
-        fitbit_metrics = db.session.query(DataPoint.metric_name).filter(
-            DataPoint.metric_name.like('fitbit_%')
-        ).distinct().all()
+        fitbit_data_count = count_data_points(source='fitbit')
+        fitbit_metrics = list_metric_names(source='fitbit')
         
         return jsonify({
             'user_id': user.id,
             'has_access_token': bool(user.fitbit_access_token),
             'has_refresh_token': bool(user.fitbit_refresh_token),
             'fitbit_user_id': user.fitbit_user_id,
-            'last_sync': user.last_fitbit_sync.isoformat() if user.last_fitbit_sync else None,
-            'token_expires_at': user.fitbit_token_expires_at.isoformat() if user.fitbit_token_expires_at else None,
+            'last_sync': user.last_fitbit_sync,
+            'token_expires_at': user.fitbit_token_expires_at,
             'data_points_count': fitbit_data_count,
-            'available_metrics': [metric[0] for metric in fitbit_metrics],
+            'available_metrics': fitbit_metrics,
             'access_token_preview': user.fitbit_access_token[:20] + '...' if user.fitbit_access_token else None
         })
         
@@ -1364,7 +1972,8 @@ def get_graph_details(graph_id):
             'name': graph.name,
             'description': graph.description,
             'is_temporary': graph.is_temporary,
-            'tracked_metrics': graph.tracked_metrics
+            'tracked_metrics': graph.tracked_metrics,
+            'default_window_days': graph.default_window_days
         })
     except Exception as e:
         return jsonify({'error': 'Graph not found'}), 404
@@ -1381,6 +1990,11 @@ def update_graph_details(graph_id):
             graph.description = data['description']
         if 'tracked_metrics' in data:
             graph.tracked_metrics = json.dumps(data['tracked_metrics'])
+        if 'default_window_days' in data:
+            try:
+                graph.default_window_days = parse_default_window_days(data['default_window_days'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         
         db.session.commit()
         
@@ -1390,7 +2004,8 @@ def update_graph_details(graph_id):
                 'id': graph.id,
                 'name': graph.name,
                 'description': graph.description,
-                'tracked_metrics': graph.tracked_metrics
+                'tracked_metrics': graph.tracked_metrics,
+                'default_window_days': graph.default_window_days
             }
         })
     except Exception as e:
@@ -1424,6 +2039,53 @@ def convert_graph_to_dynamic(graph_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/admin/openai-stats', methods=['GET'])
+def get_openai_stats():
+    """Get OpenAI call counts, token usage, latency percentiles and cache hits"""
+    try:
+        stats = openai_client.stats.snapshot()
+        stats['limits'] = {
+            'max_requests_per_minute': openai_client.limiter.max_requests,
+            'max_tokens_per_minute': openai_client.limiter.max_tokens,
+            'timeout_seconds': openai_client.timeout,
+            'max_retries': openai_client.max_retries
+        }
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/openai-stats', methods=['DELETE'])
+def reset_openai_stats():
+    """Reset the OpenAI usage counters"""
+    openai_client.stats.reset()
+    return jsonify({'message': 'OpenAI stats reset'})
+
+@app.route('/api/admin/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss counters and size of the in-process caches, and request coalescing counts"""
+    try:
+        return jsonify({
+            'pid': os.getpid(),
+            'series': series_cache.stats(),
+            'latest_values': latest_values.stats(),
+            'correlations': report_cache.stats(),
+            'coalescing': coalescing_stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/cache-stats', methods=['DELETE'])
+def reset_cache_stats():
+    """Reset the cache counters; ?clear=true also empties the caches"""
+    if request.args.get('clear', 'false').lower() == 'true':
+        series_cache.invalidate()
+        latest_values.invalidate()
+    series_cache.reset_stats()
+    latest_values.reset_stats()
+    report_cache.reset_stats()
+    reset_coalescing_stats()
+    return jsonify({'message': 'Cache stats reset'})
+
 @app.route('/api/admin/convert-all-graphs', methods=['POST'])
 def convert_all_graphs_to_dynamic():
     try:
@@ -1500,15 +2162,15 @@ def get_experiments():
                 'title': exp.title,
                 'description': exp.description,
                 'period': exp.period,
-                'start_date': exp.start_date.isoformat() if exp.start_date else None,
-                'end_date': exp.end_date.isoformat() if exp.end_date else None,
+                'start_date': exp.start_date,
+                'end_date': exp.end_date,
                 'driver': exp.driver,
                 'metric_of_interest': exp.metric_of_interest,
                 'benchmark': exp.benchmark,
                 'icon': exp.icon,
                 'icon_color': exp.icon_color,
-                'created_at': exp.created_at.isoformat(),
-                'updated_at': exp.updated_at.isoformat()
+                'created_at': exp.created_at,
+                'updated_at': exp.updated_at
             })
         
         return jsonify(experiments_data)
@@ -1516,38 +2178,51 @@ def get_experiments():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/experiments/with-stats', methods=['GET'])
+@coalesce(stale_while_revalidate=COALESCE_STALE_SECONDS)
 def get_experiments_with_stats():
     """Get all experiments with their stats in a single request to avoid N+1 queries"""
     try:
         experiments = Experiment.query.order_by(Experiment.created_at.desc()).all()
-        experiments_data = []
-        
-        for exp in experiments:
-            # Calculate stats for each experiment
-            stats = calculate_experiment_stats(exp)
-            
-            experiments_data.append({
-                'id': exp.id,
-                'title': exp.title,
-                'description': exp.description,
-                'period': exp.period,
-                'start_date': exp.start_date.isoformat() if exp.start_date else None,
-                'end_date': exp.end_date.isoformat() if exp.end_date else None,
-                'driver': exp.driver,
-                'metric_of_interest': exp.metric_of_interest,
-                'benchmark': exp.benchmark,
-                'icon': exp.icon,
-                'icon_color': exp.icon_color,
-                'created_at': exp.created_at.isoformat(),
-                'updated_at': exp.updated_at.isoformat(),
-                'stats': stats
-            })
-        
-        return jsonify(experiments_data)
+        # Stats change with the experiments, their metrics' data and (for open experiments) the date
+        metrics = {exp.metric_of_interest for exp in experiments if exp.metric_of_interest}
+        etag = compute_etag(
+            'experiments-with-stats',
+            [(exp.id, exp.updated_at) for exp in experiments],
+            catalog_versions(get_catalog_entries(metrics), metrics),
+            date.today()
+        )
+        return conditional_response(etag, lambda: jsonify(build_experiments_with_stats(experiments)))
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def build_experiments_with_stats(experiments):
+    """Every experiment with its calculated stats"""
+    experiments_data = []
+    
+    for exp in experiments:
+        # Calculate stats for each experiment
+        stats = calculate_experiment_stats(exp)
+        
+        experiments_data.append({
+            'id': exp.id,
+            'title': exp.title,
+            'description': exp.description,
+            'period': exp.period,
+            'start_date': exp.start_date,
+            'end_date': exp.end_date,
+            'driver': exp.driver,
+            'metric_of_interest': exp.metric_of_interest,
+            'benchmark': exp.benchmark,
+            'icon': exp.icon,
+            'icon_color': exp.icon_color,
+            'created_at': exp.created_at,
+            'updated_at': exp.updated_at,
+            'stats': stats
+        })
+    
+    return experiments_data
+
 @app.route('/api/experiments', methods=['POST'])
 def create_experiment():
     try:
@@ -1587,15 +2262,15 @@ def create_experiment():
                 'title': experiment.title,
                 'description': experiment.description,
                 'period': experiment.period,
-                'start_date': experiment.start_date.isoformat() if experiment.start_date else None,
-                'end_date': experiment.end_date.isoformat() if experiment.end_date else None,
+                'start_date': experiment.start_date,
+                'end_date': experiment.end_date,
                 'driver': experiment.driver,
                 'metric_of_interest': experiment.metric_of_interest,
                 'benchmark': experiment.benchmark,
                 'icon': experiment.icon,
                 'icon_color': experiment.icon_color,
-                'created_at': experiment.created_at.isoformat(),
-                'updated_at': experiment.updated_at.isoformat()
+                'created_at': experiment.created_at,
+                'updated_at': experiment.updated_at
             }
         }), 201
     except Exception as e:
@@ -1611,15 +2286,15 @@ def get_experiment(experiment_id):
             'title': experiment.title,
             'description': experiment.description,
             'period': experiment.period,
-            'start_date': experiment.start_date.isoformat() if experiment.start_date else None,
-            'end_date': experiment.end_date.isoformat() if experiment.end_date else None,
+            'start_date': experiment.start_date,
+            'end_date': experiment.end_date,
             'driver': experiment.driver,
             'metric_of_interest': experiment.metric_of_interest,
             'benchmark': experiment.benchmark,
             'icon': experiment.icon,
             'icon_color': experiment.icon_color,
-            'created_at': experiment.created_at.isoformat(),
-            'updated_at': experiment.updated_at.isoformat()
+            'created_at': experiment.created_at,
+            'updated_at': experiment.updated_at
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 404
@@ -1668,15 +2343,15 @@ def update_experiment(experiment_id):
                 'title': experiment.title,
                 'description': experiment.description,
                 'period': experiment.period,
-                'start_date': experiment.start_date.isoformat() if experiment.start_date else None,
-                'end_date': experiment.end_date.isoformat() if experiment.end_date else None,
+                'start_date': experiment.start_date,
+                'end_date': experiment.end_date,
                 'driver': experiment.driver,
                 'metric_of_interest': experiment.metric_of_interest,
                 'benchmark': experiment.benchmark,
                 'icon': experiment.icon,
                 'icon_color': experiment.icon_color,
-                'created_at': experiment.created_at.isoformat(),
-                'updated_at': experiment.updated_at.isoformat()
+                'created_at': experiment.created_at,
+                'updated_at': experiment.updated_at
             }
         })
     except Exception as e:
@@ -1687,6 +2362,7 @@ def update_experiment(experiment_id):
 def delete_experiment(experiment_id):
     try:
         experiment = Experiment.query.get_or_404(experiment_id)
+        ExperimentResult.query.filter_by(experiment_id=experiment_id).delete()  # Delete stored results
         db.session.delete(experiment)
         db.session.commit()
         
@@ -1787,7 +2463,7 @@ def get_experiment_datapoints(experiment_id):
 
 @app.route('/api/experiments/<int:experiment_id>/complete', methods=['POST'])
 def complete_experiment(experiment_id):
-    """Complete an experiment with selected data points"""
+    """Complete an experiment with selected data points and store its statistics"""
     try:
         experiment = Experiment.query.get_or_404(experiment_id)
         data = request.get_json()
@@ -1797,22 +2473,28 @@ def complete_experiment(experiment_id):
         
         included_datapoints = data.get('included_datapoints', [])
         final_average = data.get('final_average')
+        if not isinstance(included_datapoints, list):
+            return jsonify({'error': 'included_datapoints must be a list'}), 400
+        total_datapoints = data.get('total_datapoints', len(included_datapoints))
+        if final_average is not None and (isinstance(final_average, bool) or not isinstance(final_average, (int, float))):
+            return jsonify({'error': 'final_average must be a number'}), 400
+        if isinstance(total_datapoints, bool) or not isinstance(total_datapoints, int) \
+                or total_datapoints < len(included_datapoints):
+            return jsonify({'error': 'total_datapoints must be a whole number no smaller than the included data points'}), 400
         
         # Update experiment end date to today if not already set
         if not experiment.end_date:
             experiment.end_date = date.today()
         
-        # Store completion data (you might want to add fields to track this)
         completion_data = {
             'completed_at': datetime.now().isoformat(),
             'included_datapoints_count': len(included_datapoints),
             'final_average': final_average,
-            'excluded_datapoints_count': data.get('total_datapoints', len(included_datapoints)) - len(included_datapoints)
+            'excluded_datapoints_count': total_datapoints - len(included_datapoints)
         }
         
-        # You could store this in a new field if you add one to the model
-        # For now, we'll just log it
-        logger.info(f"Experiment {experiment_id} completed")
+        result = store_experiment_result(experiment, included_datapoints, completion_data)
+        logger.info(f"Experiment {experiment_id} completed: p={result.p_value}, effect size={result.effect_size}")
         
         db.session.commit()
         
@@ -1821,6 +2503,7 @@ def complete_experiment(experiment_id):
             'message': 'Experiment completed successfully',
             'experiment_id': experiment_id,
             'completion_data': completion_data,
+            'result': serialize_experiment_result(result),
             'experiment': {
                 'id': experiment.id,
                 'title': experiment.title,
@@ -1830,10 +2513,90 @@ def complete_experiment(experiment_id):
             }
         })
         
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/experiments/<int:experiment_id>/results', methods=['GET'])
+def get_experiment_results(experiment_id):
+    """Statistics stored when the experiment was completed"""
+    try:
+        Experiment.query.get_or_404(experiment_id)
+        result = ExperimentResult.query.filter_by(experiment_id=experiment_id).first()
+        # result is null until the experiment is completed
+        return jsonify({
+            'experiment_id': experiment_id,
+            'result': serialize_experiment_result(result) if result else None
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def store_experiment_result(experiment, included_datapoints, completion_data):
+    """
+    Analyse the data points kept at completion against the benchmark period
+    
+    Values are read from the stored series for the included dates, so the
+    result reflects the database rather than what the client sent. Replaces
+    any earlier result of the experiment (the caller commits).
+    """
+    metric_name = experiment.metric_of_interest
+    included_dates = set()
+    for point in included_datapoints:
+        try:
+            included_dates.add(datetime.strptime(point['date'], '%Y-%m-%d').date())
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Invalid included data point: {point!r}")
+    
+    dates, values = series_cache.window(metric_name, experiment.start_date, experiment.end_date)
+    kept = [(d, v) for d, v in zip(dates.tolist(), values.tolist()) if d in included_dates and v == v]
+    
+    period = benchmark_period(experiment)
+    if period is None:
+        baseline = []
+    else:
+        baseline = series_cache.window(metric_name, period[0], period[1], include_end=False)[1]
+    
+    stats = analyze_experiment(baseline, [v for _, v in kept])
+    
+    ExperimentResult.query.filter_by(experiment_id=experiment.id).delete()
+    result = ExperimentResult(
+        experiment_id=experiment.id,
+        metric_name=metric_name,
+        baseline_period=f"{period[0]} to {period[1]}" if period else None,
+        included_datapoints=json.dumps([{'date': d.isoformat(), 'value': v} for d, v in kept]),
+        excluded_count=max(completion_data['excluded_datapoints_count'], 0),
+        final_average=completion_data['final_average'],
+        **stats
+    )
+    db.session.add(result)
+    return result
+
+def serialize_experiment_result(result):
+    return {
+        'metric_name': result.metric_name,
+        'baseline_period': result.baseline_period,
+        'baseline_count': result.baseline_count,
+        'baseline_mean': result.baseline_mean,
+        'treatment_count': result.treatment_count,
+        'treatment_mean': result.treatment_mean,
+        'difference': result.difference,
+        'relative_change': result.relative_change,
+        'effect_size': result.effect_size,
+        'ci_low': result.ci_low,
+        'ci_high': result.ci_high,
+        'confidence': result.confidence,
+        'p_value': result.p_value,
+        'resamples': result.resamples,
+        'method_version': result.method_version,
+        'included_datapoints': json.loads(result.included_datapoints),
+        'excluded_count': result.excluded_count,
+        'final_average': result.final_average,
+        'created_at': result.created_at
+    }
+
 @app.route('/api/experiments/<int:experiment_id>/table-data', methods=['GET'])
 def get_experiment_table_data(experiment_id):
     """Get structured table data for an experiment"""
@@ -1878,14 +2641,10 @@ def get_experiment_table_data(experiment_id):
                 current_date += timedelta(days=1)
         
         # Get data points for the date range
-        datapoints = DataPoint.query.filter(
-            DataPoint.metric_name == metric_name,
-            DataPoint.date >= start_date,
-            DataPoint.date <= end_date
-        ).all()
+        dates, values = series_cache.window(metric_name, start_date, end_date)
         
-        # Create lookup for existing data points
-        data_lookup = {dp.date: dp.value for dp in datapoints}
+        # Create lookup for existing data points (NaN, which != itself, marks a missing value)
+        data_lookup = {d: v for d, v in zip(dates.tolist(), values.tolist()) if v == v}
         
         # Build table data
         table_data = []
@@ -1922,52 +2681,41 @@ def get_experiment_table_data(experiment_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def benchmark_period(experiment):
+    """
+    (start, end) of an experiment's benchmark values, end excluded
+    
+    None for benchmark types that have no date window.
+    """
+    if experiment.benchmark == "avg-7-days":
+        # 7 days before the experiment start, or before today if it has none
+        end_date = experiment.start_date or date.today()
+        return end_date - timedelta(days=7), end_date
+    
+    # Add other benchmark types here (avg-30-days, etc.)
+    return None
+
 def calculate_benchmark(experiment):
     """Calculate benchmark value based on experiment settings"""
     try:
-        metric_name = experiment.metric_of_interest
-        benchmark_type = experiment.benchmark
-        
-        if benchmark_type == "avg-7-days":
-            # Calculate 7-day average before experiment start
-            if experiment.start_date:
-                # Use experiment start date as reference point
-                end_date = experiment.start_date
-                start_date = end_date - timedelta(days=7)
-            else:
-                # If no start date, use last 7 days from today
-                end_date = date.today()
-                start_date = end_date - timedelta(days=7)
-            
-            # Query datapoints for the metric in the benchmark period
-            datapoints = DataPoint.query.filter(
-                DataPoint.metric_name == metric_name,
-                DataPoint.date >= start_date,
-                DataPoint.date < end_date
-            ).all()
-            
-            if datapoints:
-                values = [dp.value for dp in datapoints if dp.value is not None]
-                avg_value = sum(values) / len(values) if values else None
-                return {
-                    'value': avg_value,
-                    'count': len(values),
-                    'period': f"{start_date} to {end_date}"
-                }
-            else:
-                return {
-                    'value': None,
-                    'count': 0,
-                    'period': f"{start_date} to {end_date}"
-                }
-        
-        # Add other benchmark types here (avg-30-days, etc.)
-        else:
+        period = benchmark_period(experiment)
+        if period is None:
             return {
                 'value': None,
                 'count': 0,
-                'period': f"Unsupported benchmark: {benchmark_type}"
+                'period': f"Unsupported benchmark: {experiment.benchmark}"
             }
+        
+        # Average the metric over the benchmark period (end date excluded)
+        start_date, end_date = period
+        avg_value, count = window_average(
+            series_cache.window(experiment.metric_of_interest, start_date, end_date, include_end=False)
+        )
+        return {
+            'value': avg_value,
+            'count': count,
+            'period': f"{start_date} to {end_date}"
+        }
             
     except Exception as e:
         return {
@@ -2016,27 +2764,13 @@ def calculate_current_value(experiment):
                 'period': 'No experiment dates set'
             }
         
-        # Query datapoints for the metric during the experiment period
-        datapoints = DataPoint.query.filter(
-            DataPoint.metric_name == metric_name,
-            DataPoint.date >= start_date,
-            DataPoint.date <= end_date
-        ).all()
-        
-        if datapoints:
-            values = [dp.value for dp in datapoints if dp.value is not None]
-            avg_value = sum(values) / len(values) if values else None
-            return {
-                'value': avg_value,
-                'count': len(values),
-                'period': f"{start_date} to {end_date}"
-            }
-        else:
-            return {
-                'value': None,
-                'count': 0,
-                'period': f"{start_date} to {end_date}"
-            }
+        # Average the metric over the experiment period
+        avg_value, count = window_average(series_cache.window(metric_name, start_date, end_date))
+        return {
+            'value': avg_value,
+            'count': count,
+            'period': f"{start_date} to {end_date}"
+        }
             
     except Exception as e:
         return {
@@ -2045,66 +2779,193 @@ def calculate_current_value(experiment):
             'period': f"Error: {str(e)}"
         }
 
-def create_plot_for_graph(graph_obj):
-    """Create plot data for a graph object"""
+def list_saved_graphs():
+    """Every non-temporary graph"""
+    return Graph.query.filter(or_(Graph.is_temporary==None, Graph.is_temporary==False)).all()
+
+def graphs_etag_parts(graphs):
+    """The graph fields that shape the graph list; the series come from the metric data versions"""
+    return [(g.id, g.name, g.tracked_metrics, g.default_window_days) for g in graphs]
+
+def requested_graph_window(args):
+    """
+    Window asked for with start/end query params, for every graph
+    
+    Returns (start, end), (None, None) for window=all (full history), or
+    None to use each graph's default window. Raises ValueError for bad dates.
+    """
+    if args.get('window') == 'all':
+        return None, None
+    start, end, _ = parse_window_args({'start': args.get('start'), 'end': args.get('end')})
+    if start is None and end is None:
+        return None
+    return start, end
+
+def parse_default_window_days(value):
+    """Validate a default_window_days request value (None or 0 clears it)"""
+    if value in (None, '', 0):
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError('default_window_days must be a positive number of days or null')
+    return value
+
+GRAPH_SERIES_FORMATS = ('points', 'columnar')
+
+def tracked_metric_list(graph_obj):
+    """The graph's tracked metrics, or None for legacy graphs (or unreadable JSON)"""
+    if not graph_obj.tracked_metrics:
+        return None
+    try:
+        metrics = json.loads(graph_obj.tracked_metrics)
+    except json.JSONDecodeError:
+        return None
+    return list(dict.fromkeys(metrics)) if isinstance(metrics, list) else None
+
+def build_graph_list(all_graphs=None, fmt='points', catalog=None, window=None):
+    """
+    Title, series and id of every non-temporary graph, with series encoded as fmt
+    
+    window is an explicit (start, end) for every graph; otherwise each graph
+    shows its default window (default_window_days, anchored at the newest
+    data point of its metrics in catalog).
+    """
+    if all_graphs is None:
+        all_graphs = list_saved_graphs()
+    if catalog is None and window is None and any(g.default_window_days for g in all_graphs):
+        catalog = get_catalog_entries()
+
+    # Tracked metrics are loaded with one query per distinct window and shared between graphs
+    graph_windows = {}
+    tracked_by_window = {}
+    for g in all_graphs:
+        metrics = tracked_metric_list(g)
+        graph_windows[g.id] = window or graph_window(g.default_window_days, catalog or {}, metrics or [])
+        if metrics:
+            tracked_by_window.setdefault(graph_windows[g.id], []).extend(metrics)
+    loaded_by_window = {
+        (start, end): series_cache.get_many_window(metrics, start, end)
+        for (start, end), metrics in tracked_by_window.items()
+    }
+
+    graph_list = []
+    for g in all_graphs: 
+        start, end = graph_windows[g.id]
+        graph_list.append({
+            "title": g.name,
+            "figure": create_plot_for_graph(g, loaded_by_window.get((start, end)), fmt, start, end),
+            "graph_id": g.id,
+            "window": {"start": start, "end": end}
+            })
+    return graph_list
+
+def figure_series(name, series, fmt='points'):
+    """One chart series: {"name", "data": [{"x", "y"}]} or {"name", "start", "offsets", "values"}"""
+    if fmt == 'columnar':
+        return {"name": name, **series_to_columnar(series)}
+    return {"name": name, "data": series_to_points(series)}
+
+def create_plot_for_graph(graph_obj, loaded_series=None, fmt='points', start=None, end=None):
+    """
+    Create plot data for a graph object
+    
+    Live series of tracked metrics are read through series_cache;
+    loaded_series, when given, maps metric names to series already fetched
+    for other graphs over the same window. fmt is 'points' or 'columnar';
+    start and end (inclusive, optional) limit the dates shown.
+    """
     # Check if this graph uses tracked metrics (dynamic) or static data points (legacy)
-    if graph_obj.tracked_metrics:
+    tracked_metrics_list = tracked_metric_list(graph_obj)
+    if tracked_metrics_list is not None:
         # Dynamic graph: fetch live data for tracked metrics
-        try:
-            tracked_metrics_list = json.loads(graph_obj.tracked_metrics)
-            metrics_data = {}
-            
-            for metric in tracked_metrics_list:
-                # Get all data points for this metric from any graph
-                live_points = DataPoint.query.filter_by(metric_name=metric).all()
-                sorted_points = sorted(live_points, key=lambda dp: dp.date)
-                
-                metrics_data[metric] = []
-                for dp in sorted_points:
-                    metrics_data[metric].append({
-                        "x": dp.date.strftime("%Y-%m-%d"),
-                        "y": dp.value
-                    })
-                    
-            final_series = []
-            for metric_name, data_points in metrics_data.items():
-                final_series.append({
-                    "name": metric_name,
-                    "data": data_points
-                })
-            
-            return final_series
-            
-        except (json.JSONDecodeError, AttributeError):
-            # Fall back to static data if JSON parsing fails
-            pass
+        if loaded_series is None:
+            loaded_series = {}
+        # Get all data points for metrics not loaded yet, from any graph
+        loaded_series.update(series_cache.get_many_window(
+            [m for m in tracked_metrics_list if m not in loaded_series], start, end
+        ))
+        
+        return [figure_series(metric, loaded_series[metric], fmt) for metric in tracked_metrics_list]
     
     # Legacy graph: use static data points
-    points = sorted(graph_obj.data_points, key=lambda dp: (dp.metric_name, dp.date))
-    if not points:
-        return [{
-            "name": "Empty",
-            "data": []
-        }]
-        
-    metrics_data = {}
-    for dp in points:
-        metric = dp.metric_name
-        if metric not in metrics_data:
-            metrics_data[metric] = []
-        metrics_data[metric].append({
-            "x": dp.date.strftime("%Y-%m-%d"),
-            "y": dp.value
-        })
+    graph_series = load_graph_series(graph_obj.id, start, end)
+    if not graph_series:
+        return [figure_series("Empty", empty_series(), fmt)]
     
-    final_series = []
-    for metric_name, data_points in metrics_data.items():
-        final_series.append({
-            "name": metric_name,
-            "data": data_points
-        })
+    return [figure_series(metric_name, series, fmt) for metric_name, series in graph_series.items()]
+
+def build_integrations_status(user, catalog):
+    """
+    Integration cards for the user, summarized from the metric catalog
+    
+    Args:
+        user: The current User, or None
+        catalog: Catalog entries keyed by metric name (get_catalog_entries())
+    """
+    if not user:
+        return []
 
-    return final_series
+    metrics_by_source = {}
+    points_by_source = {}
+    for entry in catalog.values():
+        metrics_by_source.setdefault(entry.source, []).append(entry.metric_name)
+        points_by_source[entry.source] = points_by_source.get(entry.source, 0) + (entry.row_count or 0)
+
+    integrations = []
+    
+    # Oura integration status - dynamically get available metrics from the catalog
+    oura_status = {
+        'name': 'Oura Ring',
+        'connected': bool(user.oura_api_token),
+        'last_sync': user.last_oura_sync,
+        'sync_frequency': user.sync_frequency or 'manual',
+        'data_points': points_by_source.get('oura', 0) if user.oura_api_token else 0,
+        'available_metrics': sorted(metrics_by_source.get('oura', [])) if user.oura_api_token else []
+    }
+    integrations.append(oura_status)
+    
+    # Fitbit integration status
+    fitbit_status = {
+        'name': 'Fitbit',
+        'connected': bool(user.fitbit_access_token),
+        'last_sync': user.last_fitbit_sync,
+        'sync_frequency': 'manual',
+        'data_points': points_by_source.get('fitbit', 0) if user.fitbit_access_token else 0,
+        'available_metrics': sorted(metrics_by_source.get('fitbit', [])) if user.fitbit_access_token else []
+    }
+    integrations.append(fitbit_status)
+    
+    # Garmin has no live sync; data arrives through /api/import/garmin
+    garmin_data_points = points_by_source.get('garmin', 0)
+    garmin_status = {
+        'name': 'Garmin Connect',
+        'connected': garmin_data_points > 0,
+        'last_sync': None,
+        'sync_frequency': 'manual',
+        'data_points': garmin_data_points,
+        'available_metrics': sorted(metrics_by_source.get('garmin', []))
+    }
+    integrations.append(garmin_status)
+    
+    # WHOOP integration (not implemented yet)
+    whoop_status = {
+        'name': 'WHOOP',
+        'connected': False,
+        'last_sync': None,
+        'sync_frequency': 'manual',
+        'data_points': 0,
+        'available_metrics': ['recovery', 'strain', 'sleep', 'hrv', 'respiratory_rate']
+    }
+    integrations.append(whoop_status)
+    return integrations
+
+def integrations_etag_parts(user):
+    """The user fields the integration cards depend on; counts come from the metric data versions"""
+    if not user:
+        return None
+    return [
+        bool(user.oura_api_token), user.last_oura_sync, user.sync_frequency,
+        bool(user.fitbit_access_token), user.last_fitbit_sync
+    ]
 
 @app.route('/api/integrations/status', methods=['GET'])
 def get_integrations_status():
@@ -2115,123 +2976,74 @@ def get_integrations_status():
         if not user:
             return jsonify({'integrations': []})
 
-        integrations = []
-        
-        # Oura integration status - dynamically get available metrics from database
-        oura_available_metrics = []
-        if user.oura_api_token:
-            # Get all unique metric names that have data points
-            oura_metrics = db.session.query(DataPoint.metric_name).distinct().all()
-            oura_available_metrics = [metric[0] for metric in oura_metrics]
-        
-        oura_status = {
-            'name': 'Oura Ring',
-            'connected': bool(user.oura_api_token),
-            'last_sync': user.last_oura_sync.isoformat() if user.last_oura_sync else None,
-            'sync_frequency': user.sync_frequency or 'manual',
-            'data_points': DataPoint.query.filter(
-                DataPoint.metric_name.in_(['average_heart_rate', 'average_hrv', 'average_breath', 
-                                         'total_sleep_duration', 'deep_sleep_duration', 'rem_sleep_duration', 'awake_time'])
-            ).count() if user.oura_api_token else 0,
-            'available_metrics': oura_available_metrics
-        }
-        integrations.append(oura_status)
-        
-        # Fitbit integration status
-        fitbit_available_metrics = []
-        if user.fitbit_access_token:
-            # Get Fitbit-specific metrics from database
-            fitbit_metrics = db.session.query(DataPoint.metric_name).filter(
-                DataPoint.metric_name.like('fitbit_%')
-            ).distinct().all()
-            fitbit_available_metrics = [metric[0] for metric in fitbit_metrics]
-        
-        fitbit_status = {
-            'name': 'Fitbit',
-            'connected': bool(user.fitbit_access_token),
-            'last_sync': user.last_fitbit_sync.isoformat() if user.last_fitbit_sync else None,
-            'sync_frequency': 'manual',
-            'data_points': DataPoint.query.filter(DataPoint.metric_name.like('fitbit_%')).count() if user.fitbit_access_token else 0,
-            'available_metrics': fitbit_available_metrics
-        }
-        integrations.append(fitbit_status)
-        
-        # Garmin integration (not implemented yet)
-        garmin_status = {
-            'name': 'Garmin Connect',
-            'connected': False,
-            'last_sync': None,
-            'sync_frequency': 'manual',
-            'data_points': 0,
-            'available_metrics': ['steps', 'heart_rate', 'sleep', 'vo2_max', 'stress']
-        }
-        integrations.append(garmin_status)
-        
-        # WHOOP integration (not implemented yet)
-        whoop_status = {
-            'name': 'WHOOP',
-            'connected': False,
-            'last_sync': None,
-            'sync_frequency': 'manual',
-            'data_points': 0,
-            'available_metrics': ['recovery', 'strain', 'sleep', 'hrv', 'respiratory_rate']
-        }
-        integrations.append(whoop_status)
-
-        return jsonify({'integrations': integrations})
+        catalog = get_catalog_entries()
+        etag = compute_etag('integrations', integrations_etag_parts(user), catalog_versions(catalog))
+        return conditional_response(etag, lambda: jsonify({'integrations': build_integrations_status(user, catalog)}))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Metrics that can be displayed on the dashboard, by source
+AVAILABLE_DASHBOARD_METRICS = {
+    'oura': [
+        {'id': 'average_hrv', 'name': 'Heart Rate Variability', 'description': 'HRV measurements for recovery', 'category': 'vital'},
+        {'id': 'average_heart_rate', 'name': 'Average Heart Rate', 'description': 'Average heart rate during sleep', 'category': 'vital'},
+        {'id': 'average_breath', 'name': 'Breathing Rate', 'description': 'Average breathing rate', 'category': 'vital'},
+        {'id': 'deep_sleep_duration', 'name': 'Deep Sleep', 'description': 'Deep sleep duration', 'category': 'mental'},
+        {'id': 'rem_sleep_duration', 'name': 'REM Sleep', 'description': 'REM sleep duration', 'category': 'mental'},
+        {'id': 'awake_time', 'name': 'Awake Time', 'description': 'Time spent awake during sleep', 'category': 'mental'},
+        {'id': 'total_sleep_duration', 'name': 'Total Sleep', 'description': 'Total sleep duration', 'category': 'mental'}
+    ],
+    'garmin': [
+        {'id': 'garmin_steps', 'name': 'Steps', 'description': 'Daily step count', 'category': 'fitness'},
+        {'id': 'garmin_resting_heart_rate', 'name': 'Resting Heart Rate', 'description': 'Daily resting heart rate', 'category': 'vital'},
+        {'id': 'garmin_sleep_duration', 'name': 'Sleep', 'description': 'Sleep duration', 'category': 'mental'},
+        {'id': 'garmin_vo2_max', 'name': 'VO2 Max', 'description': 'Cardiovascular fitness level', 'category': 'fitness'},
+        {'id': 'garmin_stress', 'name': 'Stress', 'description': 'Stress level monitoring', 'category': 'mental'}
+    ],
+    'whoop': [
+        {'id': 'recovery', 'name': 'Recovery', 'description': 'Daily recovery score', 'category': 'mental'},
+        {'id': 'strain', 'name': 'Strain', 'description': 'Daily strain score', 'category': 'fitness'},
+        {'id': 'sleep', 'name': 'Sleep', 'description': 'Sleep performance metrics', 'category': 'mental'},
+        {'id': 'hrv', 'name': 'HRV', 'description': 'Heart rate variability', 'category': 'vital'},
+        {'id': 'respiratory_rate', 'name': 'Respiratory Rate', 'description': 'Breathing rate monitoring', 'category': 'vital'}
+    ]
+}
+AVAILABLE_DASHBOARD_METRICS_ETAG = compute_etag('available', AVAILABLE_DASHBOARD_METRICS)
+
 @app.route('/api/dashboard/metrics/available', methods=['GET'])
 def get_available_dashboard_metrics():
     """Get all available metrics that can be displayed on dashboard"""
     try:
-        # Define available metrics from different sources
-        available_metrics = {
-            'oura': [
-                {'id': 'average_hrv', 'name': 'Heart Rate Variability', 'description': 'HRV measurements for recovery', 'category': 'vital'},
-                {'id': 'average_heart_rate', 'name': 'Average Heart Rate', 'description': 'Average heart rate during sleep', 'category': 'vital'},
-                {'id': 'average_breath', 'name': 'Breathing Rate', 'description': 'Average breathing rate', 'category': 'vital'},
-                {'id': 'deep_sleep_duration', 'name': 'Deep Sleep', 'description': 'Deep sleep duration', 'category': 'mental'},
-                {'id': 'rem_sleep_duration', 'name': 'REM Sleep', 'description': 'REM sleep duration', 'category': 'mental'},
-                {'id': 'awake_time', 'name': 'Awake Time', 'description': 'Time spent awake during sleep', 'category': 'mental'},
-                {'id': 'total_sleep_duration', 'name': 'Total Sleep', 'description': 'Total sleep duration', 'category': 'mental'}
-            ],
-            'garmin': [
-                {'id': 'steps', 'name': 'Steps', 'description': 'Daily step count', 'category': 'fitness'},
-                {'id': 'heart_rate', 'name': 'Heart Rate', 'description': 'Average heart rate', 'category': 'vital'},
-                {'id': 'sleep', 'name': 'Sleep', 'description': 'Sleep duration and quality', 'category': 'mental'},
-                {'id': 'vo2_max', 'name': 'VO2 Max', 'description': 'Cardiovascular fitness level', 'category': 'fitness'},
-                {'id': 'stress', 'name': 'Stress', 'description': 'Stress level monitoring', 'category': 'mental'}
-            ],
-            'whoop': [
-                {'id': 'recovery', 'name': 'Recovery', 'description': 'Daily recovery score', 'category': 'mental'},
-                {'id': 'strain', 'name': 'Strain', 'description': 'Daily strain score', 'category': 'fitness'},
-                {'id': 'sleep', 'name': 'Sleep', 'description': 'Sleep performance metrics', 'category': 'mental'},
-                {'id': 'hrv', 'name': 'HRV', 'description': 'Heart rate variability', 'category': 'vital'},
-                {'id': 'respiratory_rate', 'name': 'Respiratory Rate', 'description': 'Breathing rate monitoring', 'category': 'vital'}
-            ]
-        }
-        
-        return jsonify(available_metrics)
+        response = conditional_response(AVAILABLE_DASHBOARD_METRICS_ETAG, lambda: jsonify(AVAILABLE_DASHBOARD_METRICS))
+        # Static definitions only change with a deploy, which changes the ETag
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_CACHE_MAX_AGE
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def load_selected_metrics(user):
+    """The user's selected dashboard metrics by device ({} when none are saved)"""
+    if not user or not user.selected_dashboard_metrics:
+        return {}
+    return json.loads(user.selected_dashboard_metrics)
+
+def selected_metric_ids(selected_metrics):
+    """Metric ids from a selection whose entries are either ids or {'id': ...} objects"""
+    return [
+        metric['id'] if isinstance(metric, dict) else metric
+        for metrics in selected_metrics.values() for metric in metrics
+    ]
+
 @app.route('/api/dashboard/metrics/selected', methods=['GET'])
 def get_selected_dashboard_metrics():
     """Get user's selected dashboard metrics"""
     try:
         # For now, return a default user (in production, get from session/auth)
         user = User.query.first()
-        if not user:
-            return jsonify({'selected_metrics': {}})
-
-        selected_metrics = {}
-        if user.selected_dashboard_metrics:
-            import json
-            selected_metrics = json.loads(user.selected_dashboard_metrics)
-
-        return jsonify({'selected_metrics': selected_metrics})
+        etag = compute_etag('selected', user.selected_dashboard_metrics if user else None)
+        return conditional_response(etag, lambda: jsonify({'selected_metrics': load_selected_metrics(user)}))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -2266,160 +3078,293 @@ def save_selected_dashboard_metrics():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+TREND_STABLE_THRESHOLD = 1.0  # percent change below which a metric counts as stable
+
+def format_time_ago(time_diff):
+    """Human-readable age of a timedelta ("3 hours ago")"""
+    if time_diff.days > 0:
+        return f"{time_diff.days} day{'s' if time_diff.days > 1 else ''} ago"
+    if time_diff.seconds > 3600:
+        hours = time_diff.seconds // 3600
+        return f"{hours} hour{'s' if hours > 1 else ''} ago"
+    if time_diff.seconds > 60:
+        minutes = time_diff.seconds // 60
+        return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
+    return "Just now"
+
+def compute_trend(value, previous_value):
+    """Trend direction and a display delta versus the previous data point"""
+    if previous_value is None:
+        return 'stable', ''
+    delta = value - previous_value
+    if previous_value == 0:
+        return ('up' if delta > 0 else 'down' if delta < 0 else 'stable'), f"{delta:+g}"
+    percent = delta / abs(previous_value) * 100
+    if abs(percent) < TREND_STABLE_THRESHOLD:
+        return 'stable', f"{percent:+.1f}%"
+    return ('up' if percent > 0 else 'down'), f"{percent:+.1f}%"
+
+RECENT_METRICS_LIMIT = 5
+
+def pick_recent_entries(catalog, limit=RECENT_METRICS_LIMIT):
+    """Catalog entries of the metrics with the newest data, freshest first"""
+    return sorted(
+        (entry for entry in catalog.values() if entry.last_date),
+        key=lambda entry: (entry.last_date, entry.metric_name),
+        reverse=True
+    )[:limit]
+
+def database_now():
+    """
+    Current time on the database clock, as a naive datetime
+
+    Columns defaulting to current_timestamp hold the database's wall time
+    (the server's time zone on Postgres), so ages are measured against it
+    rather than the app server's clock.
+    """
+    now = db.session.query(db.func.current_timestamp()).scalar()
+    return now.replace(tzinfo=None) if now.tzinfo else now
+
+def last_updated_label(entry, now):
+    """
+    Time since data for a metric was last ingested ("3 hours ago")
+    
+    The catalog row is touched by every sync or upload that adds rows to it.
+    now comes from database_now().
+    """
+    if entry.updated_at:
+        return format_time_ago(now - entry.updated_at)
+    # Fallback to data date
+    return format_time_ago(now - datetime.combine(entry.last_date, datetime.min.time()))
+
+def recent_etag_parts(entries, now):
+    """Data version and relative age label of each recent metric"""
+    return [(entry.metric_name, entry.data_version, last_updated_label(entry, now)) for entry in entries]
+
+def build_recent_metrics(entries, latest, now):
+    """
+    Recent-metrics cards for the given catalog entries
+    
+    Args:
+        entries: Catalog entries from pick_recent_entries
+        latest: Latest values keyed by metric name (latest_values.get_many)
+        now: Current time from database_now()
+    """
+    # Transform the data points into the format expected by the frontend
+    recent_metrics = []
+    for entry in entries:
+        data_point = latest.get(entry.metric_name)
+        if not data_point:
+            continue
+        metric_name = entry.metric_name
+        
+        # Format the metric name for display (convert snake_case to Title Case)
+        formatted_name = metric_name.replace('_', ' ').title()
+        
+        # Handle special cases for abbreviations
+        if 'hrv' in metric_name.lower():
+            formatted_name = formatted_name.replace('Hrv', 'HRV')
+        if 'vo2' in metric_name.lower():
+            formatted_name = formatted_name.replace('Vo2', 'VO2')
+        if 'rem' in metric_name.lower():
+            formatted_name = formatted_name.replace('Rem', 'REM')
+        
+        last_updated = last_updated_label(entry, now)
+        trend, trend_value = compute_trend(data_point['value'], data_point['previous_value'])
+        
+        # Determine category based on metric name
+        category = "vital"  # default
+        if any(keyword in metric_name.lower() for keyword in ['sleep', 'rem', 'deep', 'awake']):
+            category = "mental"
+        elif any(keyword in metric_name.lower() for keyword in ['steps', 'activity', 'calorie']):
+            category = "fitness"
+        
+        recent_metrics.append({
+            'id': data_point['id'],
+            'title': formatted_name,
+            'value': data_point['value'],
+            'unit': get_metric_unit(metric_name, entry),
+            'trend': trend,
+            'trendValue': trend_value,
+            'previous_value': data_point['previous_value'],
+            'lastUpdated': last_updated,
+            'category': category,
+            'metric_name': metric_name,  # Keep original name for reference
+            'date': data_point['date']
+        })
+    return recent_metrics
+
 @app.route('/api/dashboard/metrics/recent', methods=['GET'])
 def get_recent_metrics():
     """
-    Get the 5 most recent metric entries ordered by timestamp desc
+    Get the 5 most recently updated metrics with their latest value and trend
     
-    This endpoint fetches the latest 5 data points from the DataPoint table
-    and formats them for display in the dashboard's "Recent Metrics" section.
+    Runs a constant number of queries: the metric catalog (which picks the
+    freshest metrics and records when each was last ingested), the database
+    clock the ages are measured against, and one latest-values lookup that
+    also returns the previous value for the trend.
     
     Returns:
         - recent_metrics: Array of formatted metric objects
         - count: Number of metrics returned
     """
     try:
-        # Get the 5 most recent data points from the database
-        # Order by date descending to get the newest entries first
-        recent_data_points = db.session.query(DataPoint)\
-            .order_by(DataPoint.date.desc())\
-            .limit(5)\
-            .all()
-        
-        # Transform the data points into the format expected by the frontend
-        recent_metrics = []
-        for data_point in recent_data_points:
-            # Format the metric name for display (convert snake_case to Title Case)
-            formatted_name = data_point.metric_name.replace('_', ' ').title()
-            
-            # Handle special cases for abbreviations
-            if 'hrv' in data_point.metric_name.lower():
-                formatted_name = formatted_name.replace('Hrv', 'HRV')
-            if 'vo2' in data_point.metric_name.lower():
-                formatted_name = formatted_name.replace('Vo2', 'VO2')
-            if 'rem' in data_point.metric_name.lower():
-                formatted_name = formatted_name.replace('Rem', 'REM')
-            
-            # Get the unit for this metric
-            unit = get_metric_unit(data_point.metric_name)
-            
-            # Calculate time since last sync (use sync time, not data date)
-            # Get the most recent sync time for this metric
-            latest_sync = db.session.query(SyncLog).filter(
-                SyncLog.status == 'success',
-                SyncLog.end_date >= data_point.date
-            ).order_by(SyncLog.completed_at.desc()).first()
-            
-            if latest_sync and latest_sync.completed_at:
-                time_diff = datetime.now() - latest_sync.completed_at
-                if time_diff.days > 0:
-                    last_updated = f"{time_diff.days} day{'s' if time_diff.days > 1 else ''} ago"
-                elif time_diff.seconds > 3600:
-                    hours = time_diff.seconds // 3600
-                    last_updated = f"{hours} hour{'s' if hours > 1 else ''} ago"
-                elif time_diff.seconds > 60:
-                    minutes = time_diff.seconds // 60
-                    last_updated = f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-                else:
-                    last_updated = "Just now"
-            else:
-                # Fallback to data date if no sync log found
-                time_diff = datetime.now() - datetime.combine(data_point.date, datetime.min.time())
-                if time_diff.days > 0:
-                    last_updated = f"{time_diff.days} day{'s' if time_diff.days > 1 else ''} ago"
-                elif time_diff.seconds > 3600:
-                    hours = time_diff.seconds // 3600
-                    last_updated = f"{hours} hour{'s' if hours > 1 else ''} ago"
-                elif time_diff.seconds > 60:
-                    minutes = time_diff.seconds // 60
-                    last_updated = f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-                else:
-                    last_updated = "Just now"
-            
-            # Determine category based on metric name
-            category = "vital"  # default
-            if any(keyword in data_point.metric_name.lower() for keyword in ['sleep', 'rem', 'deep', 'awake']):
-                category = "mental"
-            elif any(keyword in data_point.metric_name.lower() for keyword in ['steps', 'activity', 'calorie']):
-                category = "fitness"
+        freshest = pick_recent_entries(get_catalog_entries())
+        now = database_now() if freshest else None
+
+        def build():
+            latest = latest_values.get_many(entry.metric_name for entry in freshest)
+            recent_metrics = build_recent_metrics(freshest, latest, now)
             
-            recent_metrics.append({
-                'id': data_point.id,
-                'title': formatted_name,
-                'value': data_point.value,
-                'unit': unit,
-                'trend': 'stable',  # We could calculate this by comparing with previous values
-                'lastUpdated': last_updated,
-                'category': category,
-                'metric_name': data_point.metric_name,  # Keep original name for reference
-                'date': data_point.date.isoformat()
+            return jsonify({
+                'recent_metrics': recent_metrics,
+                'count': len(recent_metrics)
             })
         
-        return jsonify({
-            'recent_metrics': recent_metrics,
-            'count': len(recent_metrics)
-        })
+        return conditional_response(compute_etag('recent', recent_etag_parts(freshest, now)), build)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def build_metric_values(selected_metrics, catalog, latest):
+    """
+    Current value, unit and trend of every selected metric, grouped by device
+    
+    Args:
+        selected_metrics: Selection from load_selected_metrics
+        catalog: Catalog entries keyed by metric name
+        latest: Latest values covering selected_metric_ids(selected_metrics)
+    """
+    metric_values = {}
+    for device_name, metrics in selected_metrics.items():
+        device_values = {}
+        for metric in metrics:
+            # Handle both string metrics and object metrics
+            if isinstance(metric, dict):
+                metric_id = metric['id']
+            else:
+                metric_id = metric
+            
+            latest_dp = latest.get(metric_id)
+            trend, trend_value = compute_trend(latest_dp['value'], latest_dp['previous_value']) if latest_dp else ('stable', '')
+            device_values[metric_id] = {
+                'value': latest_dp['value'] if latest_dp else None,
+                'date': latest_dp['date'] if latest_dp else None,
+                'unit': get_metric_unit(metric_id, catalog.get(metric_id)),
+                'trend': trend,
+                'trendValue': trend_value
+            }
+        metric_values[device_name] = device_values
+    return metric_values
+
 @app.route('/api/dashboard/metrics/values', methods=['GET'])
 def get_dashboard_metric_values():
     """Get current values for selected dashboard metrics"""
     try:
         logger.debug("Dashboard metrics/values endpoint called")
         # Get user's selected metrics
-        user = User.query.first()
-        if not user or not user.selected_dashboard_metrics:
+        selected_metrics = load_selected_metrics(User.query.first())
+        if not selected_metrics:
             logger.debug("No user or no selected metrics")
             return jsonify({'metric_values': {}})
         
-        selected_metrics = json.loads(user.selected_dashboard_metrics)
         logger.debug(f"Selected metrics: {len(selected_metrics)} metrics")
-        metric_values = {}
-        
-        # Get latest values for each selected metric
-        for device_name, metrics in selected_metrics.items():
-            device_values = {}
-            for metric in metrics:
-                # Handle both string metrics and object metrics
-                if isinstance(metric, dict):
-                    metric_id = metric['id']
-                else:
-                    metric_id = metric
-                
-                # Get the most recent data point for this metric
-                latest_dp = DataPoint.query.filter_by(metric_name=metric_id).order_by(DataPoint.date.desc()).first()
-                if latest_dp:
-                    device_values[metric_id] = {
-                        'value': latest_dp.value,
-                        'date': latest_dp.date.isoformat(),
-                        'unit': get_metric_unit(metric_id)
-                    }
-                else:
-                    device_values[metric_id] = {
-                        'value': None,
-                        'date': None,
-                        'unit': get_metric_unit(metric_id)
-                    }
-            metric_values[device_name] = device_values
+        metric_ids = selected_metric_ids(selected_metrics)
+        catalog = get_catalog_entries(metric_ids)
+        etag = compute_etag('values', selected_metrics, catalog_versions(catalog, metric_ids))
+
+        def build():
+            # Latest values for the whole selection come from one query (or the cache)
+            latest = latest_values.get_many(metric_ids)
+            return jsonify({'metric_values': build_metric_values(selected_metrics, catalog, latest)})
         
-        return jsonify({'metric_values': metric_values})
+        return conditional_response(etag, build)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def get_metric_unit(metric_name):
-    """Get the appropriate unit for a metric"""
-    units = {
-        'average_hrv': 'ms',
-        'average_heart_rate': 'bpm',
-        'average_breath': 'rpm',
-        'deep_sleep_duration': 'min',
-        'rem_sleep_duration': 'min',
-        'awake_time': 'min',
-        'total_sleep_duration': 'min'
-    }
-    return units.get(metric_name, '')
+BOOTSTRAP_SECTIONS = ('graphs', 'integrations', 'available', 'selected', 'values', 'recent')
+
+@app.route('/api/dashboard/bootstrap', methods=['GET'])
+def get_dashboard_bootstrap():
+    """
+    Everything the dashboard needs on load, in one response
+    
+    Combines /api/graphs, /api/integrations/status and the
+    /api/dashboard/metrics/{available,selected,values,recent} endpoints.
+    The sections share their inputs: the user is loaded once, the metric
+    catalog once, and the latest values for both the selected tiles and
+    the recent-metrics card come from a single latest-values lookup.
+    Answers If-None-Match with 304 when none of those inputs changed.
+    
+    Query params:
+        sections: Comma-separated subset of graphs, integrations, available,
+                  selected, values and recent (default: all)
+        format: Series encoding of the graphs section, points or columnar
+    
+    Returns:
+        One key per requested section, holding what the matching endpoint
+        returns (lists for graphs/integrations/recent, objects otherwise)
+    """
+    try:
+        requested = request.args.get('sections')
+        sections = set(BOOTSTRAP_SECTIONS)
+        if requested:
+            sections = {section.strip() for section in requested.split(',') if section.strip()}
+            unknown = sections - set(BOOTSTRAP_SECTIONS)
+            if unknown:
+                return jsonify({'error': f"Unknown sections: {', '.join(sorted(unknown))}"}), 400
+        graph_format = request.args.get('format', 'points').lower()
+        if graph_format not in GRAPH_SERIES_FORMATS:
+            return jsonify({'error': f"Unsupported format '{graph_format}'. Use one of: {', '.join(GRAPH_SERIES_FORMATS)}"}), 400
+        try:
+            graph_window_arg = requested_graph_window(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Shared inputs, each loaded at most once and only when a section needs it
+        user = User.query.first() if sections & {'integrations', 'selected', 'values'} else None
+        catalog = get_catalog_entries() if sections & {'graphs', 'integrations', 'values', 'recent'} else {}
+        graphs = list_saved_graphs() if 'graphs' in sections else []
+        selected_metrics = load_selected_metrics(user) if sections & {'selected', 'values'} else {}
+        freshest = pick_recent_entries(catalog) if 'recent' in sections else []
+        now = database_now() if freshest else None
+
+        # The ETag covers every input, so an unchanged dashboard is answered
+        # before any series or latest values are loaded
+        etag = compute_etag(
+            'bootstrap', sorted(sections), graph_format, graph_window_arg,
+            graphs_etag_parts(graphs),
+            integrations_etag_parts(user) if 'integrations' in sections else None,
+            selected_metrics,
+            catalog_versions(catalog),
+            recent_etag_parts(freshest, now)
+        )
+
+        def build():
+            wanted = [entry.metric_name for entry in freshest]
+            if 'values' in sections:
+                wanted += selected_metric_ids(selected_metrics)
+            latest = latest_values.get_many(wanted) if wanted else {}
+
+            payload = {}
+            if 'graphs' in sections:
+                payload['graphs'] = build_graph_list(graphs, graph_format, catalog, graph_window_arg)
+            if 'integrations' in sections:
+                payload['integrations'] = build_integrations_status(user, catalog)
+            if 'available' in sections:
+                payload['available'] = AVAILABLE_DASHBOARD_METRICS
+            if 'selected' in sections:
+                payload['selected'] = selected_metrics
+            if 'values' in sections:
+                payload['values'] = build_metric_values(selected_metrics, catalog, latest)
+            if 'recent' in sections:
+                payload['recent'] = build_recent_metrics(freshest, latest, now)
+            return jsonify(payload)
+
+        return conditional_response(etag, build)
+    except Exception as e:
+        logger.error(f"Error building dashboard bootstrap: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
     port = int(os.getenv('FLASK_PORT', 5174))
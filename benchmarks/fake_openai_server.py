@@ -0,0 +1,207 @@
+"""
+Offline stand-in for the OpenAI chat-completions API
+
+Speaks enough of POST /v1/chat/completions (including stream=True) for the
+upload pipeline and AI analysis to run without network access or cost.
+Responses are generated by simple rules based on the prompt:
+
+- clarification prompts answer "clear", or a question for a configurable
+  fraction of chunks
+- structuring prompts turn every "YYYY-MM-DD ... <number><unit>" in the
+  raw notes into a JSON data point
+- anything else gets a canned analysis text
+
+Point the app at it with:
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=sk-offline python3 app.py
+
+Run standalone:
+    python3 benchmarks/fake_openai_server.py --port 8089 --latency 0.5 --jitter 0.2
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from flask import Flask, Response, jsonify, request
+
+DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+VALUE_PATTERN = re.compile(r'([A-Za-z][A-Za-z ]*?)\s*(\d+(?:\.\d+)?)\s*(kg|lbs|m|km|min|reps|sets)?\b')
+
+CANNED_ANALYSIS = (
+    "## Key patterns\n"
+    "- Your HRV trends upward on weeks with more sleep.\n"
+    "- Resting heart rate is stable with a few outliers after late workouts.\n\n"
+    "## Worth trying\n"
+    "1. Keep a consistent bedtime for two weeks and compare HRV.\n"
+    "2. Move intense training earlier in the day.\n"
+)
+
+
+class FakeOpenAIConfig:
+    """Behaviour knobs shared by all requests"""
+
+    def __init__(self, latency=0.3, jitter=0.1, clarify_rate=0.0, tokens_per_second=200.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.clarify_rate = clarify_rate
+        self.tokens_per_second = tokens_per_second
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.calls_by_kind = {}
+
+    def record(self, kind):
+        with self.lock:
+            self.calls += 1
+            self.calls_by_kind[kind] = self.calls_by_kind.get(kind, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.calls = 0
+            self.calls_by_kind = {}
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.latency + jitter)
+
+    def should_clarify(self):
+        with self.lock:
+            return self.random.random() < self.clarify_rate
+
+
+def _prompt_text(messages):
+    """Concatenate the text of the user messages"""
+    parts = []
+    for message in messages:
+        if message.get('role') != 'user':
+            continue
+        content = message.get('content', '')
+        if isinstance(content, list):
+            parts.extend(part.get('text', '') for part in content)
+        else:
+            parts.append(content)
+    return "\n".join(parts)
+
+
+def _structure_notes(prompt):
+    """Rule-based replacement for the structuring step"""
+    notes = prompt.split('Raw Notes:', 1)[-1].split('Clarifications:', 1)[0]
+    points = []
+    for line in notes.splitlines():
+        date_match = DATE_PATTERN.search(line)
+        if not date_match:
+            continue
+        rest = line[date_match.end():]
+        for name, value, unit in VALUE_PATTERN.findall(rest):
+            points.append({
+                'metric_name': name.strip().title(),
+                'value': float(value),
+                'date': date_match.group(1),
+                'unit': unit or ''
+            })
+    return json.dumps(points)
+
+
+def generate_reply(config, prompt):
+    """Pick a response kind and text for a prompt"""
+    if 'determine if they need clarification' in prompt:
+        if config.should_clarify():
+            return 'clarification', 'Does "BP" mean Bench Press or Back Pain?'
+        return 'clarification', 'clear'
+    if 'structure the raw notes' in prompt:
+        return 'structuring', _structure_notes(prompt)
+    return 'analysis', CANNED_ANALYSIS
+
+
+def create_app(config):
+    app = Flask(__name__)
+
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        body = request.get_json()
+        prompt = _prompt_text(body.get('messages', []))
+        kind, text = generate_reply(config, prompt)
+        config.record(kind)
+
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(text) // 4 + 1
+        created = int(time.time())
+
+        if body.get('stream'):
+            def events():
+                time.sleep(config.delay())
+                words = re.findall(r'\S+\s*', text)
+                per_word = 1.0 / config.tokens_per_second if config.tokens_per_second else 0
+                for word in words:
+                    chunk = {
+                        'id': 'chatcmpl-offline',
+                        'object': 'chat.completion.chunk',
+                        'created': created,
+                        'model': body.get('model'),
+                        'choices': [{'index': 0, 'delta': {'content': word}, 'finish_reason': None}]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    time.sleep(per_word)
+                yield "data: [DONE]\n\n"
+            return Response(events(), mimetype='text/event-stream')
+
+        # Simulate time-to-first-token plus generation time
+        generation_time = completion_tokens / config.tokens_per_second if config.tokens_per_second else 0
+        time.sleep(config.delay() + generation_time)
+        return jsonify({
+            'id': 'chatcmpl-offline',
+            'object': 'chat.completion',
+            'created': created,
+            'model': body.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': text},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    @app.route('/stats', methods=['GET'])
+    def stats():
+        return jsonify({'calls': config.calls, 'calls_by_kind': config.calls_by_kind})
+
+    @app.route('/stats', methods=['DELETE'])
+    def reset_stats():
+        config.reset()
+        return jsonify({'message': 'Stats reset'})
+
+    return app
+
+
+def start_in_thread(config, host='127.0.0.1', port=8089):
+    """Serve the stand-in from a daemon thread; returns the base URL for OPENAI_BASE_URL"""
+    from werkzeug.serving import make_server
+    server = make_server(host, port, create_app(config), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return f"http://{host}:{server.server_port}/v1", server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline OpenAI chat-completions stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.3, help='Base seconds before the first token')
+    parser.add_argument('--jitter', type=float, default=0.1, help='Uniform +/- seconds added to the latency')
+    parser.add_argument('--tokens-per-second', type=float, default=200.0, help='Simulated generation speed (0 = instant)')
+    parser.add_argument('--clarify-rate', type=float, default=0.0, help='Fraction of chunks that ask a clarification question')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(args.latency, args.jitter, args.clarify_rate, args.tokens_per_second, args.seed)
+    create_app(config).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
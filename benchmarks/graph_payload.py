@@ -0,0 +1,115 @@
+"""
+Benchmark for /api/graphs serialization and response size
+
+Fetches /api/graphs from a running Neuroflow API in every series format
+(points, columnar) and content coding (identity, gzip, br) and reports
+bytes on the wire and request latency. It then times encoding the points
+payload locally with the stdlib json encoder (as Flask's default provider
+does, sorted keys) and with orjson, plus gzip/brotli compression of the
+result:
+
+    python3 app.py &
+    python3 benchmarks/graph_payload.py --runs 10
+
+Seed the database with a few large graphs first (e.g. an Apple Health or
+Garmin import) so the payload is representative.
+"""
+import gzip
+import json
+import time
+import argparse
+import statistics
+
+import requests
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FORMATS = ['points', 'columnar']
+CODINGS = ['identity', 'gzip', 'br']
+
+
+def fetch(api_url, fmt, coding, timeout):
+    """One request; returns (seconds, bytes on the wire, Content-Encoding sent back)"""
+    started = time.perf_counter()
+    with requests.get(f"{api_url}/api/graphs", params={'format': fmt},
+                      headers={'Accept-Encoding': coding}, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        body = response.raw.read(decode_content=False)
+        return time.perf_counter() - started, len(body), response.headers.get('Content-Encoding', 'identity')
+
+
+def bench_wire(api_url, runs, timeout):
+    rows = []
+    for fmt in FORMATS:
+        for coding in CODINGS:
+            samples = [fetch(api_url, fmt, coding, timeout) for _ in range(runs)]
+            rows.append({
+                'format': fmt,
+                'requested': coding,
+                'sent': samples[-1][2],
+                'bytes': samples[-1][1],
+                'latency_p50': statistics.median(s[0] for s in samples),
+            })
+    return rows
+
+
+def time_call(fn, runs):
+    """Median seconds of fn() and its last result"""
+    timings = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def bench_encoding(payload, runs):
+    rows = []
+    seconds, stdlib_body = time_call(lambda: json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8'), runs)
+    rows.append(('json (stdlib, sorted)', seconds, len(stdlib_body)))
+    if orjson is not None:
+        seconds, body = time_call(lambda: orjson.dumps(payload), runs)
+        rows.append(('orjson', seconds, len(body)))
+
+    seconds, body = time_call(lambda: gzip.compress(stdlib_body, compresslevel=5), runs)
+    rows.append(('gzip -5', seconds, len(body)))
+    if brotli is not None:
+        seconds, body = time_call(lambda: brotli.compress(stdlib_body, quality=5), runs)
+        rows.append(('brotli q5', seconds, len(body)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /api/graphs serialization and bytes on the wire')
+    parser.add_argument('--api-url', default='http://localhost:5174')
+    parser.add_argument('--runs', type=int, default=5, help='Requests / encodings per measurement')
+    parser.add_argument('--timeout', type=float, default=120)
+    args = parser.parse_args()
+
+    print(f"{'format':>9} {'requested':>9} {'sent':>8} {'bytes':>11} {'p50 ms':>8}")
+    for r in bench_wire(args.api_url, args.runs, args.timeout):
+        print(f"{r['format']:>9} {r['requested']:>9} {r['sent']:>8} {r['bytes']:>11,} {r['latency_p50'] * 1000:>8.1f}")
+
+    payload = requests.get(f"{args.api_url}/api/graphs", params={'format': 'points'}, timeout=args.timeout).json()
+    points = sum(len(series.get('data', [])) for graph in payload for series in graph['figure'])
+    print(f"\nlocal encoding of the points payload ({len(payload)} graphs, {points:,} points):")
+    print(f"{'encoder':>22} {'ms':>8} {'bytes':>11}")
+    for name, seconds, size in bench_encoding(payload, args.runs):
+        print(f"{name:>22} {seconds * 1000:>8.1f} {size:>11,}")
+    if orjson is None:
+        print("(orjson not installed)")
+    if brotli is None:
+        print("(brotli not installed; pip install brotli)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark for /api/upload/process-notes and /api/ai-analyze
+
+Drives a running Neuroflow API with synthetic workout-note corpora of
+increasing size and reports chunks/sec, OpenAI calls per upload and
+request latency percentiles. Run it against the offline stand-in so no
+real OpenAI calls are made:
+
+    python3 benchmarks/fake_openai_server.py --latency 0.3 &
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=sk-offline python3 app.py &
+    python3 benchmarks/upload_pipeline.py --sizes 2000 8000 32000 --uploads 5 --concurrency 2
+
+Pass --analyze-graph <id> to also time AI analysis for an existing graph.
+"""
+import time
+import random
+import argparse
+import statistics
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+EXERCISES = [
+    ('Rowing', 'm', (2000, 10000)),
+    ('Bench Press', 'kg', (40, 110)),
+    ('Squat', 'kg', (60, 160)),
+    ('Run', 'km', (3, 21)),
+    ('Plank', 'min', (1, 5)),
+    ('Pull Ups', 'reps', (5, 20)),
+]
+
+
+def generate_notes(target_chars, seed=0):
+    """Synthetic workout log of roughly target_chars characters"""
+    rng = random.Random(seed)
+    day = date(2024, 1, 1)
+    lines = []
+    size = 0
+    while size < target_chars:
+        picks = rng.sample(EXERCISES, k=rng.randint(1, 3))
+        entries = [f"{name} {rng.randint(low, high)} {unit}" for name, unit, (low, high) in picks]
+        line = f"{day.isoformat()} " + ", ".join(entries)
+        lines.append(line)
+        size += len(line) + 1
+        day += timedelta(days=1)
+    return "\n".join(lines)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_upload(api_url, notes, timeout):
+    """One full upload, answering clarification rounds until it completes"""
+    started = time.perf_counter()
+    payload = {'notes': notes}
+    rounds = 0
+    while True:
+        rounds += 1
+        response = requests.post(f"{api_url}/api/upload/process-notes", json=payload, timeout=timeout)
+        result = response.json()
+        if response.status_code != 200:
+            return {'ok': False, 'latency': time.perf_counter() - started, 'error': result.get('error'), 'rounds': rounds}
+        if not result.get('needs_clarification'):
+            break
+        payload = {
+            'notes': notes,
+            'clarifications': "\n".join(f"Q: {q}\nA: Bench Press" for q in result['questions']),
+            'upload_session_id': result.get('upload_session_id')
+        }
+    return {
+        'ok': True,
+        'latency': time.perf_counter() - started,
+        'chunks': result.get('chunks_processed', 1),
+        'points': result.get('count', 0),
+        'rounds': rounds
+    }
+
+
+def openai_call_count(openai_url):
+    """Total calls seen by the stand-in server, or None if it is not reachable"""
+    if not openai_url:
+        return None
+    try:
+        return requests.get(f"{openai_url}/stats", timeout=5).json()['calls']
+    except requests.RequestException:
+        return None
+
+
+def bench_uploads(api_url, openai_url, size, uploads, concurrency, timeout):
+    notes_list = [generate_notes(size, seed=i) for i in range(uploads)]
+    calls_before = openai_call_count(openai_url)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda notes: run_upload(api_url, notes, timeout), notes_list))
+    elapsed = time.perf_counter() - started
+
+    calls_after = openai_call_count(openai_url)
+    succeeded = [r for r in results if r['ok']]
+    latencies = [r['latency'] for r in succeeded]
+    chunks = sum(r['chunks'] for r in succeeded)
+
+    return {
+        'size': size,
+        'uploads': uploads,
+        'failed': len(results) - len(succeeded),
+        'chunks': chunks,
+        'chunks_per_sec': chunks / elapsed if elapsed else 0,
+        'calls_per_upload': (calls_after - calls_before) / uploads if calls_before is not None and calls_after is not None else None,
+        'latency_p50': statistics.median(latencies) if latencies else None,
+        'latency_p95': percentile(latencies, 95),
+        'errors': sorted({r['error'] for r in results if not r['ok']}),
+    }
+
+
+def bench_analysis(api_url, graph_id, runs, timeout):
+    """Time AI analysis; the first run may miss the analysis cache, the rest should hit it"""
+    latencies = []
+    first_byte = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        with requests.post(f"{api_url}/api/ai-analyze/{graph_id}?stream=1", stream=True, timeout=timeout) as response:
+            for i, _chunk in enumerate(response.iter_content(chunk_size=None)):
+                if i == 0:
+                    first_byte.append(time.perf_counter() - started)
+        latencies.append(time.perf_counter() - started)
+    return {
+        'runs': runs,
+        'first_byte_p50': statistics.median(first_byte) if first_byte else None,
+        'latency_p50': statistics.median(latencies),
+        'latency_p95': percentile(latencies, 95),
+    }
+
+
+def _fmt(value, spec='.2f'):
+    return '-' if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the note upload pipeline and AI analysis')
+    parser.add_argument('--api-url', default='http://localhost:5174')
+    parser.add_argument('--openai-url', default='http://127.0.0.1:8089', help='Stand-in server root, used to count calls')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 8000, 32000, 128000], help='Corpus sizes in characters')
+    parser.add_argument('--uploads', type=int, default=5, help='Uploads per corpus size')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--analyze-graph', type=int, help='Graph ID to benchmark /api/ai-analyze with')
+    parser.add_argument('--analyze-runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'chars':>8} {'uploads':>7} {'failed':>6} {'chunks':>6} {'chunks/s':>9} {'calls/up':>8} {'p50 s':>7} {'p95 s':>7}")
+    for size in args.sizes:
+        r = bench_uploads(args.api_url, args.openai_url, size, args.uploads, args.concurrency, args.timeout)
+        print(f"{r['size']:>8} {r['uploads']:>7} {r['failed']:>6} {r['chunks']:>6} {_fmt(r['chunks_per_sec']):>9} "
+              f"{_fmt(r['calls_per_upload'], '.1f'):>8} {_fmt(r['latency_p50']):>7} {_fmt(r['latency_p95']):>7}")
+        for error in r['errors']:
+            print(f"         error: {error}")
+
+    if args.analyze_graph:
+        r = bench_analysis(args.api_url, args.analyze_graph, args.analyze_runs, args.timeout)
+        print(f"\nai-analyze graph {args.analyze_graph}: runs={r['runs']} first byte p50={_fmt(r['first_byte_p50'], '.3f')}s "
+              f"p50={_fmt(r['latency_p50'], '.3f')}s p95={_fmt(r['latency_p95'], '.3f')}s")
+
+
+if __name__ == '__main__':
+    main()
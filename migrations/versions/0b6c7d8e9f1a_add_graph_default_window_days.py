@@ -0,0 +1,26 @@
+"""Add default_window_days to graphs
+
+Revision ID: 0b6c7d8e9f1a
+Revises: 9a5b6c7d8e0f
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6c7d8e9f1a'
+down_revision = '9a5b6c7d8e0f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Days of data a graph shows by default; NULL keeps the full history.
+    # Windowed series reads use the existing ix_data_points_metric_name_date index.
+    op.add_column('graphs', sa.Column('default_window_days', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('graphs', 'default_window_days')
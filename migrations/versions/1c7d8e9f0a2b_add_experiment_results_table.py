@@ -0,0 +1,50 @@
+"""Add experiment_results table for precomputed experiment statistics
+
+Revision ID: 1c7d8e9f0a2b
+Revises: 0b6c7d8e9f1a
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c7d8e9f0a2b'
+down_revision = '0b6c7d8e9f1a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One row per completed experiment, replaced when it is completed again
+    op.create_table('experiment_results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('experiment_id', sa.Integer(), nullable=False),
+        sa.Column('metric_name', sa.String(length=100), nullable=False),
+        sa.Column('baseline_period', sa.String(length=50), nullable=True),
+        sa.Column('baseline_count', sa.Integer(), nullable=False),
+        sa.Column('baseline_mean', sa.Float(), nullable=True),
+        sa.Column('treatment_count', sa.Integer(), nullable=False),
+        sa.Column('treatment_mean', sa.Float(), nullable=True),
+        sa.Column('difference', sa.Float(), nullable=True),
+        sa.Column('relative_change', sa.Float(), nullable=True),
+        sa.Column('effect_size', sa.Float(), nullable=True),
+        sa.Column('ci_low', sa.Float(), nullable=True),
+        sa.Column('ci_high', sa.Float(), nullable=True),
+        sa.Column('confidence', sa.Float(), nullable=False),
+        sa.Column('p_value', sa.Float(), nullable=True),
+        sa.Column('resamples', sa.Integer(), nullable=False),
+        sa.Column('method_version', sa.Integer(), nullable=False),
+        sa.Column('included_datapoints', sa.Text(), nullable=False),
+        sa.Column('excluded_count', sa.Integer(), nullable=False),
+        sa.Column('final_average', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['experiment_id'], ['experiments.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('experiment_id')
+    )
+
+
+def downgrade():
+    op.drop_table('experiment_results')
@@ -0,0 +1,122 @@
+"""Prefix Garmin wellness metrics with garmin_ and recompute catalog sources
+
+Dashboard tile ids are metric names, so saved Garmin tile selections are
+renamed along with the data points.
+
+Revision ID: 2d8e9f0a1b3c
+Revises: 1c7d8e9f0a2b
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+import json
+import time
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d8e9f0a1b3c'
+down_revision = '1c7d8e9f0a2b'
+branch_labels = None
+depends_on = None
+
+GARMIN_RENAMES = {
+    'steps': 'garmin_steps',
+    'heart_rate': 'garmin_resting_heart_rate',
+    'stress': 'garmin_stress',
+    'sleep': 'garmin_sleep_duration',
+    'vo2_max': 'garmin_vo2_max',
+}
+
+# Source of a metric: the integration graph holding most of its points,
+# else the prefix of its name, else manual
+SOURCE_SQL = """
+    COALESCE(
+        (SELECT CASE g.name
+                    WHEN 'Oura Data' THEN 'oura'
+                    WHEN 'Fitbit Data' THEN 'fitbit'
+                    WHEN 'Garmin Data' THEN 'garmin'
+                    WHEN 'Apple Health Data' THEN 'apple_health'
+                END
+         FROM data_points d
+         JOIN graphs g ON g.id = d.graph_id
+         WHERE d.metric_name = metric_catalog.metric_name
+           AND g.name IN ('Oura Data', 'Fitbit Data', 'Garmin Data', 'Apple Health Data')
+         GROUP BY g.name
+         ORDER BY COUNT(*) DESC, g.name
+         LIMIT 1),
+        CASE
+            WHEN SUBSTR(metric_catalog.metric_name, 1, 7) = 'fitbit_' THEN 'fitbit'
+            WHEN SUBSTR(metric_catalog.metric_name, 1, 6) = 'apple_' THEN 'apple_health'
+            WHEN SUBSTR(metric_catalog.metric_name, 1, 7) = 'garmin_' THEN 'garmin'
+            ELSE 'manual'
+        END
+    )
+"""
+
+
+def _rename(renames):
+    for old, new in renames.items():
+        op.execute(sa.text("""
+            UPDATE data_points SET metric_name = :new
+            WHERE metric_name = :old
+              AND graph_id IN (SELECT id FROM graphs WHERE name = 'Garmin Data')
+        """).bindparams(old=old, new=new))
+    _rebuild_catalog(list(renames) + list(renames.values()))
+    _rename_selected_tiles(renames)
+
+
+def _rename_selected_tiles(renames):
+    """Rename the Garmin entries of every user's selected_dashboard_metrics"""
+    users = sa.table('user', sa.column('id', sa.Integer), sa.column('selected_dashboard_metrics', sa.Text))
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(users.c.id, users.c.selected_dashboard_metrics)
+                        .where(users.c.selected_dashboard_metrics.isnot(None))).fetchall()
+    for user_id, selected_json in rows:
+        selected = json.loads(selected_json)
+        garmin = selected.get('garmin')
+        if not garmin:
+            continue
+        # Entries are either ids or {'id': ...} objects
+        selected['garmin'] = [
+            {**metric, 'id': renames.get(metric['id'], metric['id'])} if isinstance(metric, dict)
+            else renames.get(metric, metric)
+            for metric in garmin
+        ]
+        conn.execute(users.update().where(users.c.id == user_id)
+                     .values(selected_dashboard_metrics=json.dumps(selected)))
+
+
+def _rebuild_catalog(metric_names):
+    """Recompute the catalog rows of metric_names from data_points"""
+    names = sa.bindparam('names', expanding=True)
+    op.execute(sa.text("DELETE FROM metric_catalog WHERE metric_name IN :names").bindparams(names, names=metric_names))
+    op.execute(sa.text("""
+        INSERT INTO metric_catalog (metric_name, source, unit, row_count, first_date, last_date, last_value, data_version, updated_at)
+        SELECT d.metric_name,
+               'manual',
+               NULL,
+               COUNT(*),
+               MIN(d.date),
+               MAX(d.date),
+               (SELECT l.value FROM data_points l
+                WHERE l.metric_name = d.metric_name
+                ORDER BY l.date DESC, l.id DESC LIMIT 1),
+               :version,
+               CURRENT_TIMESTAMP
+        FROM data_points d
+        WHERE d.metric_name IN :names
+        GROUP BY d.metric_name
+    """).bindparams(names, names=metric_names, version=time.time_ns() // 1000))
+
+
+def upgrade():
+    _rename(GARMIN_RENAMES)
+    # The original backfill picked an arbitrary graph per metric; pick the dominant one
+    op.execute(f"UPDATE metric_catalog SET source = {SOURCE_SQL}")
+
+
+def downgrade():
+    _rename({new: old for old, new in GARMIN_RENAMES.items()})
+    op.execute(f"UPDATE metric_catalog SET source = {SOURCE_SQL}")
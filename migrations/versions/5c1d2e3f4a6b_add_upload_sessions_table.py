@@ -0,0 +1,34 @@
+"""Add upload_sessions table for resumable note uploads
+
+Revision ID: 5c1d2e3f4a6b
+Revises: ba9daef23c03
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1d2e3f4a6b'
+down_revision = 'ba9daef23c03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create upload_sessions table
+    op.create_table('upload_sessions',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('notes_hash', sa.String(length=64), nullable=False),
+        sa.Column('chunks', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    # Drop upload_sessions table
+    op.drop_table('upload_sessions')
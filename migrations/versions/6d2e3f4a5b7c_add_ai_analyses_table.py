@@ -0,0 +1,38 @@
+"""Add ai_analyses table for caching AI analysis results
+
+Revision ID: 6d2e3f4a5b7c
+Revises: 5c1d2e3f4a6b
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2e3f4a5b7c'
+down_revision = '5c1d2e3f4a6b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create ai_analyses table
+    op.create_table('ai_analyses',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('graph_id', sa.Integer(), nullable=False),
+        sa.Column('metrics_key', sa.Text(), nullable=False),
+        sa.Column('token_budget', sa.Integer(), nullable=False),
+        sa.Column('data_version', sa.String(length=50), nullable=False),
+        sa.Column('analysis', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['graph_id'], ['graphs.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ai_analyses_graph_id', 'ai_analyses', ['graph_id'], unique=False)
+
+
+def downgrade():
+    # Drop ai_analyses table
+    op.drop_index('ix_ai_analyses_graph_id', table_name='ai_analyses')
+    op.drop_table('ai_analyses')
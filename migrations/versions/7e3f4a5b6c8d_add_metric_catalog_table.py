@@ -0,0 +1,60 @@
+"""Add metric_catalog table summarizing data_points per metric
+
+Revision ID: 7e3f4a5b6c8d
+Revises: 6d2e3f4a5b7c
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e3f4a5b6c8d'
+down_revision = '6d2e3f4a5b7c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create metric_catalog table
+    op.create_table('metric_catalog',
+        sa.Column('metric_name', sa.String(length=100), nullable=False),
+        sa.Column('source', sa.String(length=50), nullable=False),
+        sa.Column('unit', sa.String(length=20), nullable=True),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.Column('first_date', sa.Date(), nullable=True),
+        sa.Column('last_date', sa.Date(), nullable=True),
+        sa.Column('last_value', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('metric_name')
+    )
+
+    # Backfill from existing data points; the source comes from the graph the metric lives in
+    op.execute("""
+        INSERT INTO metric_catalog (metric_name, source, unit, row_count, first_date, last_date, last_value, updated_at)
+        SELECT d.metric_name,
+               CASE MAX(g.name)
+                   WHEN 'Oura Data' THEN 'oura'
+                   WHEN 'Fitbit Data' THEN 'fitbit'
+                   WHEN 'Garmin Data' THEN 'garmin'
+                   WHEN 'Apple Health Data' THEN 'apple_health'
+                   ELSE 'manual'
+               END,
+               NULL,
+               COUNT(*),
+               MIN(d.date),
+               MAX(d.date),
+               (SELECT l.value FROM data_points l
+                WHERE l.metric_name = d.metric_name
+                ORDER BY l.date DESC, l.id DESC LIMIT 1),
+               CURRENT_TIMESTAMP
+        FROM data_points d
+        LEFT JOIN graphs g ON g.id = d.graph_id
+        GROUP BY d.metric_name
+    """)
+
+
+def downgrade():
+    # Drop metric_catalog table
+    op.drop_table('metric_catalog')
@@ -0,0 +1,25 @@
+"""Add (metric_name, date DESC) index on data_points
+
+Revision ID: 8f4a5b6c7d9e
+Revises: 7e3f4a5b6c8d
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f4a5b6c7d9e'
+down_revision = '7e3f4a5b6c8d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Index for latest-value-per-metric lookups
+    op.create_index('ix_data_points_metric_name_date', 'data_points', ['metric_name', sa.text('date DESC')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_data_points_metric_name_date', table_name='data_points')
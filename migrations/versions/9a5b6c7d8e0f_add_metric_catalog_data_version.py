@@ -0,0 +1,25 @@
+"""Add data_version to metric_catalog
+
+Revision ID: 9a5b6c7d8e0f
+Revises: 8f4a5b6c7d9e
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a5b6c7d8e0f'
+down_revision = '8f4a5b6c7d9e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Per-metric version bumped by every change to the metric's data points
+    op.add_column('metric_catalog', sa.Column('data_version', sa.BigInteger(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    op.drop_column('metric_catalog', 'data_version')
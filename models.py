@@ -9,6 +9,7 @@ class Graph(db.Model):
     description = db.Column(db.String(250)) #creates the description column
     is_temporary = db.Column(db.Boolean, default=True)  # True if the graph is temporary
     tracked_metrics = db.Column(db.Text)  # JSON string of metrics this graph should display
+    default_window_days = db.Column(db.Integer)  # Days of data shown by default (None = full history)
     data_points = db.relationship("DataPoint", backref="graph", lazy=True) #defines that the graph has a relationship to datapoints
 
 class DataPoint(db.Model):
@@ -20,6 +21,9 @@ class DataPoint(db.Model):
 
     graph_id = db.Column(db.Integer, db.ForeignKey("graphs.id"), nullable=True)
 
+# Serves latest-value-per-metric lookups (DISTINCT ON metric_name ... ORDER BY date DESC)
+db.Index('ix_data_points_metric_name_date', DataPoint.metric_name, DataPoint.date.desc())
+
 class User(db.Model): 
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(250), unique=True, nullable=False)
@@ -71,4 +75,59 @@ class Experiment(db.Model):
     icon = db.Column(db.String(50))
     icon_color = db.Column(db.String(7))  # Hex color code
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
-    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
\ No newline at end of file
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+class UploadSession(db.Model):
+    __tablename__ = "upload_sessions"
+    id = db.Column(db.String(36), primary_key=True)  # UUID handed back to the client
+    notes_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of the raw notes this session was built from
+    chunks = db.Column(db.Text, nullable=False)  # JSON list of per-chunk text, status and result
+    status = db.Column(db.String(20), nullable=False, default='in_progress')  # 'in_progress', 'needs_clarification', 'completed'
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+class AIAnalysis(db.Model):
+    __tablename__ = "ai_analyses"
+    id = db.Column(db.Integer, primary_key=True)
+    graph_id = db.Column(db.Integer, db.ForeignKey("graphs.id"), nullable=False, index=True)
+    metrics_key = db.Column(db.Text, nullable=False)  # JSON list of the metrics the analysis covered
+    token_budget = db.Column(db.Integer, nullable=False)  # Prompt budget the summary was built with
+    data_version = db.Column(db.String(50), nullable=False)  # Hash of the graph's metric catalog versions at analysis time
+    analysis = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+class MetricCatalog(db.Model):
+    __tablename__ = "metric_catalog"
+    metric_name = db.Column(db.String(100), primary_key=True)
+    source = db.Column(db.String(50), nullable=False, default='manual')  # 'oura', 'fitbit', 'garmin', 'apple_health' or 'manual'
+    unit = db.Column(db.String(20))  # Unit given at ingest, if any
+    row_count = db.Column(db.Integer, nullable=False, default=0)  # Data points across all graphs
+    first_date = db.Column(db.Date)
+    last_date = db.Column(db.Date)
+    last_value = db.Column(db.Float)  # Value on last_date
+    data_version = db.Column(db.BigInteger, nullable=False, default=1)  # Bumped by every change to the metric's data points
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+class ExperimentResult(db.Model):
+    __tablename__ = "experiment_results"
+    id = db.Column(db.Integer, primary_key=True)
+    experiment_id = db.Column(db.Integer, db.ForeignKey("experiments.id"), nullable=False, unique=True)  # Latest completion only
+    metric_name = db.Column(db.String(100), nullable=False)
+    baseline_period = db.Column(db.String(50))  # "<start> to <end>" of the benchmark values, end excluded
+    baseline_count = db.Column(db.Integer, nullable=False, default=0)
+    baseline_mean = db.Column(db.Float)
+    treatment_count = db.Column(db.Integer, nullable=False, default=0)  # Included data points with a value
+    treatment_mean = db.Column(db.Float)
+    difference = db.Column(db.Float)  # treatment_mean - baseline_mean
+    relative_change = db.Column(db.Float)  # difference as a percentage of baseline_mean
+    effect_size = db.Column(db.Float)  # Hedges' g
+    ci_low = db.Column(db.Float)  # Bootstrap confidence interval of difference
+    ci_high = db.Column(db.Float)
+    confidence = db.Column(db.Float, nullable=False)  # e.g. 0.95
+    p_value = db.Column(db.Float)  # Two-sided permutation test
+    resamples = db.Column(db.Integer, nullable=False)
+    method_version = db.Column(db.Integer, nullable=False, default=1)
+    included_datapoints = db.Column(db.Text, nullable=False)  # JSON list of the {date, value} points the user kept
+    excluded_count = db.Column(db.Integer, nullable=False, default=0)
+    final_average = db.Column(db.Float)  # Average shown to the user at completion
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -38,6 +38,36 @@ async function apiRequest(endpoint, options = {}) {
   }
 }
 
+const DAY_MS = 86400000
+
+/**
+ * Expand a chart series into ApexCharts points ({ x: timestamp in ms, y })
+ * Accepts the columnar encoding ({ start, offsets, values }) as well as
+ * the point encoding ({ data: [{ x: 'YYYY-MM-DD', y }] })
+ */
+export function toChartPoints(series) {
+  if (!series.offsets) {
+    return (series.data || []).map(point => ({ x: new Date(point.x).getTime(), y: point.y }))
+  }
+  const start = Date.parse(series.start)
+  return series.offsets.map((offset, i) => ({ x: start + offset * DAY_MS, y: series.values[i] }))
+}
+
+/**
+ * Expand an aligned multi-metric payload ({ start, offsets, series: [{ name, values }] })
+ * into one ApexCharts series per metric; dates where a metric has no value are skipped
+ */
+export function toAlignedChartSeries(payload) {
+  const start = Date.parse(payload.start)
+  const timestamps = payload.offsets.map(offset => start + offset * DAY_MS)
+  return payload.series.map(series => ({
+    name: series.name,
+    data: series.values
+      .map((y, i) => ({ x: timestamps[i], y }))
+      .filter(point => point.y !== null)
+  }))
+}
+
 /**
  * Experiments API
  */
@@ -85,6 +115,11 @@ export const experimentsApi = {
     return await apiRequest(`/api/experiments/${id}/stats`)
   },
 
+  // Get statistics stored at completion (result is null before)
+  async getResults(id) {
+    return await apiRequest(`/api/experiments/${id}/results`)
+  },
+
   // Complete experiment
   async complete(id, completionData) {
     return await apiRequest(`/api/experiments/${id}/complete`, {
@@ -100,6 +135,17 @@ export const experimentsApi = {
 export const metricsApi = {
   async getAll() {
     return await apiRequest('/api/metrics')
+  },
+
+  // Several metrics on one date axis in a single request;
+  // options: start, end (YYYY-MM-DD), fill ('none', 'ffill' or 'interpolate'), fill_limit
+  async getAligned(metrics, options = {}) {
+    // One metrics param per name, so names containing commas survive
+    const params = new URLSearchParams(metrics.map(name => ['metrics', name]))
+    for (const [key, value] of Object.entries(options)) {
+      if (value !== null && value !== undefined) params.set(key, value)
+    }
+    return await apiRequest(`/api/metric-data?${params}`)
   }
 }
 
@@ -107,6 +153,17 @@ export const metricsApi = {
  * Dashboard API
  */
 export const dashboardApi = {
+  // Graphs, integrations and dashboard metrics in one request;
+  // sections limits the response (graphs, integrations, available, selected, values, recent)
+  // and format picks the graph series encoding ('points' or 'columnar')
+  async getBootstrap(sections = null, format = null) {
+    const params = new URLSearchParams()
+    if (sections) params.set('sections', sections.join(','))
+    if (format) params.set('format', format)
+    const query = params.toString() ? `?${params}` : ''
+    return await apiRequest(`/api/dashboard/bootstrap${query}`)
+  },
+
   async getSelectedMetrics() {
     return await apiRequest('/api/dashboard/metrics/selected')
   },
@@ -144,8 +201,9 @@ export const integrationsApi = {
  * Graphs API
  */
 export const graphsApi = {
-  async getAll() {
-    return await apiRequest('/api/graphs')
+  // format: 'points' (default) or 'columnar' series encoding
+  async getAll(format = null) {
+    return await apiRequest(format ? `/api/graphs?format=${format}` : '/api/graphs')
   }
 }
 
@@ -0,0 +1,82 @@
+"""
+Compression - Negotiated gzip/brotli compression of API responses
+
+Chart payloads are large and repetitive (dates, metric names, key names)
+and compress 5-10x. After each request the body is compressed when the
+client accepts it, the body is at least COMPRESS_MIN_SIZE bytes and the
+content type is compressible. Brotli is preferred when the optional brotli
+package is installed and the client accepts it; gzip is used otherwise.
+Streamed responses (exports, Server-Sent Events) and responses that
+already carry a Content-Encoding are passed through untouched.
+"""
+import os
+import gzip
+import logging
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))  # bytes; smaller bodies are sent as-is
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 5))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 5))
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/html',
+    'text/plain',
+    'application/octet-stream',
+    'application/vnd.apache.arrow.stream',
+}
+
+
+def choose_encoding(accept_encodings) -> str:
+    """Preferred content coding the client accepts ('br', 'gzip' or '' for none)"""
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = ''
+    best_quality = 0
+    for coding in candidates:
+        quality = accept_encodings[coding]
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress_body(data: bytes, coding: str) -> bytes:
+    if coding == 'br':
+        return brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_GZIP_LEVEL)
+
+
+def compress_response(response):
+    """after_request hook: compress the body if worthwhile and accepted"""
+    if (response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    coding = choose_encoding(request.accept_encodings)
+    if not coding:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.set_data(compress_body(data, coding))
+    response.headers['Content-Encoding'] = coding
+    return response
+
+
+def init_compression(app) -> None:
+    """Register response compression on the Flask app"""
+    app.after_request(compress_response)
+    logger.info(f"Response compression: {'br, gzip' if brotli is not None else 'gzip'} (min {COMPRESS_MIN_SIZE} bytes)")
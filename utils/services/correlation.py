@@ -0,0 +1,303 @@
+"""
+Correlation - Pearson, Spearman and lagged cross-correlations between metrics
+
+The requested metrics are laid out as a daily matrix (one row per calendar
+day from the first to the last date with data, one column per metric, NaN
+where a metric has no value; several points on one day are averaged).
+Correlations use pairwise-complete observations: each pair of metrics is
+compared over the days on which both have a value, and pairs with fewer
+than min_periods such days are left out (null).
+
+Pearson correlations for all pairs come from a handful of matrix products
+over the masked, centered matrix instead of a loop over pairs. Spearman
+correlations sort each metric once; the ranks of every pair over its
+shared days then come from cumulative counts over those sorted orders,
+one vectorized pass per metric. Lagged cross-correlations compare
+metric x on day t with metric y on day t + lag (for example today's steps
+against tomorrow's HRV) for lags 1..max_lag, again as matrix products over
+the shifted matrix.
+
+Reports are cached in memory keyed by the metrics' data versions, so a
+report is only recomputed after new data arrives.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.services.series_encoding import Series
+
+logger = logging.getLogger(__name__)
+
+CORRELATION_MIN_PERIODS = int(os.getenv('CORRELATION_MIN_PERIODS', 10))  # shared days needed for a coefficient
+CORRELATION_MAX_LAG = int(os.getenv('CORRELATION_MAX_LAG', 30))  # days
+CORRELATION_CACHE_SIZE = int(os.getenv('CORRELATION_CACHE_SIZE', 64))  # reports kept per process
+TOP_LAGGED_LIMIT = 20
+
+
+def daily_matrix(series_by_metric: Dict[str, Series], metric_names: List[str]) -> Tuple[Optional[np.datetime64], np.ndarray]:
+    """
+    Daily date x metric matrix of the series
+
+    Returns:
+        tuple: (first day or None when there is no data, float64 matrix of shape (days, metrics))
+    """
+    present = [series_by_metric[name][0] for name in metric_names if len(series_by_metric[name][0])]
+    if not present:
+        return None, np.empty((0, len(metric_names)))
+
+    first = min(dates[0] for dates in present)
+    days = (max(dates[-1] for dates in present) - first).astype(np.int64) + 1
+    sums = np.zeros((days, len(metric_names)))
+    counts = np.zeros((days, len(metric_names)))
+    for column, name in enumerate(metric_names):
+        dates, values = series_by_metric[name]
+        keep = ~np.isnan(values)
+        rows = (dates[keep] - first).astype(np.int64)
+        np.add.at(sums[:, column], rows, values[keep])
+        np.add.at(counts[:, column], rows, 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return first, sums / counts  # 0/0 -> NaN on days without data
+
+
+def pairwise_pearson(x: np.ndarray, y: Optional[np.ndarray] = None,
+                     min_periods: int = CORRELATION_MIN_PERIODS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson correlation of every column of x with every column of y over pairwise-complete rows
+
+    Args:
+        x: (rows, k) matrix with NaN for missing values
+        y: (rows, m) matrix aligned with x (x itself when None)
+        min_periods: Fewest shared rows for a coefficient; fewer gives NaN
+
+    Returns:
+        tuple: (k x m coefficients, k x m shared row counts)
+    """
+    if y is None:
+        y = x
+    mask_x = ~np.isnan(x)
+    mask_y = ~np.isnan(y)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Centering first keeps the sums of squares well conditioned
+        cx = np.where(mask_x, x - _column_means(x, mask_x), 0.0)
+        cy = np.where(mask_y, y - _column_means(y, mask_y), 0.0)
+        wx = mask_x.astype(np.float64)
+        wy = mask_y.astype(np.float64)
+
+        n = wx.T @ wy
+        sum_x = cx.T @ wy
+        sum_y = wx.T @ cy
+        cov = cx.T @ cy - sum_x * sum_y / n
+        var_x = (cx * cx).T @ wy - sum_x * sum_x / n
+        var_y = wx.T @ (cy * cy) - sum_y * sum_y / n
+        r = cov / np.sqrt(var_x * var_y)
+
+    r[(n < max(min_periods, 2)) | ~(var_x > 1e-12) | ~(var_y > 1e-12)] = np.nan
+    return np.clip(r, -1.0, 1.0), n.astype(np.int64)
+
+
+def _column_means(matrix: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    counts = mask.sum(axis=0)
+    sums = np.where(mask, matrix, 0.0).sum(axis=0)
+    return np.divide(sums, counts, out=np.zeros(matrix.shape[1]), where=counts > 0)
+
+
+def _tie_groups(sorted_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    First and last row of the run of equal values each row belongs to, per column
+
+    sorted_matrix holds each column sorted ascending (NaN last).
+    """
+    rows = np.arange(len(sorted_matrix))[:, None]
+    new_run = np.ones(sorted_matrix.shape, dtype=bool)
+    new_run[1:] = sorted_matrix[1:] != sorted_matrix[:-1]
+    run_start = np.maximum.accumulate(np.where(new_run, rows, 0), axis=0)
+    run_end = np.empty_like(new_run)
+    run_end[:-1] = new_run[1:]
+    run_end[-1] = True
+    last = len(sorted_matrix) - 1
+    run_stop = np.minimum.accumulate(np.where(run_end, rows, last)[::-1], axis=0)[::-1]
+    return run_start, run_stop
+
+
+def _subset_ranks(included: np.ndarray, run_start: np.ndarray, run_stop: np.ndarray) -> np.ndarray:
+    """
+    Average (1-based) ranks within a subset, in sorted order
+
+    included marks, in each column's sorted order, the rows that belong to
+    the subset; values outside it get meaningless ranks. Ties share the
+    mean of the ranks they span within the subset.
+    """
+    counts = np.zeros((len(included) + 1, included.shape[1]), dtype=np.int32)
+    np.cumsum(included, axis=0, out=counts[1:])
+    columns = np.arange(included.shape[1])
+    before = counts[run_start, columns]
+    inside = counts[run_stop + 1, columns] - before
+    return before + (inside + 1) / 2.0
+
+
+def pairwise_spearman(matrix: np.ndarray, min_periods: int = CORRELATION_MIN_PERIODS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spearman rank correlation of every pair of columns over pairwise-complete rows
+
+    Pairs present on the same days are ranked once per metric. For the
+    others, the ranks of metric i within each partner's shared days and the
+    partners' ranks within i's days are built in one pass per metric with
+    cumulative counts over presorted orders, so each pair is ranked over
+    exactly the days both metrics have.
+
+    Returns:
+        tuple: (k x k coefficients, k x k shared row counts)
+    """
+    mask = ~np.isnan(matrix)
+    if not len(matrix):
+        return np.full((matrix.shape[1],) * 2, np.nan), np.zeros((matrix.shape[1],) * 2, dtype=np.int64)
+    orders = np.argsort(matrix, axis=0, kind='stable')
+    run_start, run_stop = _tie_groups(np.take_along_axis(matrix, orders, axis=0))
+
+    # Ranks over each metric's own days: exact for pairs with identical days
+    ranks = np.empty(matrix.shape)
+    np.put_along_axis(ranks, orders, _subset_ranks(np.take_along_axis(mask, orders, axis=0), run_start, run_stop), axis=0)
+    ranks[~mask] = np.nan
+    rho, n = pairwise_pearson(ranks, min_periods=min_periods)
+
+    own = mask.sum(axis=0)
+    rerank = (n >= max(min_periods, 2)) & ((n < own[:, None]) | (n < own[None, :]))
+    for i in range(matrix.shape[1]):
+        others = np.flatnonzero(rerank[i, i + 1:]) + i + 1
+        if not len(others):
+            continue
+        shared = mask[:, others] & mask[:, [i]]
+
+        # Ranks of metric i within each pair's shared days
+        order_i = orders[:, i]
+        ranks_i = np.empty(shared.shape)
+        ranks_i[order_i] = _subset_ranks(shared[order_i], run_start[:, [i]], run_stop[:, [i]])
+
+        # Ranks of each partner within the days metric i has
+        other_orders = orders[:, others]
+        ranks_j = np.empty(shared.shape)
+        np.put_along_axis(ranks_j, other_orders, _subset_ranks(
+            np.take_along_axis(shared, other_orders, axis=0), run_start[:, others], run_stop[:, others]
+        ), axis=0)
+
+        # Pearson of the ranks; both have mean (count + 1) / 2 over the shared days
+        mean = (n[i, others] + 1) / 2.0
+        a = np.where(shared, ranks_i - mean, 0.0)
+        b = np.where(shared, ranks_j - mean, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var_a = np.einsum('ij,ij->j', a, a)
+            var_b = np.einsum('ij,ij->j', b, b)
+            r = np.einsum('ij,ij->j', a, b) / np.sqrt(var_a * var_b)
+        r[~(var_a > 1e-12) | ~(var_b > 1e-12)] = np.nan
+        rho[i, others] = rho[others, i] = np.clip(r, -1.0, 1.0)
+    return rho, n
+
+
+def lagged_correlations(matrix: np.ndarray, max_lag: int,
+                        min_periods: int = CORRELATION_MIN_PERIODS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson correlation of metric i on day t with metric j on day t + lag
+
+    Returns:
+        tuple: (max_lag x k x k coefficients, max_lag x k x k shared day counts) for lags 1..max_lag
+    """
+    k = matrix.shape[1]
+    coefficients = np.full((max_lag, k, k), np.nan)
+    counts = np.zeros((max_lag, k, k), dtype=np.int64)
+    for lag in range(1, min(max_lag, len(matrix) - 1) + 1):
+        coefficients[lag - 1], counts[lag - 1] = pairwise_pearson(matrix[:-lag], matrix[lag:], min_periods)
+    return coefficients, counts
+
+
+def _json_matrix(matrix: np.ndarray) -> list:
+    """Coefficients rounded to 4 places, NaN as None (null)"""
+    return np.where(np.isnan(matrix), None, np.round(matrix, 4)).tolist()
+
+
+def correlation_report(series_by_metric: Dict[str, Series], metric_names: List[str],
+                       max_lag: int = 7, min_periods: int = CORRELATION_MIN_PERIODS) -> Dict[str, Any]:
+    """
+    Correlation matrices and the strongest lagged relationships of the metrics
+
+    Returns:
+        dict: metrics, start, end, days, pearson, spearman, n (shared days per
+              pair), lagged ({lags, pearson, n}; entry [l][i][j] pairs metric
+              i on day t with metric j on day t + lags[l]) and top_lagged
+    """
+    first, matrix = daily_matrix(series_by_metric, metric_names)
+    pearson, n = pairwise_pearson(matrix, min_periods=min_periods)
+    spearman, _ = pairwise_spearman(matrix, min_periods)
+    lagged, lagged_n = lagged_correlations(matrix, max_lag, min_periods)
+
+    top = []
+    if max_lag:
+        strength = np.nan_to_num(np.abs(lagged), nan=-1.0)
+        strength[:, np.arange(len(metric_names)), np.arange(len(metric_names))] = -1.0  # skip autocorrelation
+        for flat in np.argsort(strength, axis=None)[::-1][:TOP_LAGGED_LIMIT]:
+            lag, i, j = np.unravel_index(flat, strength.shape)
+            if strength[lag, i, j] < 0:
+                break
+            top.append({
+                'x': metric_names[i], 'y': metric_names[j], 'lag': int(lag) + 1,
+                'r': round(float(lagged[lag, i, j]), 4), 'n': int(lagged_n[lag, i, j])
+            })
+
+    return {
+        'metrics': metric_names,
+        'start': str(first) if first is not None else None,
+        'end': str(first + len(matrix) - 1) if first is not None else None,
+        'days': len(matrix),
+        'min_periods': min_periods,
+        'pearson': _json_matrix(pearson),
+        'spearman': _json_matrix(spearman),
+        'n': n.tolist(),
+        'lagged': {
+            'lags': list(range(1, max_lag + 1)),
+            'pearson': _json_matrix(lagged),
+            'n': lagged_n.tolist(),
+        },
+        'top_lagged': top,
+    }
+
+
+class ReportCache:
+    """Thread-safe LRU of correlation reports keyed by their inputs (including data versions)"""
+
+    def __init__(self, size: int = CORRELATION_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute) -> Dict[str, Any]:
+        with self._lock:
+            report = self._entries.get(key)
+            if report is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return report
+            self.misses += 1
+
+        report = compute()
+        with self._lock:
+            self._entries[key] = report
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+report_cache = ReportCache()
@@ -0,0 +1,176 @@
+"""
+DataExport - Streaming export of data_points
+
+Rows are read through a server-side cursor in fixed-size partitions
+(yield_per) and every partition is encoded and handed to the response
+before the next one is fetched, so memory stays flat however large the
+table is. CSV and NDJSON are streamed as text; Parquet is written one row
+group per partition and the bytes are drained as they are produced.
+"""
+import io
+import csv
+import json
+import logging
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+
+from models import db, DataPoint
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 10000  # rows per cursor fetch / Parquet row group
+EXPORT_COLUMNS = ['date', 'metric_name', 'value', 'graph_id']
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def parquet_available() -> bool:
+    """Parquet export needs the optional pyarrow package"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def build_export_query(metrics: Optional[List[str]] = None, start: Optional[date] = None,
+                       end: Optional[date] = None, graph_id: Optional[int] = None):
+    """Select export rows matching the filters, ordered by metric then date"""
+    query = select(DataPoint.date, DataPoint.metric_name, DataPoint.value, DataPoint.graph_id)
+    if metrics:
+        query = query.where(DataPoint.metric_name.in_(metrics))
+    if start:
+        query = query.where(DataPoint.date >= start)
+    if end:
+        query = query.where(DataPoint.date <= end)
+    if graph_id is not None:
+        query = query.where(DataPoint.graph_id == graph_id)
+    return query.order_by(DataPoint.metric_name, DataPoint.date).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def iter_export_batches(query) -> Iterator[List[Any]]:
+    """Fetch the query one partition at a time from a server-side cursor"""
+    result = db.session.execute(query)
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def stream_export(fmt: str, **filters) -> Iterator[bytes]:
+    """
+    Encode matching data points in the requested format, one batch at a time
+
+    Args:
+        fmt: 'csv', 'ndjson' or 'parquet'
+        **filters: metrics, start, end and graph_id for build_export_query
+
+    Yields:
+        bytes: Encoded chunks ready to be written to the response
+    """
+    batches = iter_export_batches(build_export_query(**filters))
+    if fmt == 'csv':
+        return _stream_csv(batches)
+    if fmt == 'ndjson':
+        return _stream_ndjson(batches)
+    if fmt == 'parquet':
+        return _stream_parquet(batches)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def _stream_csv(batches: Iterator[List[Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    rows = 0
+    for batch in batches:
+        writer.writerows((row.date.isoformat(), row.metric_name, row.value, row.graph_id) for row in batch)
+        rows += len(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+    logger.info(f"CSV export finished: {rows} rows")
+
+
+def _stream_ndjson(batches: Iterator[List[Any]]) -> Iterator[bytes]:
+    rows = 0
+    for batch in batches:
+        lines = [
+            json.dumps({'date': row.date.isoformat(), 'metric_name': row.metric_name,
+                        'value': row.value, 'graph_id': row.graph_id})
+            for row in batch
+        ]
+        rows += len(batch)
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+    logger.info(f"NDJSON export finished: {rows} rows")
+
+
+class _DrainableSink:
+    """Write-only file object whose contents are handed out and discarded as they are written"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _stream_parquet(batches: Iterator[List[Any]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('date', pa.date32()),
+        ('metric_name', pa.string()),
+        ('value', pa.float64()),
+        ('graph_id', pa.int64()),
+    ])
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    rows = 0
+    try:
+        for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays([pa.array(column, type=field.type)
+                                                     for column, field in zip(columns, schema)], schema=schema))
+            rows += len(batch)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+    logger.info(f"Parquet export finished: {rows} rows")
+
+
+def export_filename(fmt: str, filters: Dict[str, Any]) -> str:
+    """Download file name describing the export"""
+    parts = ['neuroflow-data-points']
+    if filters.get('start') or filters.get('end'):
+        parts.append(f"{filters.get('start') or 'start'}_{filters.get('end') or 'end'}")
+    return '-'.join(str(part) for part in parts) + f'.{fmt}'
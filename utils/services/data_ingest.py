@@ -0,0 +1,287 @@
+"""
+Batched ingest path for data_points
+
+Payloads are validated and parsed in one vectorized pandas pass, de-duplicated
+against existing (metric_name, date, value, graph_id) rows with an anti-join,
+and written with a single multi-row INSERT. A metric can have several values
+on one date (e.g. several sets of an exercise), so rows of one payload are
+never merged with each other; only rows already stored are skipped. A value
+saved again in a later payload for the same metric and date (e.g. another
+100 kg set logged that evening) is therefore skipped as a duplicate. Large
+CSV/NDJSON files are streamed in batches and, on Postgres, loaded with COPY
+into a staging table that is merged into data_points.
+"""
+import io
+import time
+import logging
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import insert
+
+from models import db, DataPoint
+from utils.services.metric_catalog import summarize_rows, update_catalog
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ['metric_name', 'date', 'value']  # a row is a duplicate only if all three match
+DAILY_KEY_COLUMNS = ['metric_name', 'date']  # integration imports: one value per metric and day
+IMPORT_COLUMNS = ['date', 'metric_name', 'value']
+MAX_REPORTED_ERRORS = 20
+IMPORT_BATCH_SIZE = 50000  # rows parsed and copied per batch when streaming a file
+
+
+def parse_data_points(points: Iterable[Dict[str, Any]]) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Validate and parse raw {'date', 'metric_name', 'value'} dicts
+
+    Args:
+        points: Payload items; extra keys (e.g. 'unit') are kept
+
+    Returns:
+        tuple: (DataFrame of valid rows with datetime.date 'date' and float
+        'value' columns, list of {'index', 'error'} for invalid rows)
+    """
+    return parse_data_frame(pd.DataFrame(list(points)))
+
+
+def parse_data_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """Vectorized validation of a raw DataFrame; see parse_data_points"""
+    df = df.copy()
+    for column in IMPORT_COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+
+    dates = pd.to_datetime(df['date'], format='%Y-%m-%d', errors='coerce')
+    values = pd.to_numeric(df['value'], errors='coerce')
+    names = df['metric_name'].where(df['metric_name'].map(lambda v: isinstance(v, str)), None).str.strip()
+
+    bad_date = dates.isna()
+    bad_value = values.isna()
+    bad_name = names.isna() | (names == '')
+    invalid = bad_date | bad_value | bad_name
+
+    errors = []
+    for index in df.index[invalid][:MAX_REPORTED_ERRORS]:
+        reasons = []
+        if bad_date[index]:
+            reasons.append('date must be YYYY-MM-DD')
+        if bad_value[index]:
+            reasons.append('value must be numeric')
+        if bad_name[index]:
+            reasons.append('metric_name is required')
+        errors.append({'index': int(index), 'error': ', '.join(reasons)})
+
+    valid = df[~invalid].copy()
+    valid['date'] = dates[~invalid].dt.date
+    valid['value'] = values[~invalid].astype(float)
+    valid['metric_name'] = names[~invalid]
+    return valid, errors
+
+
+def bulk_insert_data_points(df: pd.DataFrame, graph_id: Optional[int] = None, daily: bool = False) -> Dict[str, Any]:
+    """
+    Insert parsed rows that do not already exist for the graph
+
+    Rows whose (metric_name, date, value, graph_id) already exists are
+    skipped; every other row is inserted, including several values of a
+    metric on the same date. With daily=True (integration syncs and
+    exports, which carry one value per metric and day) a day that already
+    has a value is skipped, and a payload's duplicates keep their last
+    value. The metric catalog is updated with the inserted rows. The
+    caller commits the session.
+
+    Args:
+        df: Output of parse_data_points
+        graph_id: Graph the rows belong to (None for unassigned uploads)
+        daily: Treat (metric_name, date) as the key
+
+    Returns:
+        dict: {'inserted': int, 'skipped': int, 'rows': DataFrame of inserted rows}
+    """
+    if df.empty:
+        return {'inserted': 0, 'skipped': 0, 'rows': df}
+
+    key_columns = DAILY_KEY_COLUMNS if daily else KEY_COLUMNS
+    if daily:
+        df = df.drop_duplicates(subset=key_columns, keep='last')
+    existing = _existing_keys(df, graph_id)[key_columns].drop_duplicates()
+
+    # Anti-join: keep rows with no matching key in the table
+    merged = df.merge(existing, on=key_columns, how='left', indicator=True)
+    new_rows = merged[merged['_merge'] == 'left_only'].drop(columns='_merge')
+
+    if not new_rows.empty:
+        records = [
+            {'date': d, 'metric_name': m, 'value': v, 'graph_id': graph_id}
+            for d, m, v in zip(new_rows['date'], new_rows['metric_name'], new_rows['value'])
+        ]
+        db.session.execute(insert(DataPoint), records)
+        update_catalog(summarize_rows(new_rows), graph_id)
+
+    inserted = len(new_rows)
+    skipped = len(df) - inserted
+    logger.info(f"Bulk insert into graph {graph_id}: {inserted} inserted, {skipped} skipped")
+    return {'inserted': inserted, 'skipped': skipped, 'rows': new_rows}
+
+
+def _existing_keys(df: pd.DataFrame, graph_id: Optional[int]) -> pd.DataFrame:
+    """Fetch existing (metric_name, date, value) keys overlapping the payload in one query"""
+    graph_filter = DataPoint.graph_id.is_(None) if graph_id is None else DataPoint.graph_id == graph_id
+    rows = db.session.query(DataPoint.metric_name, DataPoint.date, DataPoint.value).filter(
+        graph_filter,
+        DataPoint.metric_name.in_(df['metric_name'].unique().tolist()),
+        DataPoint.date >= df['date'].min(),
+        DataPoint.date <= df['date'].max()
+    ).all()
+    return pd.DataFrame(rows, columns=KEY_COLUMNS).drop_duplicates()
+
+
+def format_inserted_rows(rows: pd.DataFrame, include_unit: bool = False) -> List[Dict[str, Any]]:
+    """Serialize inserted rows for API responses"""
+    if rows.empty:
+        return []
+    out = pd.DataFrame({
+        'date': pd.to_datetime(rows['date']).dt.strftime('%Y-%m-%d'),
+        'metric_name': rows['metric_name'],
+        'value': rows['value'],
+    })
+    if include_unit:
+        out['unit'] = rows['unit'].fillna('') if 'unit' in rows.columns else ''
+    return out.to_dict(orient='records')
+
+
+def iter_import_batches(stream: IO[bytes], fmt: str, batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV or NDJSON file in fixed-size batches without loading it whole
+
+    CSV files need a header with date, metric_name and value columns;
+    NDJSON files need one {"date", "metric_name", "value"} object per line.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if fmt == 'csv':
+        reader = pd.read_csv(text, chunksize=batch_size, dtype=str, usecols=lambda c: c.strip() in IMPORT_COLUMNS)
+    elif fmt == 'ndjson':
+        reader = pd.read_json(text, lines=True, chunksize=batch_size, dtype=False)
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    for batch in reader:
+        batch.columns = [str(c).strip() for c in batch.columns]
+        yield batch.reset_index(drop=True)
+
+
+def import_data_points(stream: IO[bytes], fmt: str, graph_id: Optional[int] = None,
+                       batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Stream a CSV/NDJSON file into data_points
+
+    Invalid rows are counted and skipped. Rows already present for the
+    graph (same metric, date and value) are skipped; rows within the file
+    are never merged with each other.
+    The caller commits the session.
+
+    Returns:
+        dict: rows_read, inserted, skipped, invalid, sample errors, seconds and rows_per_sec
+    """
+    started = time.perf_counter()
+    use_copy = db.session.get_bind().dialect.name == 'postgresql'
+    rows_read = 0
+    valid_rows = 0
+    invalid = 0
+    errors = []
+
+    inserted = 0
+    cursor = _create_staging_table() if use_copy else None
+
+    for batch in iter_import_batches(stream, fmt, batch_size):
+        offset = rows_read
+        parsed, batch_errors = parse_data_frame(batch)
+        invalid += len(batch) - len(parsed)
+        for error in batch_errors:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'row': offset + error['index'] + 1, 'error': error['error']})
+        rows_read += len(batch)
+        valid_rows += len(parsed)
+
+        if parsed.empty:
+            continue
+        if use_copy:
+            _copy_batch(cursor, parsed)
+        else:
+            # Without COPY (e.g. SQLite in development) each batch goes through
+            # the regular bulk path
+            inserted += bulk_insert_data_points(parsed, graph_id)['inserted']
+
+    if use_copy:
+        inserted = _merge_staging_table(cursor, graph_id)
+
+    seconds = time.perf_counter() - started
+    logger.info(f"Imported {inserted}/{rows_read} rows into graph {graph_id} in {seconds:.2f}s")
+    return {
+        'rows_read': rows_read,
+        'inserted': inserted,
+        'skipped': valid_rows - inserted,
+        'invalid': invalid,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(rows_read / seconds) if seconds else None
+    }
+
+
+def _create_staging_table():
+    """Create a transaction-scoped staging table on the session's psycopg connection"""
+    driver_connection = db.session.connection().connection.driver_connection
+    cursor = driver_connection.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE data_points_staging (
+            date date NOT NULL,
+            metric_name varchar(100) NOT NULL,
+            value double precision NOT NULL
+        ) ON COMMIT DROP
+    """)
+    return cursor
+
+
+def _copy_batch(cursor, parsed: pd.DataFrame) -> None:
+    """COPY one parsed batch into the staging table as CSV"""
+    out = pd.DataFrame({
+        'date': pd.to_datetime(parsed['date']).dt.strftime('%Y-%m-%d').to_numpy(),
+        'metric_name': parsed['metric_name'].to_numpy(),
+        'value': parsed['value'].to_numpy(),
+    })
+    buffer = io.StringIO()
+    out.to_csv(buffer, header=False, index=False)
+    with cursor.copy("COPY data_points_staging (date, metric_name, value) FROM STDIN WITH (FORMAT csv)") as copy:
+        copy.write(buffer.getvalue())
+
+
+def _merge_staging_table(cursor, graph_id: Optional[int]) -> int:
+    """
+    Insert staged rows whose (metric_name, date, value, graph_id) is not in data_points yet
+
+    The inserted rows are aggregated per metric in the same statement and
+    folded into the metric catalog.
+    """
+    cursor.execute("""
+        WITH inserted AS (
+            INSERT INTO data_points (date, metric_name, value, graph_id)
+            SELECT s.date, s.metric_name, s.value, %(graph_id)s::integer
+            FROM data_points_staging s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM data_points d
+                WHERE d.metric_name = s.metric_name
+                  AND d.date = s.date
+                  AND d.value = s.value
+                  AND d.graph_id IS NOT DISTINCT FROM %(graph_id)s::integer
+            )
+            RETURNING metric_name, date, value
+        )
+        SELECT metric_name, COUNT(*), MIN(date), MAX(date), (ARRAY_AGG(value ORDER BY date DESC))[1]
+        FROM inserted
+        GROUP BY metric_name
+    """, {'graph_id': graph_id})
+    stats = pd.DataFrame(cursor.fetchall(), columns=['metric_name', 'row_count', 'first_date', 'last_date', 'last_value'])
+    stats['unit'] = None
+    update_catalog(stats, graph_id)
+    return int(stats['row_count'].sum()) if not stats.empty else 0
@@ -6,6 +6,7 @@ import requests
 import pandas as pd
 from datetime import datetime, timedelta, date
 from models import db, Graph, DataPoint
+from utils.services.data_ingest import parse_data_points, bulk_insert_data_points
 import json
 import logging
 
@@ -385,48 +386,21 @@ def store_fitbit_data(cleaned_records):
             db.session.add(fitbit_graph)
             db.session.commit()
         
-        new_data_points = []
+        # Existing (date, metric) rows are skipped by the batched ingest path
+        parsed, _ = parse_data_points(
+            {'date': record.get("date"), 'metric_name': record.get("metric_name"), 'value': record.get("value")}
+            for record in cleaned_records
+        )
+        inserted = bulk_insert_data_points(parsed, fitbit_graph.id, daily=True)['inserted']
+        db.session.commit()
         
-        for record in cleaned_records:
-            date_str = record.get("date")
-            if not date_str:
-                continue
-            
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-            metric_name = record.get("metric_name")
-            value = record.get("value")
-            
-            if not all([date_obj, metric_name, value is not None]):
-                continue
-            
-            # Check if data point already exists
-            existing_dp = DataPoint.query.filter_by(
-                date=date_obj,
-                metric_name=metric_name,
-                graph_id=fitbit_graph.id
-            ).first()
-            
-            if not existing_dp:
-                new_data_points.append(
-                    DataPoint(
-                        date=date_obj,
-                        metric_name=metric_name,
-                        value=float(value),
-                        graph_id=fitbit_graph.id
-                    )
-                )
-        
-        # Bulk insert new data points
-        if new_data_points:
-            print(f"💾 Storing {len(new_data_points)} new Fitbit data points...")
-            db.session.bulk_save_objects(new_data_points)
-            db.session.commit()
-            print(f"✅ Successfully stored {len(new_data_points)} new Fitbit data points")
-            logger.info(f"Stored {len(new_data_points)} new Fitbit data points")
+        if inserted:
+            print(f"✅ Successfully stored {inserted} new Fitbit data points")
+            logger.info(f"Stored {inserted} new Fitbit data points")
         else:
             print("ℹ️ No new data points to store (all data already exists)")
         
-        return len(new_data_points)
+        return inserted
         
     except Exception as e:
         logger.error(f"Error storing Fitbit data: {e}")
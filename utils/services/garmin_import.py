@@ -0,0 +1,273 @@
+"""
+GarminImport - Importer for Garmin Connect data exports
+
+A Garmin Connect export is a zip holding daily wellness summaries as JSON
+(steps, resting heart rate, stress), sleep and VO2 max JSON files, and the
+original activity FIT files inside nested zips. Files are decoded in
+parallel across a process pool; each worker returns plain
+(date, metric_name, value) tuples that are reduced to one value per metric
+and day with pandas and bulk-loaded into the "Garmin Data" graph. Metric
+names carry a garmin_ prefix, like the other integrations' metrics, so
+they never mix with manual or Oura data of the same kind.
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import zipfile
+import tempfile
+import multiprocessing
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from models import db, Graph
+from utils.services.data_ingest import bulk_insert_data_points, IMPORT_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+GARMIN_GRAPH_NAME = "Garmin Data"
+GARMIN_IMPORT_WORKERS = int(os.getenv('GARMIN_IMPORT_WORKERS', os.cpu_count() or 2))
+TASK_CHUNK_SIZE = 32  # files handed to a worker at a time
+
+# Daily reduction per metric; anything not listed is averaged
+METRIC_AGGREGATIONS = {
+    'garmin_activity_count': 'sum',
+    'garmin_activity_minutes': 'sum',
+    'garmin_activity_distance': 'sum',
+    'garmin_activity_calories': 'sum',
+}
+
+# Worker-local cache of open archives, keyed by path
+_open_archives = {}
+
+
+def list_export_files(archive_path: str, work_dir: str) -> List[Tuple[str, str]]:
+    """
+    List the (archive_path, member) pairs that hold importable data
+
+    Nested zips (the uploaded FIT files) are copied out to work_dir so that
+    workers can open them directly instead of seeking inside the outer zip.
+    """
+    tasks = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            lower = name.lower()
+            if info.is_dir():
+                continue
+            if lower.endswith('.zip'):
+                nested_path = os.path.join(work_dir, f"{len(tasks)}_{os.path.basename(name)}")
+                with archive.open(info) as src, open(nested_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                tasks.extend(list_export_files(nested_path, work_dir))
+            elif lower.endswith('.fit') or (lower.endswith('.json') and _json_kind(name)):
+                tasks.append((archive_path, name))
+    return tasks
+
+
+def _json_kind(name: str):
+    """Which Garmin JSON export a file is, or None if it is not imported"""
+    base = os.path.basename(name)
+    if 'UDSFile' in base:
+        return 'daily_summary'
+    if base.endswith('sleepData.json'):
+        return 'sleep'
+    if base.startswith('MetricsMaxMetData'):
+        return 'vo2_max'
+    return None
+
+
+def decode_file(task: Tuple[str, str]) -> List[Tuple[str, str, float]]:
+    """Decode one export file into (date, metric_name, value) tuples; runs in a worker"""
+    archive_path, name = task
+    archive = _open_archives.get(archive_path)
+    if archive is None:
+        archive = _open_archives[archive_path] = zipfile.ZipFile(archive_path)
+    try:
+        with archive.open(name) as f:
+            if name.lower().endswith('.fit'):
+                return _decode_fit(f)
+            return _decode_json(_json_kind(name), json.load(f))
+    except Exception as e:
+        # One corrupt file should not abort a multi-year import
+        logger.warning(f"Skipping Garmin export file {name}: {e}")
+        return []
+
+
+def _decode_json(kind: str, entries: Any) -> List[Tuple[str, str, float]]:
+    rows = []
+    if not isinstance(entries, list):
+        return rows
+    for entry in entries:
+        day = entry.get('calendarDate')
+        if isinstance(day, dict):  # some exports wrap dates as {"date": "..."}
+            day = day.get('date')
+        if not day:
+            continue
+        day = str(day)[:10]
+
+        if kind == 'daily_summary':
+            if entry.get('totalSteps') is not None:
+                rows.append((day, 'garmin_steps', entry['totalSteps']))
+            if entry.get('restingHeartRate') is not None:
+                rows.append((day, 'garmin_resting_heart_rate', entry['restingHeartRate']))
+            stress = _stress_level(entry)
+            if stress is not None:
+                rows.append((day, 'garmin_stress', stress))
+        elif kind == 'sleep':
+            seconds = sum(entry.get(key) or 0 for key in ('deepSleepSeconds', 'lightSleepSeconds', 'remSleepSeconds'))
+            if seconds:
+                rows.append((day, 'garmin_sleep_duration', seconds / 60))
+        elif kind == 'vo2_max':
+            if entry.get('vo2MaxValue') is not None:
+                rows.append((day, 'garmin_vo2_max', entry['vo2MaxValue']))
+    return rows
+
+
+def _stress_level(entry: Dict[str, Any]):
+    """Average all-day stress; negative values mean not enough data"""
+    for aggregate in (entry.get('allDayStress') or {}).get('aggregatorList', []):
+        if aggregate.get('type') == 'TOTAL':
+            level = aggregate.get('averageStressLevel')
+            return level if level is not None and level >= 0 else None
+    level = entry.get('averageStressLevel')
+    return level if level is not None and level >= 0 else None
+
+
+def _decode_fit(f) -> List[Tuple[str, str, float]]:
+    """Turn the session messages of an activity FIT file into daily activity rows"""
+    import fitdecode
+
+    sessions = []
+    utc_offset = timedelta(0)
+    with fitdecode.FitReader(f, check_crc=fitdecode.CrcCheck.DISABLED) as fit:
+        for frame in fit:
+            if frame.frame_type != fitdecode.FIT_FRAME_DATA:
+                continue
+            if frame.name == 'session':
+                sessions.append({
+                    'start_time': frame.get_value('start_time', fallback=None),
+                    'timer': frame.get_value('total_timer_time', fallback=None),
+                    'distance': frame.get_value('total_distance', fallback=None),
+                    'calories': frame.get_value('total_calories', fallback=None),
+                })
+            elif frame.name == 'activity':
+                # local_timestamp - timestamp gives the device's UTC offset
+                local = frame.get_value('local_timestamp', fallback=None)
+                utc = frame.get_value('timestamp', fallback=None)
+                if local is not None and utc is not None:
+                    utc_offset = local - utc
+
+    rows = []
+    for session in sessions:
+        if session['start_time'] is None:
+            continue
+        day = (session['start_time'] + utc_offset).date().isoformat()
+        rows.append((day, 'garmin_activity_count', 1))
+        if session['timer']:
+            rows.append((day, 'garmin_activity_minutes', session['timer'] / 60))
+        if session['distance']:
+            rows.append((day, 'garmin_activity_distance', session['distance'] / 1000))
+        if session['calories']:
+            rows.append((day, 'garmin_activity_calories', session['calories']))
+    return rows
+
+
+def reduce_daily(rows: List[Tuple[str, str, float]]) -> pd.DataFrame:
+    """Collapse decoded rows to one value per (metric_name, date)"""
+    if not rows:
+        return pd.DataFrame(columns=['date', 'metric_name', 'value'])
+    df = pd.DataFrame.from_records(rows, columns=['date', 'metric_name', 'value'])
+    df['value'] = pd.to_numeric(df['value'], errors='coerce')
+    df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d', errors='coerce')
+    df = df.dropna(subset=['date', 'value'])
+
+    summed = df['metric_name'].map(METRIC_AGGREGATIONS).eq('sum')
+    sums = df[summed].groupby(['metric_name', 'date'])['value'].sum()
+    means = df[~summed].groupby(['metric_name', 'date'])['value'].mean()
+
+    daily = pd.concat([sums, means]).reset_index()
+    daily['date'] = daily['date'].dt.date
+    daily['value'] = daily['value'].round(2)
+    return daily[['date', 'metric_name', 'value']]
+
+
+def get_garmin_graph() -> Graph:
+    garmin_graph = Graph.query.filter_by(name=GARMIN_GRAPH_NAME).first()
+    if not garmin_graph:
+        garmin_graph = Graph(
+            name=GARMIN_GRAPH_NAME,
+            description="Data imported from a Garmin Connect export",
+            is_temporary=False
+        )
+        db.session.add(garmin_graph)
+        db.session.flush()
+    return garmin_graph
+
+
+def _pool_context():
+    """
+    forkserver context for the decode pool
+
+    Not fork: the Flask worker runs scheduler and listener threads whose
+    locks (e.g. logging's) a forked child could inherit while held. The fork
+    server imports this module once, so workers start without re-importing
+    pandas.
+    """
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+def import_garmin_export(archive_path: str, workers: int = GARMIN_IMPORT_WORKERS) -> Dict[str, Any]:
+    """
+    Import a Garmin Connect export zip into the "Garmin Data" graph
+
+    Existing (metric, day) values are kept; the caller commits the session.
+
+    Args:
+        archive_path: Path of the export zip on disk
+        workers: Processes used to decode files (1 decodes in-process)
+
+    Returns:
+        dict: files, fit_files, days, metrics, inserted, skipped, seconds
+    """
+    started = time.perf_counter()
+    work_dir = tempfile.mkdtemp(prefix='garmin_import_')
+    try:
+        tasks = list_export_files(archive_path, work_dir)
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+                decoded = list(pool.map(decode_file, tasks, chunksize=TASK_CHUNK_SIZE))
+        else:
+            decoded = [decode_file(task) for task in tasks]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        _open_archives.clear()
+
+    daily = reduce_daily([row for rows in decoded for row in rows])
+    graph = get_garmin_graph()
+
+    inserted = 0
+    skipped = 0
+    for offset in range(0, len(daily), IMPORT_BATCH_SIZE):
+        result = bulk_insert_data_points(daily.iloc[offset:offset + IMPORT_BATCH_SIZE], graph.id, daily=True)
+        inserted += result['inserted']
+        skipped += result['skipped']
+
+    seconds = time.perf_counter() - started
+    logger.info(f"Garmin import: {len(tasks)} files -> {len(daily)} daily values, {inserted} inserted in {seconds:.1f}s")
+    return {
+        'graph_id': graph.id,
+        'files': len(tasks),
+        'fit_files': sum(1 for _, name in tasks if name.lower().endswith('.fit')),
+        'days': int(daily['date'].nunique()) if not daily.empty else 0,
+        'metrics': sorted(daily['metric_name'].unique().tolist()) if not daily.empty else [],
+        'inserted': inserted,
+        'skipped': skipped,
+        'seconds': round(seconds, 3)
+    }
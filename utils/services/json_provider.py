@@ -0,0 +1,76 @@
+"""
+JSONProvider - orjson-backed JSON encoding for Flask responses
+
+Flask's default provider runs the stdlib json encoder (sorting keys) and
+sends dates as HTTP date strings, so routes called isoformat() on every
+date they returned. OrjsonProvider encodes with orjson: date and datetime
+values come out as ISO 8601 strings and NumPy arrays (columnar series) are
+written without converting them to lists first.
+
+The provider is picked with JSON_PROVIDER ('orjson' or 'default'); when
+orjson is not installed the stdlib provider is used with the same date
+and array handling, so responses look the same either way.
+"""
+import os
+import logging
+from datetime import date, datetime
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson').lower()
+
+
+def _default(value):
+    """Encode values the JSON encoders do not handle natively"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return DefaultJSONProvider.default(value)
+
+
+class IsoJSONProvider(DefaultJSONProvider):
+    """Stdlib provider that writes dates as ISO 8601 instead of HTTP dates"""
+    default = staticmethod(_default)
+    sort_keys = False
+
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson"""
+
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=_default, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Skip the bytes -> str -> bytes round trip of dumps()
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self.option),
+            mimetype='application/json'
+        )
+
+
+def init_json_provider(app) -> None:
+    """Install the configured JSON provider on the Flask app"""
+    if JSON_PROVIDER == 'orjson' and orjson is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        if JSON_PROVIDER == 'orjson':
+            logger.warning("orjson is not installed; using the standard library JSON encoder")
+        app.json = IsoJSONProvider(app)
+    logger.info(f"JSON provider: {type(app.json).__name__}")
@@ -0,0 +1,150 @@
+"""
+LatestValues - Most recent data point per metric, answered in one query
+
+Dashboard tiles and the recent-metrics card need the newest value of a set
+of metrics, and the value before it for the trend. Instead of one
+ORDER BY date DESC LIMIT 1 query per metric, the whole selection is
+fetched in a single query: on Postgres a LATERAL ... LIMIT 2 probe of the
+(metric_name, date DESC) index per metric, elsewhere ROW_NUMBER() <= 2.
+
+Results are cached in memory per process. Entries are dropped when ingest
+commits changes to their metrics, in this or another worker process (see
+metric_changes); a TTL bounds staleness should a change notification be
+lost.
+"""
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import String, column, func, select, true, values
+
+from models import db, DataPoint
+from utils.services.metric_changes import on_metrics_changed
+
+logger = logging.getLogger(__name__)
+
+LATEST_VALUES_TTL = float(os.getenv('LATEST_VALUES_TTL', 60))  # seconds
+
+
+class LatestValuesCache:
+    """Thread-safe metric -> latest data point cache with per-entry expiry"""
+
+    def __init__(self, ttl: float = LATEST_VALUES_TTL):
+        self.ttl = ttl
+        self._entries = {}  # metric_name -> (expires_at, value dict or None)
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by every invalidation
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, metric_names: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Latest data point per metric (see query_latest_values), or None for metrics without data
+
+        Cached metrics are served from memory; the rest are loaded together
+        in one query.
+        """
+        metric_names = list(dict.fromkeys(metric_names))
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for name in metric_names:
+                entry = self._entries.get(name)
+                if entry and entry[0] > now:
+                    found[name] = entry[1]
+            self.hits += len(found)
+            self.misses += len(metric_names) - len(found)
+            generation = self._generation
+
+        missing = [name for name in metric_names if name not in found]
+        if missing:
+            loaded = query_latest_values(missing)
+            expires_at = time.monotonic() + self.ttl
+            with self._lock:
+                # A commit during the query may have made it stale; serve it but do not keep it
+                keep = generation == self._generation
+                for name in missing:
+                    found[name] = loaded.get(name)
+                    if keep:
+                        self._entries[name] = (expires_at, found[name])
+        return found
+
+    def invalidate(self, metric_names: Optional[Iterable[str]] = None) -> None:
+        """Drop cached entries for the given metrics, or all of them"""
+        with self._lock:
+            self._generation += 1
+            if metric_names is None:
+                self._entries.clear()
+            else:
+                for name in metric_names:
+                    self._entries.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and the number of cached metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'ttl_seconds': self.ttl,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def query_latest_values(metric_names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the newest data point of each metric, plus the value before it, in a single query
+
+    Returns:
+        dict: metric_name -> {'id', 'date', 'value', 'graph_id', 'previous_date', 'previous_value'}
+    """
+    metric_names = list(metric_names)
+    if not metric_names:
+        return {}
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # One index probe per metric: LATERAL (... ORDER BY date DESC LIMIT 2)
+        names = values(column('metric_name', String(100)), name='names').data([(name,) for name in metric_names])
+        recent = select(DataPoint.id, DataPoint.date, DataPoint.value, DataPoint.graph_id)\
+            .where(DataPoint.metric_name == names.c.metric_name)\
+            .order_by(DataPoint.date.desc(), DataPoint.id.desc())\
+            .limit(2).lateral('recent')
+        query = select(names.c.metric_name, recent.c.id, recent.c.date, recent.c.value, recent.c.graph_id)\
+            .select_from(names.join(recent, true()))\
+            .order_by(names.c.metric_name, recent.c.date.desc(), recent.c.id.desc())
+    else:
+        ranked = select(
+            DataPoint.metric_name, DataPoint.id, DataPoint.date, DataPoint.value, DataPoint.graph_id,
+            func.row_number().over(
+                partition_by=DataPoint.metric_name,
+                order_by=(DataPoint.date.desc(), DataPoint.id.desc())
+            ).label('rank')
+        ).where(DataPoint.metric_name.in_(metric_names)).subquery()
+        query = select(ranked.c.metric_name, ranked.c.id, ranked.c.date, ranked.c.value, ranked.c.graph_id)\
+            .where(ranked.c.rank <= 2)\
+            .order_by(ranked.c.metric_name, ranked.c.rank)
+
+    latest = {}
+    for row in db.session.execute(query):
+        entry = latest.get(row.metric_name)
+        if entry is None:
+            latest[row.metric_name] = {
+                'id': row.id, 'date': row.date, 'value': row.value, 'graph_id': row.graph_id,
+                'previous_date': None, 'previous_value': None
+            }
+        else:
+            entry['previous_date'] = row.date
+            entry['previous_value'] = row.value
+    return latest
+
+
+latest_values = LatestValuesCache()
+on_metrics_changed(latest_values.invalidate)
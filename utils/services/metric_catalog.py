@@ -0,0 +1,274 @@
+"""
+MetricCatalog - Per-metric summary of data_points
+
+The metric_catalog table holds one row per metric name with its source,
+unit, row count, first/last date and latest value. Ingest paths update it
+incrementally from the rows they insert, so metric lists and integration
+status read a table of a few dozen rows instead of scanning data_points.
+Every change also bumps the metric's data_version, which read endpoints
+turn into ETags, and marks the metrics dirty in the latest-values cache.
+"""
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import case, func
+
+from models import db, DataPoint, Graph, MetricCatalog
+from utils.services.metric_changes import mark_metrics_changed
+
+logger = logging.getLogger(__name__)
+
+# Sources for data that lands in the integration graphs
+GRAPH_SOURCES = {
+    'Oura Data': 'oura',
+    'Fitbit Data': 'fitbit',
+    'Garmin Data': 'garmin',
+    'Apple Health Data': 'apple_health',
+}
+
+# Units for metrics whose ingest path does not carry a unit
+DEFAULT_UNITS = {
+    'average_hrv': 'ms',
+    'average_heart_rate': 'bpm',
+    'average_breath': 'rpm',
+    'deep_sleep_duration': 'min',
+    'rem_sleep_duration': 'min',
+    'awake_time': 'min',
+    'total_sleep_duration': 'min',
+    'garmin_resting_heart_rate': 'bpm',
+    'garmin_sleep_duration': 'min',
+    'garmin_vo2_max': 'ml/kg/min',
+    'garmin_activity_minutes': 'min',
+    'garmin_activity_distance': 'km',
+    'garmin_activity_calories': 'kcal',
+    'fitbit_resting_heart_rate': 'bpm',
+    'fitbit_sleep_duration': 'min',
+    'fitbit_distance': 'km',
+    'fitbit_calories_burned': 'kcal',
+    'fitbit_weight': 'kg',
+    'apple_heart_rate': 'bpm',
+    'apple_resting_heart_rate': 'bpm',
+    'apple_hrv_sdnn': 'ms',
+    'apple_sleep_duration': 'min',
+    'apple_distance': 'km',
+    'apple_active_calories': 'kcal',
+    'apple_weight': 'kg',
+    'apple_oxygen_saturation': '%',
+}
+
+
+def summarize_rows(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-metric stats for a batch of inserted rows
+
+    Args:
+        rows: DataFrame with date, metric_name, value and optionally unit
+
+    Returns:
+        DataFrame: metric_name, row_count, first_date, last_date, last_value, unit
+    """
+    ordered = rows.sort_values('date', kind='stable')
+    grouped = ordered.groupby('metric_name', sort=False)
+    stats = grouped.agg(
+        row_count=('date', 'size'),
+        first_date=('date', 'min'),
+        last_date=('date', 'max'),
+        last_value=('value', 'last'),
+    )
+    if 'unit' in ordered.columns:
+        units = ordered['unit'].where(ordered['unit'].astype(str).str.len() > 0)
+        stats['unit'] = units.groupby(ordered['metric_name']).first()
+    else:
+        stats['unit'] = None
+    return stats.reset_index()
+
+
+def update_catalog(stats: pd.DataFrame, graph_id: Optional[int] = None) -> None:
+    """
+    Fold per-metric stats of newly inserted rows into the catalog
+
+    Counts and date bounds are updated in SQL so concurrent ingests do not
+    overwrite each other; metrics seen for the first time are inserted.
+    An integration graph writing to a metric recorded as 'manual' takes
+    over its source. The caller commits the session.
+
+    Args:
+        stats: Output of summarize_rows (or an equivalent SQL aggregate)
+        graph_id: Graph the rows were inserted into, used to pick the source
+    """
+    if stats.empty:
+        return
+
+    source = None
+    if graph_id is not None:
+        graph = db.session.get(Graph, graph_id)
+        source = GRAPH_SOURCES.get(graph.name) if graph else None
+
+    for row in stats.itertuples(index=False):
+        unit = row.unit if isinstance(row.unit, str) and row.unit else None
+        updated = MetricCatalog.query.filter_by(metric_name=row.metric_name).update({
+            MetricCatalog.row_count: MetricCatalog.row_count + int(row.row_count),
+            MetricCatalog.first_date: case(
+                (MetricCatalog.first_date.is_(None) | (MetricCatalog.first_date > row.first_date), row.first_date),
+                else_=MetricCatalog.first_date
+            ),
+            MetricCatalog.last_value: case(
+                (MetricCatalog.last_date.is_(None) | (MetricCatalog.last_date <= row.last_date), float(row.last_value)),
+                else_=MetricCatalog.last_value
+            ),
+            MetricCatalog.last_date: case(
+                (MetricCatalog.last_date.is_(None) | (MetricCatalog.last_date < row.last_date), row.last_date),
+                else_=MetricCatalog.last_date
+            ),
+            MetricCatalog.unit: func.coalesce(MetricCatalog.unit, unit),
+            MetricCatalog.source: case(
+                (MetricCatalog.source == 'manual', source or 'manual'),
+                else_=MetricCatalog.source
+            ),
+            MetricCatalog.data_version: MetricCatalog.data_version + 1,
+        }, synchronize_session=False)
+
+        if not updated:
+            db.session.add(MetricCatalog(
+                metric_name=row.metric_name,
+                source=source or infer_metric_source(row.metric_name),
+                unit=unit,
+                row_count=int(row.row_count),
+                first_date=row.first_date,
+                last_date=row.last_date,
+                last_value=float(row.last_value),
+                data_version=initial_data_version()
+            ))
+    db.session.flush()
+    mark_metrics_changed(stats['metric_name'])
+
+
+def refresh_catalog(metric_names: Iterable[str]) -> None:
+    """
+    Recompute catalog rows from data_points for the given metrics
+
+    Used after deletes and in-place updates, which the incremental path
+    cannot express. Metrics with no rows left are removed.
+    """
+    metric_names = list(set(metric_names))
+    if not metric_names:
+        return
+
+    aggregates = db.session.query(
+        DataPoint.metric_name,
+        func.count(DataPoint.id),
+        func.min(DataPoint.date),
+        func.max(DataPoint.date)
+    ).filter(DataPoint.metric_name.in_(metric_names)).group_by(DataPoint.metric_name).all()
+    found = {name: (count, first, last) for name, count, first, last in aggregates}
+
+    entries = {entry.metric_name: entry for entry in MetricCatalog.query.filter(MetricCatalog.metric_name.in_(metric_names))}
+    for name in metric_names:
+        entry = entries.get(name)
+        if name not in found:
+            if entry:
+                db.session.delete(entry)
+            continue
+
+        count, first, last = found[name]
+        latest = DataPoint.query.filter_by(metric_name=name, date=last).order_by(DataPoint.id.desc()).first()
+        if not entry:
+            entry = MetricCatalog(metric_name=name, source=infer_metric_source(name), data_version=initial_data_version())
+            db.session.add(entry)
+        else:
+            entry.data_version = MetricCatalog.data_version + 1
+        entry.row_count = count
+        entry.first_date = first
+        entry.last_date = last
+        entry.last_value = latest.value if latest else None
+    db.session.flush()
+    mark_metrics_changed(metric_names)
+
+
+def initial_data_version() -> int:
+    """
+    Starting data_version for a new catalog row
+
+    Seeded from the clock rather than 1 so a metric that is deleted and
+    later re-imported never repeats a version (and an ETag) it had before.
+    """
+    return time.time_ns() // 1000
+
+
+def catalog_versions(catalog: Dict[str, MetricCatalog],
+                     metric_names: Optional[Iterable[str]] = None) -> List[Tuple[str, Optional[int]]]:
+    """
+    Sorted (metric_name, data_version) pairs for building ETags
+
+    Args:
+        catalog: Catalog entries keyed by metric name (get_catalog_entries())
+        metric_names: Metrics to include (all catalog entries when None);
+                      metrics without a catalog row get version None
+    """
+    if metric_names is None:
+        metric_names = catalog.keys()
+    return sorted(
+        (name, catalog[name].data_version if name in catalog else None)
+        for name in set(metric_names)
+    )
+
+
+def infer_metric_source(metric_name: str) -> str:
+    """Fallback source for metrics whose graph does not identify the integration"""
+    if metric_name.startswith('fitbit_'):
+        return 'fitbit'
+    if metric_name.startswith('apple_'):
+        return 'apple_health'
+    if metric_name.startswith('garmin_'):
+        return 'garmin'
+    return 'manual'
+
+
+def list_metric_names(source: Optional[str] = None) -> List[str]:
+    """Sorted metric names, optionally for one source"""
+    query = db.session.query(MetricCatalog.metric_name)
+    if source:
+        query = query.filter(MetricCatalog.source == source)
+    return [name for (name,) in query.order_by(MetricCatalog.metric_name).all()]
+
+
+def get_catalog_entries(metric_names: Optional[Iterable[str]] = None) -> Dict[str, MetricCatalog]:
+    """Catalog rows keyed by metric name (all rows when metric_names is None)"""
+    query = MetricCatalog.query
+    if metric_names is not None:
+        query = query.filter(MetricCatalog.metric_name.in_(list(metric_names)))
+    return {entry.metric_name: entry for entry in query.all()}
+
+
+def count_data_points(source: Optional[str] = None, metric_names: Optional[Iterable[str]] = None) -> int:
+    """Total data points from the catalog, optionally filtered by source or metric names"""
+    query = db.session.query(func.coalesce(func.sum(MetricCatalog.row_count), 0))
+    if source:
+        query = query.filter(MetricCatalog.source == source)
+    if metric_names is not None:
+        query = query.filter(MetricCatalog.metric_name.in_(list(metric_names)))
+    return int(query.scalar())
+
+
+def get_metric_unit(metric_name: str, entry: Optional[MetricCatalog] = None) -> str:
+    """Unit recorded at ingest, falling back to the built-in defaults"""
+    if entry is None:
+        entry = db.session.get(MetricCatalog, metric_name)
+    if entry is not None and entry.unit:
+        return entry.unit
+    return DEFAULT_UNITS.get(metric_name, '')
+
+
+def catalog_entry_to_dict(entry: MetricCatalog) -> Dict[str, Any]:
+    return {
+        'metric_name': entry.metric_name,
+        'source': entry.source,
+        'unit': get_metric_unit(entry.metric_name, entry),
+        'row_count': entry.row_count,
+        'first_date': entry.first_date.isoformat() if entry.first_date else None,
+        'last_date': entry.last_date.isoformat() if entry.last_date else None,
+        'last_value': entry.last_value,
+        'data_version': entry.data_version,
+    }
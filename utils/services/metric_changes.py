@@ -0,0 +1,165 @@
+"""
+MetricChanges - Tells the per-process metric caches which metrics changed
+
+Ingest marks the metrics it touched on the database session
+(mark_metrics_changed). When the session commits, every subscriber
+(on_metrics_changed) is called with those metric names; a rollback
+discards them.
+
+Each gunicorn worker keeps its own caches, so on Postgres the change is
+also published with NOTIFY on METRIC_CHANGES_CHANNEL inside the committing
+transaction (delivered only if it commits). Every worker runs a listener
+thread on its own connection that LISTENs on the channel and calls the
+subscribers with the names another process changed. After the listener
+(re)connects it cannot know what it missed, so subscribers are told that
+everything changed.
+"""
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from typing import Callable, Iterable, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+METRIC_CHANGES_CHANNEL = os.getenv('METRIC_CHANGES_CHANNEL', 'metric_changes')
+METRIC_CHANGES_NOTIFY = os.getenv('METRIC_CHANGES_NOTIFY', 'true').lower() == 'true'
+NOTIFY_PAYLOAD_LIMIT = 7900  # Postgres rejects NOTIFY payloads of 8000 bytes or more
+_DIRTY_KEY = 'metric_changes_dirty'
+
+# Called with a set of metric names, or None when every metric may have changed
+Subscriber = Callable[[Optional[Iterable[str]]], None]
+_subscribers: List[Subscriber] = []
+
+
+def on_metrics_changed(callback: Subscriber) -> Subscriber:
+    """Register a callback run with the changed metric names after commit (usable as a decorator)"""
+    _subscribers.append(callback)
+    return callback
+
+
+def mark_metrics_changed(metric_names: Iterable[str]) -> None:
+    """Record that the current transaction changed these metrics; applied on commit"""
+    db.session.info.setdefault(_DIRTY_KEY, set()).update(metric_names)
+
+
+def notify_subscribers(metric_names: Optional[Iterable[str]]) -> None:
+    for callback in _subscribers:
+        try:
+            callback(metric_names)
+        except Exception as e:
+            logger.error(f"Metric change subscriber {callback!r} failed: {e}")
+
+
+def _sender_id() -> str:
+    """Identifies this process among all workers (pids alone repeat across containers)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _notify_payload(metric_names) -> str:
+    """JSON payload naming the sender process and the metrics ('*' when too long for NOTIFY)"""
+    payload = json.dumps({'sender': _sender_id(), 'metrics': sorted(metric_names)})
+    if len(payload.encode('utf-8')) > NOTIFY_PAYLOAD_LIMIT:
+        payload = json.dumps({'sender': _sender_id(), 'metrics': '*'})
+    return payload
+
+
+@event.listens_for(Session, 'before_commit')
+def _publish_before_commit(session):
+    dirty = session.info.get(_DIRTY_KEY)
+    if not dirty or not METRIC_CHANGES_NOTIFY or session.get_bind().dialect.name != 'postgresql':
+        return
+    session.execute(text('SELECT pg_notify(:channel, :payload)'),
+                    {'channel': METRIC_CHANGES_CHANNEL, 'payload': _notify_payload(dirty)})
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_on_commit(session):
+    dirty = session.info.pop(_DIRTY_KEY, None)
+    if dirty:
+        notify_subscribers(dirty)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop(_DIRTY_KEY, None)
+
+
+class ChangeListener(threading.Thread):
+    """Daemon thread applying metric changes NOTIFYed by other processes"""
+
+    def __init__(self, dsn: str):
+        super().__init__(name='metric-change-listener', daemon=True)
+        self.dsn = dsn
+
+    def run(self) -> None:
+        import psycopg
+
+        backoff = 1
+        while True:
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    conn.execute(f'LISTEN "{METRIC_CHANGES_CHANNEL}"')
+                    logger.info(f"Listening for metric changes on '{METRIC_CHANGES_CHANNEL}'")
+                    backoff = 1
+                    # Changes made while disconnected were missed
+                    notify_subscribers(None)
+                    for notification in conn.notifies():
+                        self.handle(notification.payload)
+            except Exception as e:
+                logger.warning(f"Metric change listener disconnected ({e}); retrying in {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    @staticmethod
+    def handle(payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed metric change notification: {payload[:100]}")
+            return
+        if message.get('sender') == _sender_id():
+            return  # our own commit, already applied by _apply_on_commit
+        metrics = message.get('metrics')
+        notify_subscribers(None if metrics == '*' else set(metrics or ()))
+
+
+_listener_dsn = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def ensure_change_listener() -> None:
+    """Start the LISTEN thread if this process does not run one yet (cheap when it does)"""
+    global _listener_pid
+    if _listener_dsn is None or _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        ChangeListener(_listener_dsn).start()
+
+
+def init_change_listener(app, database_url: str) -> None:
+    """
+    Run a LISTEN thread in every process that serves requests (Postgres only)
+
+    The thread is started by the first request a process handles rather
+    than at import or fork time: forked gunicorn workers (--preload) do not
+    inherit threads, and other forked children (e.g. the Garmin import's
+    decode processes) never serve requests and so never open a connection.
+    """
+    global _listener_dsn
+    if not METRIC_CHANGES_NOTIFY or not database_url.startswith('postgresql'):
+        return
+    # libpq does not understand SQLAlchemy's driver suffix
+    _listener_dsn = 'postgresql://' + database_url.split('://', 1)[1]
+    app.before_request(ensure_change_listener)
@@ -0,0 +1,288 @@
+"""
+OpenAIClient - Shared wrapper around OpenAI chat completions
+
+Every OpenAI call in the app goes through the module-level `openai_client`
+so that all callers share one request-per-minute / token-per-minute budget,
+get retries with backoff and timeouts, and are counted in the usage stats
+exposed by /api/admin/openai-stats.
+
+Limits are enforced per process; with several gunicorn workers, set the
+limits to the account quota divided by the number of workers.
+"""
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque, defaultdict
+from typing import Dict, Any, Iterator
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4  # rough average used to estimate prompt size before the call
+
+# Errors worth retrying; everything else is raised immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class OpenAIRateLimitExceeded(Exception):
+    """Raised when a call cannot get a slot in the local rate limiter in time"""
+
+
+class RateLimiter:
+    """Sliding one-minute window limiting both requests and tokens"""
+
+    def __init__(self, max_requests_per_minute: int, max_tokens_per_minute: int, window_seconds: float = 60.0):
+        self.max_requests = max_requests_per_minute
+        self.max_tokens = max_tokens_per_minute
+        self.window = window_seconds
+        self._events = deque()  # [timestamp, tokens] per admitted call
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        while self._events and self._events[0][0] <= now - self.window:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def acquire(self, tokens: int, timeout: float) -> list:
+        """
+        Block until the call fits in the window
+
+        Args:
+            tokens: Estimated tokens for the call
+            timeout: Maximum seconds to wait
+
+        Returns:
+            list: The window entry, so the caller can correct the token count later
+
+        Raises:
+            OpenAIRateLimitExceeded: If no slot frees up within timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._prune(now)
+                fits_requests = len(self._events) < self.max_requests
+                # A single oversized call is still let through on an empty window
+                fits_tokens = self._tokens_in_window + tokens <= self.max_tokens or not self._events
+                if fits_requests and fits_tokens:
+                    entry = [now, tokens]
+                    self._events.append(entry)
+                    self._tokens_in_window += tokens
+                    return entry
+                wait = self._events[0][0] + self.window - now
+            if now + wait > deadline:
+                raise OpenAIRateLimitExceeded("Too many OpenAI requests in progress. Please wait a moment and try again.")
+            time.sleep(min(max(wait, 0.01), 1.0))
+
+    def settle(self, entry: list, actual_tokens: int) -> None:
+        """Replace the estimated token count of an admitted call with the real usage"""
+        with self._lock:
+            if any(event is entry for event in self._events):
+                self._tokens_in_window += actual_tokens - entry[1]
+            entry[1] = actual_tokens
+
+
+class UsageStats:
+    """Thread-safe counters for OpenAI usage, grouped by call purpose"""
+
+    def __init__(self, max_latency_samples: int = 1000):
+        self._lock = threading.Lock()
+        self._max_samples = max_latency_samples
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._started_at = time.time()
+            self._purposes = defaultdict(lambda: {
+                'calls': 0,
+                'errors': 0,
+                'retries': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'cache_hits': 0,
+                'latencies': deque(maxlen=self._max_samples),
+            })
+
+    def record_call(self, purpose: str, latency: float, prompt_tokens: int, completion_tokens: int,
+                    retries: int, failed: bool) -> None:
+        with self._lock:
+            stats = self._purposes[purpose]
+            stats['calls'] += 1
+            stats['retries'] += retries
+            stats['errors'] += 1 if failed else 0
+            stats['prompt_tokens'] += prompt_tokens
+            stats['completion_tokens'] += completion_tokens
+            stats['latencies'].append(latency)
+
+    def record_cache_hit(self, purpose: str) -> None:
+        with self._lock:
+            self._purposes[purpose]['cache_hits'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals plus per-purpose counters with p50/p95 latency in seconds"""
+        with self._lock:
+            purposes = {}
+            for purpose, stats in self._purposes.items():
+                latencies = sorted(stats['latencies'])
+                purposes[purpose] = {
+                    key: value for key, value in stats.items() if key != 'latencies'
+                }
+                purposes[purpose]['latency_p50'] = _percentile(latencies, 50)
+                purposes[purpose]['latency_p95'] = _percentile(latencies, 95)
+
+            totals = {
+                key: sum(p[key] for p in purposes.values())
+                for key in ('calls', 'errors', 'retries', 'prompt_tokens', 'completion_tokens', 'cache_hits')
+            }
+            return {
+                'since': self._started_at,
+                'totals': totals,
+                'purposes': purposes,
+            }
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 4)
+
+
+class OpenAIClient:
+    """Rate-limited, retrying and instrumented access to chat completions"""
+
+    def __init__(self, max_requests_per_minute: int = 60, max_tokens_per_minute: int = 30000,
+                 timeout: float = 60.0, max_retries: int = 3, queue_timeout: float = 30.0):
+        self.limiter = RateLimiter(max_requests_per_minute, max_tokens_per_minute)
+        self.stats = UsageStats()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.queue_timeout = queue_timeout
+
+    def chat_completion(self, purpose: str, **kwargs):
+        """
+        Create a chat completion
+
+        Args:
+            purpose: Label used to group the call in the usage stats
+            **kwargs: Arguments for openai.chat.completions.create
+
+        Returns:
+            The OpenAI completion response
+
+        Raises:
+            OpenAIRateLimitExceeded: If the local limiter is saturated
+            openai.OpenAIError: If the call still fails after retries
+        """
+        entry = self.limiter.acquire(self._estimate_tokens(kwargs), self.queue_timeout)
+        started = time.monotonic()
+        retries = [0]
+        try:
+            response = self._create_with_retries(kwargs, purpose, retries)
+        except Exception:
+            self.stats.record_call(purpose, time.monotonic() - started, 0, 0, retries[0], failed=True)
+            raise
+
+        usage = getattr(response, 'usage', None)
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        if usage is not None:
+            self.limiter.settle(entry, prompt_tokens + completion_tokens)
+        self.stats.record_call(purpose, time.monotonic() - started, prompt_tokens, completion_tokens, retries[0], failed=False)
+        return response
+
+    def stream_chat_completion(self, purpose: str, **kwargs) -> Iterator[Any]:
+        """
+        Create a streamed chat completion and yield its chunks
+
+        Usage is not reported for streams, so token counts are estimated
+        from the prompt and the streamed text.
+        """
+        entry = self.limiter.acquire(self._estimate_tokens(kwargs), self.queue_timeout)
+        started = time.monotonic()
+        retries = [0]
+        try:
+            stream = self._create_with_retries(dict(kwargs, stream=True), purpose, retries)
+        except Exception:
+            self.stats.record_call(purpose, time.monotonic() - started, 0, 0, retries[0], failed=True)
+            raise
+
+        streamed_chars = 0
+        failed = True
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    streamed_chars += len(chunk.choices[0].delta.content)
+                yield chunk
+            failed = False
+        finally:
+            prompt_tokens = self._estimate_prompt_tokens(kwargs)
+            completion_tokens = streamed_chars // CHARS_PER_TOKEN
+            self.limiter.settle(entry, prompt_tokens + completion_tokens)
+            self.stats.record_call(purpose, time.monotonic() - started, prompt_tokens, completion_tokens, retries[0], failed)
+
+    def record_cache_hit(self, purpose: str) -> None:
+        """Count a result served from a cache instead of calling OpenAI"""
+        self.stats.record_cache_hit(purpose)
+
+    def _create_with_retries(self, kwargs: Dict[str, Any], purpose: str, retries: list):
+        """Call OpenAI, retrying transient errors; retries[0] counts the retries made"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return openai.chat.completions.create(timeout=self.timeout, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"OpenAI {purpose} call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                retries[0] = attempt + 1
+                time.sleep(delay)
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> float:
+        """Honor Retry-After when the API sends it, otherwise exponential backoff with jitter"""
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), 60.0)
+            except ValueError:
+                pass
+        return min(2 ** attempt, 20) + random.uniform(0, 0.5)
+
+    @staticmethod
+    def _estimate_prompt_tokens(kwargs: Dict[str, Any]) -> int:
+        chars = 0
+        for message in kwargs.get('messages', []):
+            content = message.get('content', '')
+            if isinstance(content, list):
+                chars += sum(len(part.get('text', '')) for part in content)
+            else:
+                chars += len(content)
+        return chars // CHARS_PER_TOKEN + 1
+
+    def _estimate_tokens(self, kwargs: Dict[str, Any]) -> int:
+        return self._estimate_prompt_tokens(kwargs) + kwargs.get('max_tokens', 0)
+
+
+def _create_default_client() -> OpenAIClient:
+    return OpenAIClient(
+        max_requests_per_minute=int(os.getenv('OPENAI_MAX_RPM', 60)),
+        max_tokens_per_minute=int(os.getenv('OPENAI_MAX_TPM', 30000)),
+        timeout=float(os.getenv('OPENAI_TIMEOUT', 60)),
+        max_retries=int(os.getenv('OPENAI_MAX_RETRIES', 3)),
+        queue_timeout=float(os.getenv('OPENAI_QUEUE_TIMEOUT', 30)),
+    )
+
+
+openai_client = _create_default_client()
@@ -2,6 +2,7 @@ import requests
 import pandas as pd
 from datetime import datetime, timedelta
 from models import db, Graph, DataPoint
+from utils.services.data_ingest import parse_data_points, bulk_insert_data_points
 
 def fetch_oura_data(token, start_date_str, end_date_str):
     url = 'https://api.ouraring.com/v2/usercollection/sleep'
@@ -94,39 +95,16 @@ def store_oura_data (cleaned_records): #list of dictionaries
         db.session.add(oura_graph)
         db.session.commit()
 
-    new_data_points = []
-
-    for record in cleaned_records:
-        day_str = record.get("day")
-        if not day_str: 
-            continue
-
-        day_date = pd.to_datetime(day_str).date()
-
-        for metric, value in record.items(): 
-            if metric == "day" or value is None:
-                continue
-        
-            existing_dp = DataPoint.query.filter_by(
-                date=day_date,
-                metric_name=metric,
-                graph_id=oura_graph.id
-            ).first()
-
-            if not existing_dp:
-                new_data_points.append(
-                    DataPoint(
-                        date=day_date,
-                        metric_name=metric,
-                        value=float(value),
-                        graph_id=oura_graph.id
-                    )  
-                )
-        
-    db.session.bulk_save_objects(new_data_points)
+    # One row per (day, metric); existing rows are skipped by the batched ingest path
+    rows = [
+        {'date': record["day"], 'metric_name': metric, 'value': value}
+        for record in cleaned_records if record.get("day")
+        for metric, value in record.items()
+        if metric != "day" and value is not None
+    ]
+    parsed, _ = parse_data_points(rows)
+    rows_inserted = bulk_insert_data_points(parsed, oura_graph.id, daily=True)['inserted']
     db.session.commit()
-    rows_inserted = len(new_data_points)
-            # Data inserted successfully
     return rows_inserted
 
 # (Optional) A quick test call:
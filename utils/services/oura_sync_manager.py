@@ -3,7 +3,7 @@ OuraSyncManager - Handles automatic Oura data synchronization
 """
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Callable
 from flask_apscheduler import APScheduler
 from models import db, User, SyncLog
 from utils.services.oura_fetch_and_store import fetch_oura_data, flatten_oura_chunks, clean_data, store_oura_data
@@ -16,6 +16,16 @@ class OuraSyncManager:
     def __init__(self, scheduler: APScheduler):
         self.scheduler = scheduler
         self.job_prefix = "oura_sync_user_"
+        # Callables invoked with the user ID after every successful sync
+        self.post_sync_hooks: List[Callable[[int], None]] = []
+    
+    def _run_post_sync_hooks(self, user_id: int) -> None:
+        """Run post-sync hooks; a failing hook never fails the sync itself"""
+        for hook in self.post_sync_hooks:
+            try:
+                hook(user_id)
+            except Exception as e:
+                logger.error(f"Oura post-sync hook failed for user {user_id}: {e}")
     
     def schedule_user_sync(self, user_id: int, frequency: str) -> bool:
         """
@@ -158,6 +168,7 @@ class OuraSyncManager:
             db.session.commit()
             
             logger.info(f"Automatic sync completed for user {user_id}: {records_imported} records imported")
+            self._run_post_sync_hooks(user_id)
             
             return {
                 "success": True,
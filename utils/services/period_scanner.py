@@ -0,0 +1,129 @@
+"""
+PeriodScanner - Highest and lowest periods of a metric's history
+
+Scans every window of a fixed number of calendar days across a metric's
+series and returns the k highest and k lowest non-overlapping windows by
+mean, e.g. the weeks with the best HRV as starting points for new
+experiments. A window averages its points like the experiment benchmark
+(window_average over a date window): all non-missing points in it weigh
+equally, and dates without data are skipped.
+
+The series is bucketed per calendar day once; cumulative sums of the
+per-day sums, point counts and covered days then give every window's
+totals by subtraction, so a scan is O(n) in the days of history rather
+than O(n * days). Windows need at least min_coverage of their days to
+have data, so a single lucky reading does not make a "best week".
+"""
+import math
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+from utils.services.series_encoding import Series
+
+logger = logging.getLogger(__name__)
+
+PERIOD_SCAN_MAX_K = 50
+DEFAULT_MIN_COVERAGE = 0.5
+
+
+def _window_totals(series: Series, days: int):
+    """
+    First date of the history and, per window start offset, the sum,
+    point count and days with data of the days-long window starting there
+    """
+    dates, values = series
+    present = ~np.isnan(values)
+    dates, values = dates[present], values[present]
+    first = dates[0]
+    offsets = (dates - first).astype(np.int64)
+    span = int(offsets[-1]) + 1
+
+    daily_sum = np.bincount(offsets, weights=values, minlength=span)
+    daily_count = np.bincount(offsets, minlength=span)
+
+    def window_totals(daily):
+        cumulative = np.concatenate(([0], np.cumsum(daily)))
+        return cumulative[days:] - cumulative[:-days]
+
+    return first, window_totals(daily_sum), window_totals(daily_count), window_totals(daily_count > 0)
+
+
+def _pick_non_overlapping(order: np.ndarray, windows: int, days: int, k: int) -> List[int]:
+    """The first k window starts in order that overlap none picked before them"""
+    blocked = np.zeros(windows, dtype=bool)
+    picked = []
+    for start in order:
+        if blocked[start]:
+            continue
+        picked.append(int(start))
+        if len(picked) == k:
+            break
+        # Windows starting less than days before or after this one share a day with it
+        blocked[max(start - days + 1, 0):start + days] = True
+    return picked
+
+
+def scan_periods(series: Series, days: int, k: int = 3,
+                 min_coverage: float = DEFAULT_MIN_COVERAGE) -> Dict[str, Any]:
+    """
+    The k highest and k lowest non-overlapping windows of days calendar days
+
+    Args:
+        series: Date-ordered series of one metric
+        days: Window length in calendar days
+        k: Windows to return on each side
+        min_coverage: Fraction of a window's days that must have data
+
+    Returns:
+        dict: {"days", "k", "min_coverage", "windows_scanned", "overall_mean",
+               "top": [...], "bottom": [...]}; each window is
+               {"start", "end" (inclusive), "mean", "difference" (from
+               overall_mean), "points", "days_with_data"}, highest (top) or
+               lowest (bottom) first
+    """
+    if days < 1:
+        raise ValueError('days must be at least 1')
+    if not 1 <= k <= PERIOD_SCAN_MAX_K:
+        raise ValueError(f"k must be between 1 and {PERIOD_SCAN_MAX_K}")
+    if not 0 < min_coverage <= 1:
+        raise ValueError('min_coverage must be greater than 0 and at most 1')
+
+    report = {'days': days, 'k': k, 'min_coverage': min_coverage, 'windows_scanned': 0,
+              'overall_mean': None, 'top': [], 'bottom': []}
+    values = series[1]
+    if not np.count_nonzero(~np.isnan(values)):
+        return report
+    overall_mean = float(np.nanmean(values))
+    report['overall_mean'] = overall_mean
+
+    first, sums, counts, covered = _window_totals(series, days)
+    eligible = np.flatnonzero(covered >= math.ceil(days * min_coverage))
+    report['windows_scanned'] = len(eligible)
+    if not len(eligible):  # includes a history shorter than one window
+        return report
+
+    means = np.full(len(sums), np.nan)
+    means[eligible] = sums[eligible] / counts[eligible]
+
+    def describe(starts):
+        windows = []
+        for start in starts:
+            window_start = first + np.timedelta64(start, 'D')
+            windows.append({
+                'start': str(window_start),
+                'end': str(window_start + np.timedelta64(days - 1, 'D')),
+                'mean': float(means[start]),
+                'difference': float(means[start] - overall_mean),
+                'points': int(counts[start]),
+                'days_with_data': int(covered[start]),
+            })
+        return windows
+
+    # Stable sorts keep the earliest of equal windows first
+    highest_first = eligible[np.argsort(-means[eligible], kind='stable')]
+    lowest_first = eligible[np.argsort(means[eligible], kind='stable')]
+    report['top'] = describe(_pick_non_overlapping(highest_first, len(sums), days, k))
+    report['bottom'] = describe(_pick_non_overlapping(lowest_first, len(sums), days, k))
+    return report
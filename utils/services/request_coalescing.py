@@ -0,0 +1,215 @@
+"""
+RequestCoalescing - One in-flight computation per response, shared by concurrent requests
+
+Right after a sync every open dashboard tab revalidates the same expensive
+GET endpoints at once, and each request used to rebuild the payload. A view
+decorated with @coalesce hands its build step (see conditional_response in
+app.py) to a RequestCoalescer keyed by the response's ETag: the first
+request builds it, identical requests arriving meanwhile wait for that
+result and receive a copy instead of querying the database themselves.
+
+With stale_while_revalidate > 0, requests that arrive while a newer
+version is being built get the previous response for the same query
+string (at most that many seconds old) immediately, with its own ETag,
+instead of waiting. Only the query parameters a view declares are part of
+that key, and each view keeps at most COALESCE_STALE_ENTRIES previous
+responses, dropped once they are older than the stale window, so
+cache-busting parameters cannot pin response bodies in memory.
+Coalescing is per process; each gunicorn worker builds a changed
+response at most once.
+"""
+import os
+import time
+import logging
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+COALESCE_STALE_SECONDS = float(os.getenv('COALESCE_STALE_SECONDS', 300))  # stale-while-revalidate window
+COALESCE_WAIT_TIMEOUT = float(os.getenv('COALESCE_WAIT_TIMEOUT', 60))  # seconds before a waiter builds itself
+COALESCE_STALE_ENTRIES = int(os.getenv('COALESCE_STALE_ENTRIES', 8))  # previous responses kept per view
+
+
+class Snapshot:
+    """Buffered copy of a built response, replayed into a fresh Response per request"""
+
+    __slots__ = ('etag', 'status', 'headers', 'body', 'created_at')
+
+    def __init__(self, etag: str, response):
+        self.etag = etag
+        self.status = response.status_code
+        self.headers = list(response.headers.items())
+        self.body = response.get_data()
+        self.created_at = time.monotonic()
+
+    def to_response(self):
+        return current_app.response_class(self.body, status=self.status, headers=self.headers)
+
+
+class _Flight:
+    """A build in progress"""
+
+    def __init__(self, route_key):
+        self.route_key = route_key
+        self.done = threading.Event()
+        self.snapshot: Optional[Snapshot] = None
+        self.error: Optional[BaseException] = None
+
+
+class RequestCoalescer:
+    """Shares response builds of one view between concurrent requests"""
+
+    def __init__(self, name: str, stale_while_revalidate: float = 0, max_stale_entries: int = COALESCE_STALE_ENTRIES):
+        self.name = name
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_stale_entries = max_stale_entries
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}  # etag -> build in progress
+        self._refreshing: Dict[Any, int] = {}  # route key -> builds in progress
+        self._latest: OrderedDict = OrderedDict()  # route key -> last successful response, oldest first
+        self.builds = 0
+        self.joined = 0
+        self.stale = 0
+
+    def run(self, etag: str, build: Callable[[], Any], route_key: Any) -> Tuple[str, Any]:
+        """
+        Build the response for etag once, however many requests ask for it concurrently
+
+        Args:
+            etag: Identity of the response; requests with equal ETags get equal bodies
+            build: Callable returning a buffered (non-streamed) response
+            route_key: Identifies the request apart from the data version
+                       (view arguments and query string), for stale responses
+
+        Returns:
+            tuple: (ETag of the returned body, response)
+        """
+        with self._lock:
+            self._expire_stale()
+            stale = self._latest.get(route_key)
+            if stale is not None and stale.etag != etag and self._refreshing.get(route_key):
+                self.stale += 1
+                return stale.etag, stale.to_response()
+
+            flight = self._flights.get(etag)
+            leader = flight is None
+            if leader:
+                flight = self._flights[etag] = _Flight(route_key)
+                self._refreshing[route_key] = self._refreshing.get(route_key, 0) + 1
+                self.builds += 1
+            else:
+                self.joined += 1
+
+        if not leader:
+            if flight.done.wait(COALESCE_WAIT_TIMEOUT) and flight.snapshot is not None:
+                return etag, flight.snapshot.to_response()
+            if flight.error is not None:
+                raise flight.error
+            logger.warning(f"{self.name}: shared build unavailable, building separately")
+            return etag, build()
+
+        try:
+            response = build()
+            if not response.is_streamed:
+                flight.snapshot = Snapshot(etag, response)
+            return etag, response
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[etag]
+                self._refreshing[route_key] -= 1
+                if not self._refreshing[route_key]:
+                    del self._refreshing[route_key]
+                if flight.snapshot is not None and flight.snapshot.status == 200:
+                    self._keep_stale(route_key, flight.snapshot)
+            flight.done.set()
+
+    def _keep_stale(self, route_key: Any, snapshot: Snapshot) -> None:
+        """Remember a response for stale serving, evicting the oldest beyond max_stale_entries"""
+        if self.stale_while_revalidate <= 0 or self.max_stale_entries <= 0:
+            return
+        self._latest.pop(route_key, None)
+        self._latest[route_key] = snapshot
+        while len(self._latest) > self.max_stale_entries:
+            self._latest.popitem(last=False)
+
+    def _expire_stale(self) -> None:
+        """Drop responses too old to be served stale (entries are ordered by age)"""
+        cutoff = time.monotonic() - self.stale_while_revalidate
+        while self._latest:
+            route_key, snapshot = next(iter(self._latest.items()))
+            if snapshot.created_at > cutoff:
+                break
+            del self._latest[route_key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'builds': self.builds,
+                'joined': self.joined,
+                'stale_served': self.stale,
+                'in_flight': len(self._flights),
+                'stale_entries': len(self._latest),
+                'stale_while_revalidate': self.stale_while_revalidate,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.builds = 0
+            self.joined = 0
+            self.stale = 0
+
+
+_coalescers: List[RequestCoalescer] = []
+
+
+def coalesce(stale_while_revalidate: float = 0, params: Tuple[str, ...] = ()):
+    """
+    Decorator for GET views whose response is built through conditional_response
+
+    Args:
+        stale_while_revalidate: Seconds a previous response may be served
+                                while a newer one is being built (0 to always wait)
+        params: Query parameters the view reads; only these tell requests
+                apart for stale responses
+    """
+    def decorator(view):
+        coalescer = RequestCoalescer(view.__name__, stale_while_revalidate)
+        _coalescers.append(coalescer)
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g.coalescer = coalescer
+            g.coalesce_params = params
+            return view(*args, **kwargs)
+
+        wrapper.coalescer = coalescer
+        return wrapper
+    return decorator
+
+
+def current_coalescer() -> Optional[RequestCoalescer]:
+    """The coalescer of the view handling this request, if it is decorated"""
+    return g.get('coalescer')
+
+
+def route_key() -> Tuple[str, Tuple]:
+    """The current request's path and the query parameters its view declared (see coalesce)"""
+    params = g.get('coalesce_params', ())
+    return request.path, tuple((name, tuple(request.args.getlist(name))) for name in params)
+
+
+def coalescing_stats() -> Dict[str, Dict[str, Any]]:
+    return {coalescer.name: coalescer.stats() for coalescer in _coalescers}
+
+
+def reset_coalescing_stats() -> None:
+    for coalescer in _coalescers:
+        coalescer.reset_stats()
@@ -0,0 +1,82 @@
+"""
+SeriesAlignment - Several metric series pivoted onto one shared date axis
+
+The Explorer charts several metrics together. Instead of fetching each
+metric separately and matching dates in the browser, the series are
+pivoted server-side into a date x metric matrix: one row per date on
+which any of the metrics has data, NaN where a metric has none. Gaps can
+optionally be filled forward or interpolated linearly in time (inside a
+series only, never before its first or after its last point). Several
+points of one metric on the same date are averaged.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.services.series_encoding import Series
+
+logger = logging.getLogger(__name__)
+
+FILL_METHODS = ('none', 'ffill', 'interpolate')
+
+
+def align_series(series_by_metric: Dict[str, Series], metric_names: List[str],
+                 fill: str = 'none', fill_limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pivot series onto the union of their dates
+
+    Args:
+        series_by_metric: Date-ordered series keyed by metric name
+        metric_names: Column order of the matrix
+        fill: 'none', 'ffill' or 'interpolate'
+        fill_limit: Most consecutive missing dates to fill (None for no limit)
+
+    Returns:
+        tuple: (datetime64[D] dates, float64 matrix of shape (dates, metrics))
+    """
+    if fill not in FILL_METHODS:
+        raise ValueError(f"Unsupported fill '{fill}'. Use one of: {', '.join(FILL_METHODS)}")
+
+    columns = {}
+    for name in metric_names:
+        dates, values = series_by_metric[name]
+        column = pd.Series(values, index=pd.DatetimeIndex(dates))
+        if column.index.has_duplicates:
+            column = column.groupby(level=0).mean()
+        columns[name] = column
+
+    frame = pd.DataFrame(columns, columns=metric_names).sort_index()
+    if fill == 'ffill':
+        frame = frame.ffill(limit=fill_limit)
+    elif fill == 'interpolate' and len(frame):
+        frame = frame.interpolate(method='time', limit=fill_limit, limit_area='inside')
+
+    dates = frame.index.values.astype('datetime64[D]')
+    return dates, frame.to_numpy(dtype=np.float64)
+
+
+def aligned_to_columnar(dates: np.ndarray, matrix: np.ndarray, metric_names: List[str]) -> Dict[str, Any]:
+    """
+    Columnar encoding of an aligned matrix
+
+    {"start", "offsets": [days since start], "series": [{"name", "values"}]};
+    every values array has one entry per offset, null where the metric has
+    no value on that date.
+    """
+    if not len(dates):
+        return {'start': None, 'offsets': [], 'series': [{'name': name, 'values': []} for name in metric_names]}
+
+    start = dates[0]
+    series = []
+    for i, name in enumerate(metric_names):
+        values = matrix[:, i]
+        missing = np.isnan(values)
+        # JSON has no NaN; missing values go out as null
+        series.append({'name': name, 'values': np.where(missing, None, values).tolist() if missing.any() else values})
+    return {
+        'start': str(start),
+        'offsets': (dates - start).astype(np.int64),
+        'series': series,
+    }
@@ -0,0 +1,215 @@
+"""
+SeriesCache - Size-bounded LRU of metric series held as NumPy arrays
+
+Graph endpoints, metric data and experiment statistics all read the full
+date-ordered series of a metric (load_metric_series). The cache keeps
+each loaded series as a compact pair of read-only arrays (datetime64[D]
+dates, float64 values; 12 bytes per point) and evicts the least recently
+used metrics once SERIES_CACHE_MAX_BYTES is exceeded. Date windows and
+aggregates over them (window, window_average) are sliced from the cached
+arrays with a binary search instead of another query; windowed reads of
+metrics that are not cached load only the window (get_many_window).
+
+Entries are dropped when ingest commits changes to their metrics, in this
+or another worker process (see metric_changes).
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from utils.services.metric_changes import on_metrics_changed
+from utils.services.series_encoding import Series, load_metric_series
+
+logger = logging.getLogger(__name__)
+
+SERIES_CACHE_MAX_BYTES = int(os.getenv('SERIES_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+
+def _freeze(series: Series) -> Series:
+    """Own, read-only copies (loaded series are slices of one array shared by all metrics)"""
+    frozen = []
+    for array in series:
+        array = array.copy()
+        array.flags.writeable = False
+        frozen.append(array)
+    return tuple(frozen)
+
+
+def _nbytes(series: Series) -> int:
+    return series[0].nbytes + series[1].nbytes
+
+
+class SeriesCache:
+    """Thread-safe metric name -> Series LRU bounded by the bytes of its arrays"""
+
+    def __init__(self, max_bytes: int = SERIES_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # metric_name -> Series, least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by every invalidation
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, metric_names: Iterable[str]) -> Dict[str, Series]:
+        """
+        Date-ordered series of each metric (see load_metric_series)
+
+        Cached metrics are served from memory; the rest are loaded together
+        in one query. The returned arrays are read-only.
+        """
+        metric_names = list(dict.fromkeys(metric_names))
+        found = {}
+        with self._lock:
+            for name in metric_names:
+                series = self._entries.get(name)
+                if series is not None:
+                    self._entries.move_to_end(name)
+                    found[name] = series
+            self.hits += len(found)
+            self.misses += len(metric_names) - len(found)
+            generation = self._generation
+
+        missing = [name for name in metric_names if name not in found]
+        if missing:
+            loaded = {name: _freeze(series) for name, series in load_metric_series(missing).items()}
+            found.update(loaded)
+            with self._lock:
+                # A commit during the load may have made it stale; serve it but do not keep it
+                if generation == self._generation:
+                    for name, series in loaded.items():
+                        self._store(name, series)
+        return found
+
+    def get(self, metric_name: str) -> Series:
+        return self.get_many([metric_name])[metric_name]
+
+    def cached(self, metric_name: str) -> Optional[Series]:
+        """The cached series of a metric, or None (counted as a hit or miss; nothing is loaded)"""
+        with self._lock:
+            series = self._entries.get(metric_name)
+            if series is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(metric_name)
+                self.hits += 1
+            return series
+
+    def get_many_window(self, metric_names: Iterable[str], start: Optional[date] = None,
+                        end: Optional[date] = None) -> Dict[str, Series]:
+        """
+        Each metric's series between start and end (inclusive)
+
+        Cached metrics are sliced from memory. The others are loaded with the
+        date range applied in SQL and are not cached, so windowed reads only
+        touch their slice of the table. Without a window this is get_many.
+        """
+        if start is None and end is None:
+            return self.get_many(metric_names)
+
+        found = {}
+        missing = []
+        for name in dict.fromkeys(metric_names):
+            series = self.cached(name)
+            if series is None:
+                missing.append(name)
+            else:
+                found[name] = slice_series(series, start, end)
+        if missing:
+            found.update(load_metric_series(missing, start, end))
+        return found
+
+    def window(self, metric_name: str, start: Optional[date] = None, end: Optional[date] = None,
+               include_end: bool = True) -> Series:
+        """
+        The part of a metric's series between start and end
+
+        Args:
+            metric_name: Metric to read
+            start: First date included (None for the beginning of the series)
+            end: Last date (None for the end of the series)
+            include_end: Whether points on end itself are included
+
+        Returns:
+            Series: read-only views of the cached arrays
+        """
+        return slice_series(self.get(metric_name), start, end, include_end)
+
+    def _store(self, name: str, series: Series) -> None:
+        size = _nbytes(series)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(name, None)
+        if old is not None:
+            self._bytes -= _nbytes(old)
+        self._entries[name] = series
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= _nbytes(evicted)
+            self.evictions += 1
+
+    def invalidate(self, metric_names: Optional[Iterable[str]] = None) -> None:
+        """Drop cached series for the given metrics, or all of them"""
+        with self._lock:
+            self._generation += 1
+            if metric_names is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for name in metric_names:
+                series = self._entries.pop(name, None)
+                if series is not None:
+                    self._bytes -= _nbytes(series)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and memory use"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'points': sum(len(series[0]) for series in self._entries.values()),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+def slice_series(series: Series, start: Optional[date] = None, end: Optional[date] = None,
+                 include_end: bool = True) -> Series:
+    """Views of the points of a date-ordered series from start to end, found by binary search"""
+    dates, values = series
+    lo = np.searchsorted(dates, np.datetime64(start, 'D'), 'left') if start else 0
+    if end:
+        hi = np.searchsorted(dates, np.datetime64(end, 'D'), 'right' if include_end else 'left')
+    else:
+        hi = len(dates)
+    return dates[lo:hi], values[lo:hi]
+
+
+def window_average(series: Series) -> Tuple[Optional[float], int]:
+    """Mean of the non-missing values in a series and how many there are (None, 0 when empty)"""
+    values = series[1]
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None, 0
+    return float(values.mean()), len(values)
+
+
+series_cache = SeriesCache()
+on_metrics_changed(series_cache.invalidate)
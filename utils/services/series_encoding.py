@@ -0,0 +1,181 @@
+"""
+SeriesEncoding - Chart series loaded into NumPy arrays and encoded without per-point objects
+
+Chart endpoints historically sent one {"x": "YYYY-MM-DD", "y": value} dict
+per data point. Series are now loaded as a datetime64[D] array of dates and
+a float64 array of values, and encoded from those arrays:
+
+- points:   the original list of {"x", "y"} dicts (dates formatted in one
+            vectorized call instead of a strftime per point)
+- columnar: {"start": "YYYY-MM-DD", "offsets": [days since start], "values": [...]}
+- binary:   packed little-endian arrays (see pack_series)
+- arrow:    Arrow IPC stream with date and value columns (needs pyarrow)
+"""
+import io
+import struct
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from models import db, DataPoint
+
+logger = logging.getLogger(__name__)
+
+SERIES_FORMATS = ('points', 'columnar', 'binary', 'arrow')
+SERIES_CONTENT_TYPES = {
+    'binary': 'application/octet-stream',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+# Binary layout: 16-byte header, float64 values, then int32 day offsets
+BINARY_MAGIC = b'NFS1'
+BINARY_HEADER = struct.Struct('<4sIiI')  # magic, point count, start day (days since 1970-01-01), reserved
+
+Series = Tuple[np.ndarray, np.ndarray]  # (datetime64[D] dates, float64 values)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def empty_series() -> Series:
+    return np.empty(0, dtype='datetime64[D]'), np.empty(0, dtype=np.float64)
+
+
+def _within(query, start: Optional[date], end: Optional[date]):
+    """Restrict a DataPoint query to start <= date <= end (either bound optional)"""
+    if start:
+        query = query.where(DataPoint.date >= start)
+    if end:
+        query = query.where(DataPoint.date <= end)
+    return query
+
+
+def load_metric_series(metric_names: Iterable[str], start: Optional[date] = None,
+                       end: Optional[date] = None) -> Dict[str, Series]:
+    """
+    Date-ordered series of each metric across all graphs, in one query
+
+    start and end (inclusive) limit the dates loaded; the range is applied
+    in SQL over the (metric_name, date) index. Metrics without data map to
+    empty arrays.
+    """
+    metric_names = list(dict.fromkeys(metric_names))
+    if not metric_names:
+        return {}
+
+    query = select(DataPoint.metric_name, DataPoint.date, DataPoint.value)\
+        .where(DataPoint.metric_name.in_(metric_names))\
+        .order_by(DataPoint.metric_name, DataPoint.date, DataPoint.id)
+    return _group_rows(db.session.execute(_within(query, start, end)).all(), metric_names)
+
+
+def load_metric_slice(metric_name: str, start: Optional[date] = None, end: Optional[date] = None,
+                      limit: Optional[int] = None) -> Series:
+    """The first limit points of one metric between start and end (inclusive), in one query"""
+    query = select(DataPoint.date, DataPoint.value)\
+        .where(DataPoint.metric_name == metric_name)\
+        .order_by(DataPoint.date, DataPoint.id)
+    query = _within(query, start, end)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db.session.execute(query).all()
+    if not rows:
+        return empty_series()
+    dates, values = zip(*rows)
+    return _to_datetime64(dates), np.array(values, dtype=np.float64)
+
+
+def load_graph_series(graph_id: int, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, Series]:
+    """Date-ordered series of each metric stored in one graph, by metric name"""
+    query = select(DataPoint.metric_name, DataPoint.date, DataPoint.value)\
+        .where(DataPoint.graph_id == graph_id)\
+        .order_by(DataPoint.metric_name, DataPoint.date, DataPoint.id)
+    return _group_rows(db.session.execute(_within(query, start, end)).all())
+
+
+def _to_datetime64(dates) -> np.ndarray:
+    """datetime.date objects to datetime64[D] via their ordinals (much faster than np.array(dates))"""
+    ordinals = np.fromiter(map(date.toordinal, dates), dtype=np.int64, count=len(dates))
+    return (ordinals - _EPOCH_ORDINAL).astype('datetime64[D]')
+
+
+def _group_rows(rows, metric_names: Optional[Iterable[str]] = None) -> Dict[str, Series]:
+    """Split rows ordered by metric name into per-metric slices of shared date/value arrays"""
+    series = {name: empty_series() for name in metric_names or ()}
+    if not rows:
+        return series
+
+    names, dates, values = zip(*rows)
+    names = np.array(names, dtype=object)
+    dates = _to_datetime64(dates)
+    values = np.array(values, dtype=np.float64)
+    bounds = np.flatnonzero(names[1:] != names[:-1]) + 1
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(names)]):
+        series[names[start]] = (dates[start:end], values[start:end])
+    return series
+
+
+def series_to_points(series: Series) -> list:
+    """The legacy [{"x": "YYYY-MM-DD", "y": value}, ...] encoding"""
+    dates, values = series
+    return [{'x': x, 'y': y} for x, y in zip(np.datetime_as_string(dates, unit='D').tolist(), values.tolist())]
+
+
+def series_to_columnar(series: Series) -> Dict[str, Any]:
+    """
+    Columnar encoding: first date plus integer day offsets and a values array
+
+    A client rebuilds timestamps as start + offset * 86400000 ms without
+    parsing a date string per point. offsets and values stay NumPy arrays;
+    the app's JSON provider writes them directly.
+    """
+    dates, values = series
+    if not len(dates):
+        return {'start': None, 'offsets': [], 'values': []}
+    start = dates[0]
+    return {
+        'start': str(start),
+        'offsets': (dates - start).astype(np.int64),
+        'values': np.ascontiguousarray(values),
+    }
+
+
+def pack_series(series: Series) -> bytes:
+    """
+    Packed binary encoding
+
+    Layout (little-endian): 4-byte magic "NFS1", uint32 point count,
+    int32 start day since 1970-01-01, uint32 reserved, then count float64
+    values (8-byte aligned) followed by count int32 day offsets.
+    """
+    dates, values = series
+    days = dates.astype(np.int64)
+    start = int(days[0]) if len(days) else 0
+    header = BINARY_HEADER.pack(BINARY_MAGIC, len(values), start, 0)
+    return header + values.astype('<f8').tobytes() + (days - start).astype('<i4').tobytes()
+
+
+def series_to_arrow(series: Series) -> bytes:
+    """Arrow IPC stream with a date32 'date' column and a float64 'value' column"""
+    import pyarrow as pa
+
+    dates, values = series
+    table = pa.table({'date': pa.array(dates, type=pa.date32()), 'value': pa.array(values)})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def encode_series(series: Series, fmt: str):
+    """Encode one series as points or columnar JSON data, or as binary/arrow bytes"""
+    if fmt == 'points':
+        return series_to_points(series)
+    if fmt == 'columnar':
+        return series_to_columnar(series)
+    if fmt == 'binary':
+        return pack_series(series)
+    if fmt == 'arrow':
+        return series_to_arrow(series)
+    raise ValueError(f"Unsupported series format: {fmt}")
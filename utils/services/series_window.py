@@ -0,0 +1,164 @@
+"""
+SeriesWindow - Date windows and keyset pages of metric series
+
+Chart endpoints take start/end (inclusive YYYY-MM-DD dates) and limit
+query parameters. A page holds at most limit points and always ends on a
+date boundary, so the continuation token only has to carry the next date
+to read: the following page is the same query with start moved past the
+last date returned (keyset pagination over the (metric_name, date) index,
+no OFFSET). Tokens are opaque to clients and bound to their metric.
+
+Graphs can store a default window (Graph.default_window_days): the last N
+days up to the newest data point of the graph's metrics, so a normal
+dashboard load reads a bounded slice instead of the whole history.
+"""
+import os
+import json
+import base64
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.services.series_cache import series_cache, slice_series
+from utils.services.series_encoding import Series, load_metric_slice
+
+logger = logging.getLogger(__name__)
+
+SERIES_PAGE_MAX_LIMIT = int(os.getenv('SERIES_PAGE_MAX_LIMIT', 50000))  # points per page
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid {name} date '{value}', expected YYYY-MM-DD")
+
+
+def parse_window_args(args, metric_name: Optional[str] = None) -> Tuple[Optional[date], Optional[date], Optional[int]]:
+    """
+    start, end and limit from request query parameters
+
+    A continuation token (page_token) replaces start with the first date of
+    the next page. Raises ValueError for malformed values.
+
+    Args:
+        args: request.args
+        metric_name: Metric the token must belong to (paged endpoints only)
+
+    Returns:
+        tuple: (start, end, limit), each None when not given
+    """
+    start = _parse_date(args.get('start'), 'start')
+    end = _parse_date(args.get('end'), 'end')
+    if start and end and start > end:
+        raise ValueError('start must not be after end')
+
+    limit = args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError(f"Invalid limit '{limit}'")
+        if not 1 <= limit <= SERIES_PAGE_MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {SERIES_PAGE_MAX_LIMIT}")
+
+    token = args.get('page_token')
+    if token:
+        start = decode_page_token(token, metric_name)
+    return start, end, limit
+
+
+def encode_page_token(metric_name: str, next_start: date) -> str:
+    payload = json.dumps({'m': metric_name, 'after': next_start.isoformat()}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_page_token(token: str, metric_name: Optional[str] = None) -> date:
+    """The first date of the page a token continues to"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        next_start = datetime.strptime(payload['after'], '%Y-%m-%d').date()
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid page_token')
+    if metric_name is not None and payload.get('m') != metric_name:
+        raise ValueError('page_token belongs to a different metric')
+    return next_start
+
+
+def _trim_to_date(series: Series, limit: int) -> Tuple[Series, Optional[date]]:
+    """
+    First limit points, cut back to a date boundary
+
+    series holds up to limit + 1 points; the extra one tells whether more
+    follow. Returns the page and the first date of the next page (None on
+    the last page). When the first date alone has more than limit points
+    the page is None and the caller loads that date whole.
+    """
+    dates, values = series
+    if len(dates) <= limit:
+        return series, None
+    cut = limit
+    if dates[limit] == dates[limit - 1]:
+        cut = int(np.searchsorted(dates, dates[limit], 'left'))
+        if cut == 0:  # the whole page is one date; it cannot be split
+            return None, dates[0].astype(object)
+    return (dates[:cut], values[:cut]), dates[cut].astype(object)
+
+
+def read_series_page(metric_name: str, start: Optional[date] = None, end: Optional[date] = None,
+                     limit: Optional[int] = None) -> Tuple[Series, Optional[str]]:
+    """
+    One page of a metric's series and the token for the next page
+
+    Served from the series cache when the metric is cached; otherwise the
+    range and limit are applied in SQL.
+
+    Returns:
+        tuple: (series, next page token or None)
+    """
+    if limit is None:
+        return series_cache.get_many_window([metric_name], start, end)[metric_name], None
+
+    cached = series_cache.cached(metric_name)
+    if cached is not None:
+        window = slice_series(cached, start, end)
+        window = window[0][:limit + 1], window[1][:limit + 1]
+    else:
+        window = load_metric_slice(metric_name, start, end, limit + 1)
+
+    page, next_start = _trim_to_date(window, limit)
+    if page is None:
+        # One date holds more than limit points: return all of them
+        page = series_cache.get_many_window([metric_name], next_start, next_start)[metric_name]
+        next_start = next_start + timedelta(days=1)
+        # Only hand out a token when a point follows that date
+        if end and next_start > end:
+            next_start = None
+        elif cached is not None:
+            if not len(slice_series(cached, next_start, end)[0]):
+                next_start = None
+        elif not len(load_metric_slice(metric_name, next_start, end, 1)[0]):
+            next_start = None
+    return page, encode_page_token(metric_name, next_start) if next_start else None
+
+
+def graph_window(days: Optional[int], catalog: Dict, metric_names) -> Tuple[Optional[date], Optional[date]]:
+    """
+    Default (start, end) of a graph showing the last days of its metrics' data
+
+    Args:
+        days: Graph.default_window_days (None or 0 for the full history)
+        catalog: Catalog entries keyed by metric name (get_catalog_entries())
+        metric_names: The graph's metrics
+    """
+    if not days:
+        return None, None
+    last_dates = [catalog[name].last_date for name in metric_names if name in catalog and catalog[name].last_date]
+    if not last_dates:
+        return None, None
+    end = max(last_dates)
+    return end - timedelta(days=days - 1), None